@@ -8,6 +8,11 @@ Create Date: 2024-01-01 00:00:00.000000
 from alembic import op
 import sqlalchemy as sa
 
+revision = '001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
 def upgrade() -> None:
     op.create_table(
         'transactions',
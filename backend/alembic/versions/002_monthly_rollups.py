@@ -0,0 +1,36 @@
+"""Monthly rollup table
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'monthly_rollups',
+        sa.Column('month', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('month', 'transaction_type', 'category'),
+    )
+    # Backfill from existing history
+    op.execute("""
+        INSERT INTO monthly_rollups (month, transaction_type, category, total, count)
+        SELECT strftime('%Y-%m', timestamp), transaction_type, COALESCE(category, 'Other'),
+               SUM(ABS(amount)), COUNT(id)
+        FROM transactions
+        GROUP BY strftime('%Y-%m', timestamp), transaction_type, COALESCE(category, 'Other')
+    """)
+
+def downgrade() -> None:
+    op.drop_table('monthly_rollups')
@@ -0,0 +1,31 @@
+"""Composite indexes for endpoint access paths
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_transactions_timestamp', 'transactions', ['timestamp'], unique=False)
+    op.create_index('ix_transactions_category_timestamp', 'transactions', ['category', 'timestamp'], unique=False)
+    op.create_index('ix_transactions_type_timestamp', 'transactions', ['transaction_type', 'timestamp'], unique=False)
+    op.create_index(
+        'ix_transactions_duplicate_lookup',
+        'transactions',
+        ['description', 'amount', 'transaction_type', 'timestamp'],
+        unique=False,
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_duplicate_lookup', table_name='transactions')
+    op.drop_index('ix_transactions_type_timestamp', table_name='transactions')
+    op.drop_index('ix_transactions_category_timestamp', table_name='transactions')
+    op.drop_index('ix_transactions_timestamp', table_name='transactions')
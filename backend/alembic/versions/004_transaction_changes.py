@@ -0,0 +1,41 @@
+"""Change log for the incremental sync feed
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-03-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = {
+    'transactions_log_insert': "AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'insert'); END",
+    'transactions_log_update': "AFTER UPDATE ON transactions BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'update'); END",
+    'transactions_log_delete': "AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (OLD.id, 'delete'); END",
+}
+
+def upgrade() -> None:
+    # No backfill: existing rows predate the log, clients pick them up with a full download
+    op.create_table(
+        'transaction_changes',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+    )
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('transaction_changes')
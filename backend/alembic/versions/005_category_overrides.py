@@ -0,0 +1,42 @@
+"""Learned merchant category overrides and re-tagging jobs
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-04-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'category_overrides',
+        sa.Column('merchant', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('merchant', 'transaction_type'),
+    )
+    op.create_table(
+        'retag_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('merchant', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('end_id', sa.Integer(), nullable=False),
+        sa.Column('updated', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+
+def downgrade() -> None:
+    op.drop_table('retag_jobs')
+    op.drop_table('category_overrides')
@@ -0,0 +1,41 @@
+"""Full-text search index over transaction descriptions
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-04-15 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = {
+    'transactions_fts_insert': "AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+    'transactions_fts_delete': "AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transactions_fts (transactions_fts, rowid, description) "
+        "VALUES ('delete', OLD.id, OLD.description); END",
+    'transactions_fts_update': "AFTER UPDATE OF description ON transactions BEGIN "
+        "INSERT INTO transactions_fts (transactions_fts, rowid, description) "
+        "VALUES ('delete', OLD.id, OLD.description); "
+        "INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+}
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+        "description, content='transactions', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    # Backfill: index every existing description in one pass
+    op.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS transactions_fts")
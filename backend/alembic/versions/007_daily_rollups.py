@@ -0,0 +1,42 @@
+"""Daily rollups for the time-series analytics
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-05-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_rollups',
+        sa.Column('day', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'transaction_type', 'category'),
+    )
+    op.create_table(
+        'rollup_coverage',
+        sa.Column('rollup', sa.String(), nullable=False),
+        sa.Column('start_day', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('rollup'),
+    )
+    # No backfill here, so the upgrade stays instant on large tables: days up to the
+    # latest existing transaction are aggregated on the fly until
+    # scripts/rebuild_rollups.py fills them in
+    op.execute(
+        "INSERT INTO rollup_coverage (rollup, start_day) "
+        "SELECT 'daily', date(MAX(timestamp), '+1 day') FROM transactions HAVING COUNT(*) > 0"
+    )
+
+def downgrade() -> None:
+    op.drop_table('rollup_coverage')
+    op.drop_table('daily_rollups')
@@ -0,0 +1,133 @@
+"""Archive tables for closed months, with frozen monthly summaries
+
+Also rebuilds transactions with AUTOINCREMENT: without it SQLite hands out
+max(id) + 1, which could repeat the id of a row that was moved to the archive.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-05-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+# Dropped along with the old transactions table and recreated as in 004 and 006
+TRANSACTION_TRIGGERS = {
+    'transactions_log_insert': "AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'insert'); END",
+    'transactions_log_update': "AFTER UPDATE ON transactions BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'update'); END",
+    'transactions_log_delete': "AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (OLD.id, 'delete'); END",
+    'transactions_fts_insert': "AFTER INSERT ON transactions BEGIN "
+        "INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+    'transactions_fts_delete': "AFTER DELETE ON transactions BEGIN "
+        "INSERT INTO transactions_fts (transactions_fts, rowid, description) "
+        "VALUES ('delete', OLD.id, OLD.description); END",
+    'transactions_fts_update': "AFTER UPDATE OF description ON transactions BEGIN "
+        "INSERT INTO transactions_fts (transactions_fts, rowid, description) "
+        "VALUES ('delete', OLD.id, OLD.description); "
+        "INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+}
+TRANSACTION_INDEXES = {
+    'ix_transactions_id': ['id'],
+    'ix_transactions_timestamp': ['timestamp'],
+    'ix_transactions_category_timestamp': ['category', 'timestamp'],
+    'ix_transactions_type_timestamp': ['transaction_type', 'timestamp'],
+    'ix_transactions_duplicate_lookup': ['description', 'amount', 'transaction_type', 'timestamp'],
+}
+
+TRIGGERS = {
+    'archived_transactions_fts_insert': "AFTER INSERT ON archived_transactions BEGIN "
+        "INSERT INTO archived_transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+    'archived_transactions_fts_delete': "AFTER DELETE ON archived_transactions BEGIN "
+        "INSERT INTO archived_transactions_fts (archived_transactions_fts, rowid, description) "
+        "VALUES ('delete', OLD.id, OLD.description); END",
+    'archived_transactions_fts_update': "AFTER UPDATE OF description ON archived_transactions BEGIN "
+        "INSERT INTO archived_transactions_fts (archived_transactions_fts, rowid, description) "
+        "VALUES ('delete', OLD.id, OLD.description); "
+        "INSERT INTO archived_transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+}
+
+def rebuild_transactions_with_autoincrement() -> None:
+    """SQLite's table rebuild: copy into a new table, drop the old one, rename; ids and rowids are kept"""
+    for name in TRANSACTION_TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.create_table(
+        'transactions_rebuilt',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('auto_tagged', sa.Boolean(), nullable=False, server_default='1'),
+        sa.Column('timestamp', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint("transaction_type IN ('income', 'expense')"),
+        sqlite_autoincrement=True,
+    )
+    columns = "id, description, amount, transaction_type, category, auto_tagged, timestamp"
+    op.execute(
+        f"INSERT INTO transactions_rebuilt ({columns}) "
+        f"SELECT id, description, amount, transaction_type, category, COALESCE(auto_tagged, 1), "
+        f"COALESCE(timestamp, CURRENT_TIMESTAMP) FROM transactions"
+    )
+    op.execute("DROP TABLE transactions")
+    op.execute("ALTER TABLE transactions_rebuilt RENAME TO transactions")
+    for name, columns in TRANSACTION_INDEXES.items():
+        op.create_index(name, 'transactions', columns, unique=False)
+    for name, body in TRANSACTION_TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+def upgrade() -> None:
+    rebuild_transactions_with_autoincrement()
+    op.create_table(
+        'archived_transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('auto_tagged', sa.Boolean(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_archived_transactions_timestamp', 'archived_transactions', ['timestamp'], unique=False)
+    op.create_table(
+        'archived_summaries',
+        sa.Column('month', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('month', 'transaction_type', 'category'),
+    )
+    op.create_table(
+        'archived_months',
+        sa.Column('month', sa.String(), nullable=False),
+        sa.Column('transactions', sa.Integer(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('month'),
+    )
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS archived_transactions_fts USING fts5("
+        "description, content='archived_transactions', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+def downgrade() -> None:
+    # transactions keeps AUTOINCREMENT, which earlier revisions work with as well
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS archived_transactions_fts")
+    op.drop_table('archived_months')
+    op.drop_table('archived_summaries')
+    op.drop_index('ix_archived_transactions_timestamp', table_name='archived_transactions')
+    op.drop_table('archived_transactions')
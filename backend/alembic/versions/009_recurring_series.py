@@ -0,0 +1,39 @@
+"""Recurring-transaction series
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-05-22 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Starts empty: existing history is picked up by scripts/rebuild_recurring.py,
+    # new transactions from the upgrade on
+    op.create_table(
+        'recurring_series',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('merchant', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('occurrences', sa.Integer(), nullable=False),
+        sa.Column('first_seen', sa.DateTime(), nullable=False),
+        sa.Column('last_seen', sa.DateTime(), nullable=False),
+        sa.Column('frequency', sa.String(), nullable=True),
+        sa.Column('streak', sa.Integer(), nullable=False),
+        sa.Column('streak_start', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_recurring_series_merchant', 'recurring_series', ['merchant', 'transaction_type'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_recurring_series_merchant', table_name='recurring_series')
+    op.drop_table('recurring_series')
@@ -0,0 +1,41 @@
+"""Budgets and their running spend per period
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-05-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'budgets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('period', sa.String(), nullable=False),
+        sa.Column('limit', sa.Float(), nullable=False),
+        sa.Column('warn_percentage', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_budgets_category', 'budgets', ['category'], unique=False)
+    # Filled per budget when it is created
+    op.create_table(
+        'budget_spend',
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.String(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('budget_id', 'period_start'),
+    )
+
+def downgrade() -> None:
+    op.drop_table('budget_spend')
+    op.drop_index('ix_budgets_category', table_name='budgets')
+    op.drop_table('budgets')
@@ -0,0 +1,40 @@
+"""Data version counter behind ETags and the response cache
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-06-05 00:00:00.000000
+
+"""
+import time
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = {
+    f'{table}_version_{name}': f"AFTER {name.upper()} ON {table} BEGIN "
+        "UPDATE data_version SET version = version + 1; END"
+    for table in ('transactions', 'archived_transactions')
+    for name in ('insert', 'update', 'delete')
+}
+
+def upgrade() -> None:
+    op.create_table(
+        'data_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    # From the wall clock, so ETags issued before the upgrade are not matched again
+    op.execute(f"INSERT INTO data_version (id, version) VALUES (1, {time.time_ns() // 1000})")
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table('data_version')
@@ -0,0 +1,42 @@
+"""Let bulk imports skip the per-row insert triggers on transactions
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-06-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+SKIP = "WHEN NOT EXISTS (SELECT 1 FROM bulk_inserts) "
+
+TRIGGERS = {
+    'transactions_fts_insert': "AFTER INSERT ON transactions {skip}BEGIN "
+        "INSERT INTO transactions_fts (rowid, description) VALUES (NEW.id, NEW.description); END",
+    'transactions_log_insert': "AFTER INSERT ON transactions {skip}BEGIN "
+        "INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'insert'); END",
+    'transactions_version_insert': "AFTER INSERT ON transactions {skip}BEGIN "
+        "UPDATE data_version SET version = version + 1; END",
+}
+
+def replace_triggers(skip: str):
+    for name, body in TRIGGERS.items():
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute(f"CREATE TRIGGER {name} {body.format(skip=skip)}")
+
+def upgrade() -> None:
+    op.create_table(
+        'bulk_inserts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    replace_triggers(SKIP)
+
+def downgrade() -> None:
+    replace_triggers("")
+    op.drop_table('bulk_inserts')
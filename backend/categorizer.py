@@ -0,0 +1,136 @@
+"""
+Single-pass keyword matching for auto-categorization
+Compiles a {label: [keywords]} map into an Aho-Corasick automaton, so the
+cost of matching a description depends on its length, not on the number
+of rules. Per-merchant overrides learned from manual reclassifications
+are consulted first.
+"""
+
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+NO_MATCH = -1
+
+class KeywordMatcher:
+    """Aho-Corasick automaton returning the highest-priority label whose keyword occurs in a text
+
+    Priority follows the order of the rules mapping: the first label with any
+    matching keyword wins, whatever the position of the keyword in the text.
+    """
+
+    def __init__(self, rules: Dict[str, Iterable[str]]):
+        self.labels: List[str] = list(rules)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Best (lowest) rule index reachable from each state through its suffix links
+        self._best: List[int] = [NO_MATCH]
+
+        for priority, label in enumerate(self.labels):
+            for keyword in rules[label]:
+                self._add(keyword.lower(), priority)
+        self._link()
+
+    def _add(self, keyword: str, priority: int):
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(NO_MATCH)
+            state = next_state
+        if self._best[state] == NO_MATCH or priority < self._best[state]:
+            self._best[state] = priority
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                if state:
+                    fail = self._fail[state]
+                    while fail and char not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[next_state] = self._goto[fail].get(char, 0)
+                inherited = self._best[self._fail[next_state]]
+                if inherited != NO_MATCH and (self._best[next_state] == NO_MATCH or inherited < self._best[next_state]):
+                    self._best[next_state] = inherited
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the label of the highest-priority keyword found in text (case-insensitive)"""
+        goto, fail, best_at = self._goto, self._fail, self._best
+        best = NO_MATCH
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = best_at[state]
+            if found != NO_MATCH and (best == NO_MATCH or found < best):
+                best = found
+                if best == 0:
+                    break
+        return self.labels[best] if best != NO_MATCH else None
+
+    def match_many(self, texts: Iterable[str]) -> List[Optional[str]]:
+        """Match a batch of texts, scanning each distinct text once"""
+        cache: Dict[str, Optional[str]] = {}
+        results = []
+        for text in texts:
+            if text not in cache:
+                cache[text] = self.match(text)
+            results.append(cache[text])
+        return results
+
+WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+@lru_cache(maxsize=65536)  # descriptions repeat a lot within an import
+def merchant_key(description: str) -> str:
+    """Normalized merchant name: lowercase words, without numbers and punctuation
+
+    "STARBUCKS #1234" and "Starbucks 88" both give "starbucks".
+    """
+    return " ".join(WORD.findall(description.lower()))
+
+class CategoryOverrides:
+    """In-memory cache of (merchant, transaction_type) -> category corrections
+
+    Filled from the database by loader on first use; clear() forces a reload.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[Tuple[str, str, str]]]):
+        self._loader = loader
+        self._entries: Optional[Dict[Tuple[str, str], str]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[Tuple[str, str], str]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = {
+                    (merchant, transaction_type): category
+                    for merchant, transaction_type, category in self._loader()
+                }
+            return self._entries
+
+    def __len__(self):
+        return len(self._entries if self._entries is not None else self._load())
+
+    def get(self, merchant: str, transaction_type: str) -> Optional[str]:
+        entries = self._entries if self._entries is not None else self._load()
+        return entries.get((merchant, transaction_type))
+
+    def set(self, merchant: str, transaction_type: str, category: str):
+        """Record a committed override"""
+        self._load()[(merchant, transaction_type)] = category
+
+    def clear(self):
+        with self._lock:
+            self._entries = None
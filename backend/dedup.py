@@ -0,0 +1,93 @@
+"""
+In-process duplicate detection over a sliding time window
+Keeps the keys of recently stored transactions in memory so the create
+path can reject duplicates without querying the database.
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+class DuplicateIndex:
+    """Timestamps of recent transactions per key, evicted once they leave the window
+
+    The index is per process: it only stays authoritative while this process
+    is the sole writer of the database it was warmed from.
+    """
+
+    def __init__(self, window: timedelta):
+        self.window = window
+        self.warm = False
+        self._timestamps: Dict[Hashable, List[datetime]] = {}
+        # Min-heap of (timestamp, seq, key) driving eviction; entries may be stale after discard()
+        self._expiry: List[Tuple[datetime, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def _add(self, key: Hashable, timestamp: datetime):
+        self._timestamps.setdefault(key, []).append(timestamp)
+        heapq.heappush(self._expiry, (timestamp, next(self._seq), key))
+
+    def _evict(self, now: datetime):
+        cutoff = now - self.window
+        while self._expiry and self._expiry[0][0] < cutoff:
+            timestamp, _, key = heapq.heappop(self._expiry)
+            timestamps = self._timestamps.get(key)
+            if timestamps and timestamp in timestamps:
+                timestamps.remove(timestamp)
+                if not timestamps:
+                    del self._timestamps[key]
+
+    def load(self, entries: Iterable[Tuple[Hashable, datetime]], now: datetime = None):
+        """Replace the contents with (key, timestamp) pairs, e.g. rows read from the database"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._timestamps.clear()
+            self._expiry.clear()
+            for key, timestamp in entries:
+                self._add(key, timestamp)
+            self._evict(now)
+            self.warm = True
+
+    def clear(self):
+        """Forget everything; the next user has to load() again"""
+        with self._lock:
+            self._timestamps.clear()
+            self._expiry.clear()
+            self.warm = False
+
+    def is_duplicate(self, key: Hashable, now: datetime = None) -> bool:
+        """True if key was stored within the window ending at now"""
+        with self._lock:
+            self._evict(now or datetime.utcnow())
+            return key in self._timestamps
+
+    def reserve(self, key: Hashable, timestamp: datetime) -> bool:
+        """Atomically record key at timestamp unless it is a duplicate; False if it is"""
+        with self._lock:
+            self._evict(timestamp)
+            if key in self._timestamps:
+                return False
+            self._add(key, timestamp)
+            return True
+
+    def add(self, key: Hashable, timestamp: datetime, now: datetime = None):
+        """Record a stored transaction; ignored if it is already outside the window"""
+        now = now or datetime.utcnow()
+        if timestamp >= now - self.window:
+            with self._lock:
+                self._add(key, timestamp)
+
+    def discard(self, key: Hashable, timestamp: datetime):
+        """Forget one stored transaction (rolled back or deleted)"""
+        with self._lock:
+            timestamps = self._timestamps.get(key)
+            if timestamps and timestamp in timestamps:
+                timestamps.remove(timestamp)
+                if not timestamps:
+                    del self._timestamps[key]
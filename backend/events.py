@@ -0,0 +1,107 @@
+"""
+In-process pub/sub for pushing transaction events to streaming clients
+Writers publish from any thread; each subscriber is a bounded queue drained
+by a coroutine on the event loop, so idle subscribers cost no thread. A
+subscriber that falls behind loses its oldest events and is told how many.
+Events are published to a topic (None unless the app is sharded per user) and
+only reach subscribers of that topic.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, List, Optional, Set, Tuple
+
+# (id, event type, JSON data)
+Event = Tuple[int, str, str]
+
+class Subscription:
+    """Bounded, drop-oldest queue of events for one subscriber"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int, topic: Optional[str] = None):
+        self.topic = topic
+        self.events: Deque[Event] = deque(maxlen=maxsize)
+        self.dropped = 0
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._lock = threading.Lock()
+
+    def push(self, event: Event):
+        """Queue an event; safe to call from any thread"""
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+        if not self._ready.is_set():
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass  # Loop already closed; the subscriber is gone
+
+    async def get(self, timeout: float) -> Tuple[List[Event], int]:
+        """Wait up to timeout for events; returns (events, dropped since last call)"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._ready.clear()
+        with self._lock:
+            events = list(self.events)
+            self.events.clear()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+class EventBroker:
+    """Fan-out of published events to every current subscription"""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, topic: Optional[str] = None) -> Subscription:
+        """Register a subscriber to topic; must be called on the event loop that will drain it"""
+        subscription = Subscription(asyncio.get_running_loop(), self.queue_size, topic)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, data: Any, topic: Optional[str] = None):
+        """Serialize once and queue for every subscriber of topic"""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            subscriptions = [subscription for subscription in self._subscriptions if subscription.topic == topic]
+        if not subscriptions:
+            return
+        event = (next(self._ids), event_type, json.dumps(data, separators=(",", ":")))
+        for subscription in subscriptions:
+            subscription.push(event)
+
+def format_sse(event_id: int, event_type: str, data: str) -> str:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+async def sse_stream(broker: EventBroker, subscription: Subscription, keepalive: float) -> AsyncIterator[str]:
+    """Server-Sent Events for one subscription, with comment keepalives while idle"""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            events, dropped = await subscription.get(keepalive)
+            if dropped:
+                yield f"event: overflow\ndata: {json.dumps({'dropped': dropped})}\n\n"
+            if not events:
+                yield ": keepalive\n\n"
+            for event in events:
+                yield format_sse(*event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,58 @@
+"""
+Versioned response caching for read endpoints
+GET responses are keyed by (data version, path, query), which gives both
+their ETag and their slot in a small LRU of serialized bodies. The version
+comes from the database (models.DataVersion), so it follows writes made by
+any process.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+def cache_key(version: int, path: str, query: Iterable[Tuple[str, str]]) -> str:
+    """Stable key for a GET: data version, path and sorted query parameters"""
+    raw = f"{version}|{path}|{sorted(query)}"
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+def make_etag(key: str) -> str:
+    return f'"{key}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against our (strong) ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+class ResponseCache:
+    """Bounded LRU of serialized GET responses: key -> (body, headers)"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[bytes, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, body: bytes, headers: Dict[str, str]):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,101 @@
+"""
+Incremental parsers for bulk transaction uploads (CSV and NDJSON)
+Records are parsed as the request body streams in, so an upload never has
+to be held in memory as a whole.
+"""
+
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"}
+
+# (record, error) - exactly one of the two is set
+ParsedRecord = Tuple[Optional[Dict], Optional[str]]
+
+def detect_format(content_type: str) -> Optional[str]:
+    """Map a Content-Type header to 'csv' or 'ndjson'"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return "csv"
+    if media_type in NDJSON_TYPES:
+        return "ndjson"
+    return None
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering the whole body"""
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            text = line.decode("utf-8").rstrip("\r")
+            if first:
+                text = text.lstrip("\ufeff")
+                first = False
+            yield text
+    if buffer:
+        text = buffer.decode("utf-8").rstrip("\r")
+        yield text.lstrip("\ufeff") if first else text
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    """Parse CSV with a header row; quoted fields may span lines"""
+    header = None
+    pending: List[str] = []
+    quotes = 0
+    async for line in iter_lines(chunks):
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # Inside a quoted field, keep reading
+        record = "\n".join(pending)
+        pending = []
+        quotes = 0
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield None, f"expected {len(header)} columns, got {len(values)}"
+        else:
+            yield dict(zip(header, values)), None
+
+    if pending:
+        yield None, "unterminated quoted field"
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRecord]:
+    """Parse one JSON object per line"""
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield None, f"invalid JSON: {exc}"
+            continue
+        if isinstance(record, dict):
+            yield record, None
+        else:
+            yield None, "expected a JSON object"
+
+async def iter_record_batches(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    batch_size: int
+) -> AsyncIterator[List[ParsedRecord]]:
+    """Group parsed records into batches of at most batch_size"""
+    records = iter_csv_records(chunks) if fmt == "csv" else iter_ndjson_records(chunks)
+    batch: List[ParsedRecord] = []
+    async for parsed in records:
+        batch.append(parsed)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
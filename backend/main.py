@@ -1,44 +1,131 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, func
-from sqlalchemy.ext.declarative import declarative_base
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import bindparam, column, create_engine, event, DateTime, func, delete, or_, select, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
-from pydantic import BaseModel
-from datetime import datetime, timedelta
-from typing import List, Optional
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import base64
+import heapq
+import binascii
+import json
+import logging
+import math
 import os
+import re
+import threading
+import time
+
+import orjson
+
+from categorizer import CategoryOverrides, KeywordMatcher, merchant_key
+from dedup import DuplicateIndex
+from events import EventBroker, sse_stream
+from http_cache import ResponseCache, cache_key, etag_matches, make_etag
+from models import (
+    SEARCHABLE_TABLES, ArchivedMonth, ArchivedSummary, ArchivedTransaction, Base, Budget, BudgetSpend,
+    CategoryOverride, DailyRollup, DataVersion, MonthlyRollup, RecurringSeries, RetagJob, RollupCoverage,
+    Transaction, TransactionChange,
+)
+from metrics import MetricsRegistry, RequestStats, current_request, instrument_engine
+from importers import detect_format, iter_record_batches
+import recurring
+from shards import SHARD_KEY, AlembicMigrator, Shard, ShardRouter
 
 # Database Setup
-DATABASE_URL = "sqlite:///./finance.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./finance.db")
 
-# FastAPI App
-app = FastAPI(title="Personal Finance Tracker API")
+# Applied to every new SQLite connection; WAL lets readers run while a write is in flight
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),  # ms
+}
 
-# CORS Configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Opt-in asyncio mode (aiosqlite); the sync handlers stay the default
+ASYNC_DB_MODE = os.getenv("DB_ASYNC", "").lower() in ("1", "true", "yes")
+
+# Opt-in multi-user mode: every user (X-User-Id header) gets their own SQLite file in SHARD_DIR
+SHARD_DIR = os.getenv("SHARD_DIR")
+
+# Tables, triggers and search indexes are created at startup (not on import);
+# set to 0 when the schema is managed with Alembic migrations instead
+DB_CREATE_SCHEMA = os.getenv("DB_CREATE_SCHEMA", "1").lower() not in ("0", "false", "no")
 
-# Database Models
-class Transaction(Base):
-    __tablename__ = "transactions"
+def engine_options(url: str, pool_size: Optional[int] = None) -> Dict:
+    """Pool and driver options shared by the sync and async engines"""
+    options = {}
+    if url.startswith("sqlite") and "aiosqlite" not in url:
+        options["connect_args"] = {"check_same_thread": False}
+    if ":memory:" not in url:
+        if "aiosqlite" in url:
+            options["poolclass"] = AsyncAdaptedQueuePool  # aiosqlite defaults to NullPool
+        options["pool_size"] = pool_size if pool_size is not None else int(os.getenv("DB_POOL_SIZE", "5"))
+        options["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    return options
+
+def register_sqlite_pragmas(db_engine, pragmas: Optional[Dict] = None):
+    """Apply PRAGMAs to every new connection of a (sync) SQLite engine"""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
     
-    id = Column(Integer, primary_key=True, index=True)
-    description = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
-    transaction_type = Column(String, nullable=False)  # 'income' or 'expense'
-    category = Column(String, nullable=True)
-    auto_tagged = Column(Boolean, default=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    @event.listens_for(db_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url: str = DATABASE_URL, pool_size: Optional[int] = None, pragmas: Optional[Dict] = None):
+    """Create the SQLAlchemy engine, pooled and with SQLite PRAGMAs applied on connect"""
+    db_engine = create_engine(url, **engine_options(url, pool_size))
+    if db_engine.dialect.name == "sqlite":
+        register_sqlite_pragmas(db_engine, pragmas)
+    instrument_engine(db_engine)
+    return db_engine
 
-Base.metadata.create_all(bind=engine)
+def async_database_url(url: str) -> str:
+    """Map a sync SQLite URL onto the aiosqlite driver"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+def create_async_db_engine(url: Optional[str] = None, pool_size: Optional[int] = None, pragmas: Optional[Dict] = None):
+    """Create the asyncio engine used by the async handlers"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    url = url or os.getenv("ASYNC_DATABASE_URL", async_database_url(DATABASE_URL))
+    db_engine = create_async_engine(url, **engine_options(url, pool_size))
+    if db_engine.dialect.name == "sqlite":
+        register_sqlite_pragmas(db_engine.sync_engine, pragmas)
+    instrument_engine(db_engine.sync_engine, count_rows=False)
+    return db_engine
+
+engine = create_db_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# FastAPI App
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Schema first (the other steps read its tables), then the duplicate index and the retag worker"""
+    create_schema()
+    load_duplicate_index()
+    start_retag_worker()
+    try:
+        yield
+    finally:
+        stop_retag_worker()
+        close_shards()
+
+app = FastAPI(title="Personal Finance Tracker API", lifespan=lifespan)
 
 # Pydantic Models
 class TransactionCreate(BaseModel):
@@ -50,6 +137,25 @@ class TransactionCreate(BaseModel):
 class TransactionUpdate(BaseModel):
     category: str
 
+class TransactionFilter(BaseModel):
+    """Conditions ANDed together; description is a case-insensitive LIKE pattern ('%', '_')"""
+    description: Optional[str] = None
+    category: Optional[str] = None
+    start: Optional[datetime] = None  # inclusive
+    end: Optional[datetime] = None  # exclusive
+    auto_tagged: Optional[bool] = None
+
+class BulkSelection(BaseModel):
+    """Either an id list or a filter"""
+    ids: Optional[List[int]] = Field(None, max_length=10000)
+    filter: Optional[TransactionFilter] = None
+
+class BulkReclassifyRequest(BulkSelection):
+    category: str
+
+class BulkUpdateResult(BaseModel):
+    affected: int
+
 class TransactionResponse(BaseModel):
     id: int
     description: str
@@ -73,6 +179,77 @@ class MonthlySummary(BaseModel):
     expense_total: float
     by_category: List[SummaryItem]
 
+class CategoryPoint(BaseModel):
+    net: float  # income minus expense in the bucket
+    balance: float  # running net since the first transaction, at the end of the bucket
+
+class TimeseriesPoint(BaseModel):
+    bucket: str  # first day of the bucket, 'YYYY-MM-DD'
+    income: float
+    expense: float
+    net: float
+    count: int
+    rolling_7d_expense: float  # spend in the 7 days ending on the bucket's last day
+    rolling_30d_expense: float
+    categories: Dict[str, CategoryPoint]  # categories with activity in the bucket
+
+class RecurringTransaction(BaseModel):
+    id: int  # series id
+    merchant: str
+    description: str  # latest occurrence
+    amount: float  # latest occurrence, signed like transactions
+    transaction_type: str
+    category: Optional[str]
+    frequency: str  # 'weekly', 'biweekly', 'monthly', 'quarterly' or 'yearly'
+    occurrences: int  # in the current run of regular intervals
+    start_date: date  # first occurrence of that run
+    last_date: date
+    next_due_date: date
+    is_active: bool  # False once the next occurrence is overdue
+
+class BudgetCreate(BaseModel):
+    category: Optional[str] = None  # None: all expense categories
+    period: str = Field("month", pattern="^(day|week|month)$")
+    limit: float = Field(gt=0)
+    warn_percentage: float = Field(80, ge=0, le=100)
+
+class BudgetUpdate(BaseModel):
+    limit: Optional[float] = Field(None, gt=0)
+    warn_percentage: Optional[float] = Field(None, ge=0, le=100)
+
+class BudgetStatus(BaseModel):
+    id: int
+    category: Optional[str]
+    period: str
+    limit: float
+    warn_percentage: float
+    period_start: date
+    spent: float  # expenses in the period, rounded to cents
+    remaining: float  # negative once exceeded
+    status: str  # 'ok', 'warning' or 'exceeded'
+
+class TransactionChangeItem(BaseModel):
+    seq: int
+    op: str  # 'insert', 'update' or 'delete'
+    id: int
+    transaction: Optional[TransactionResponse] = None  # None for deletes
+
+class ChangeFeed(BaseModel):
+    changes: List[TransactionChangeItem]
+    cursor: str
+    has_more: bool
+
+class BulkRowResult(BaseModel):
+    row: int
+    status: str  # 'created', 'duplicate' or 'error'
+    detail: Optional[str] = None
+
+class BulkImportResult(BaseModel):
+    created: int
+    duplicates: int
+    errors: int
+    rows: List[BulkRowResult]
+
 # Auto-categorization logic
 CATEGORY_MAP = {
     "Food": ["mcdonald", "burger", "pizza", "starbucks", "coffee", "restaurant", "uber eats", "grubhub", "food"],
@@ -85,46 +262,613 @@ CATEGORY_MAP = {
     "Health": ["pharmacy", "doctor", "hospital", "medical", "gym", "health"],
 }
 
-def auto_categorize(description: str, transaction_type: str) -> str:
-    """Auto-categorize transactions based on description"""
-    desc_lower = description.lower()
+# Compiled once; rebuilt only through set_category_map
+category_matcher = KeywordMatcher(CATEGORY_MAP)
+
+def set_category_map(rules: Dict[str, List[str]]):
+    """Replace the categorization rules and recompile the matcher"""
+    global CATEGORY_MAP, category_matcher
+    CATEGORY_MAP = dict(rules)
+    category_matcher = KeywordMatcher(CATEGORY_MAP)
+
+def default_category(transaction_type: str) -> str:
+    """Category used when no keyword matches"""
+    return "Salary" if transaction_type == "income" else "Other"
+
+def load_category_overrides(session_factory=None) -> List[Tuple[str, str, str]]:
+    db = (session_factory or SessionLocal)()
+    try:
+        return db.query(CategoryOverride.merchant, CategoryOverride.transaction_type, CategoryOverride.category).all()
+    finally:
+        db.close()
+
+category_overrides = CategoryOverrides(load_category_overrides)
+
+def auto_categorize(description: str, transaction_type: str, overrides: Optional[CategoryOverrides] = None) -> str:
+    """Auto-categorize transactions based on description: learned overrides first, then CATEGORY_MAP"""
+    overrides = category_overrides if overrides is None else overrides
+    if len(overrides):
+        override = overrides.get(merchant_key(description), transaction_type)
+        if override:
+            return override
+    return category_matcher.match(description) or default_category(transaction_type)
+
+def auto_categorize_batch(
+    descriptions: List[str],
+    transaction_types: List[str],
+    overrides: Optional[CategoryOverrides] = None,
+) -> List[str]:
+    """Auto-categorize many transactions at once (import and recategorization paths)"""
+    overrides = category_overrides if overrides is None else overrides
+    if not len(overrides):
+        matches = category_matcher.match_many(descriptions)
+        return [
+            category or default_category(transaction_type)
+            for category, transaction_type in zip(matches, transaction_types)
+        ]
     
-    for category, keywords in CATEGORY_MAP.items():
-        if any(keyword in desc_lower for keyword in keywords):
-            return category
+    categories = [
+        overrides.get(merchant_key(description), transaction_type)
+        for description, transaction_type in zip(descriptions, transaction_types)
+    ]
+    pending = [i for i, category in enumerate(categories) if category is None]
+    matches = category_matcher.match_many([descriptions[i] for i in pending])
+    for i, category in zip(pending, matches):
+        categories[i] = category or default_category(transaction_types[i])
+    return categories
+
+DUPLICATE_WINDOW = timedelta(seconds=int(os.getenv("DUPLICATE_WINDOW_SECONDS", "3600")))
+
+# In-memory index of recent (description, amount, transaction_type) keys, consulted
+# before any SQL on create. It is per process: set DUPLICATE_INDEX=0 when several
+# processes write to the same database, to fall back to detect_duplicate.
+duplicate_index = (
+    DuplicateIndex(DUPLICATE_WINDOW)
+    if os.getenv("DUPLICATE_INDEX", "1").lower() not in ("0", "false", "no")
+    else None
+)
+
+class ShardState:
+    """The in-memory indexes of one shard, dropped along with its engine on eviction"""
     
-    # Default categorization by type
-    return "Salary" if transaction_type == "income" else "Other"
+    def __init__(self, shard: Shard):
+        self.duplicate_index = DuplicateIndex(DUPLICATE_WINDOW) if duplicate_index is not None else None
+        self.category_overrides = CategoryOverrides(lambda: load_category_overrides(shard.SessionLocal))
+
+def duplicate_index_for(db: Session) -> Optional[DuplicateIndex]:
+    """The duplicate index of the database db is bound to"""
+    shard = db.info.get("shard")
+    return duplicate_index if shard is None else shard.state.duplicate_index
+
+def overrides_for(db: Session) -> CategoryOverrides:
+    shard = db.info.get("shard")
+    return category_overrides if shard is None else shard.state.category_overrides
+
+def topic_for(db: Session) -> Optional[str]:
+    """Event topic of db's writes: its shard's key, so users only see their own events"""
+    shard = db.info.get("shard")
+    return None if shard is None else shard.key
 
 def detect_duplicate(db: Session, description: str, amount: float, transaction_type: str) -> bool:
-    """Detect duplicate transactions within 1 hour"""
-    one_hour_ago = datetime.utcnow() - timedelta(hours=1)
+    """Detect duplicate transactions within the duplicate window (1 hour by default)"""
+    window_start = datetime.utcnow() - DUPLICATE_WINDOW
     duplicate = db.query(Transaction).filter(
         Transaction.description == description,
         Transaction.amount == amount,
         Transaction.transaction_type == transaction_type,
-        Transaction.timestamp >= one_hour_ago
+        Transaction.timestamp >= window_start
     ).first()
     return duplicate is not None
 
-def get_db():
-    db = SessionLocal()
+def warm_duplicate_index(db: Session):
+    """Load the transactions of the current window into the duplicate index"""
+    recent = db.query(
+        Transaction.description,
+        Transaction.amount,
+        Transaction.transaction_type,
+        Transaction.timestamp,
+    ).filter(Transaction.timestamp >= datetime.utcnow() - DUPLICATE_WINDOW)
+    duplicate_index_for(db).load(
+        ((description, amount, transaction_type), timestamp)
+        for description, amount, transaction_type, timestamp in recent
+    )
+
+def month_range(month: str):
+    """Return the half-open [start, end) timestamp range for a 'YYYY-MM' month"""
     try:
-        yield db
-    finally:
-        db.close()
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="month must be in 'YYYY-MM' format")
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
 
-# API Endpoints
-@app.post("/transactions/", response_model=TransactionResponse)
-def create_transaction(transaction: TransactionCreate, db: Session = next(get_db())):
-    """Add a new transaction with auto-categorization"""
+# (day 'YYYY-MM-DD', transaction_type, category, total, count) change to the rollups
+RollupChange = Tuple[str, str, str, float, int]
+Occurrence = Tuple[str, float, str, Optional[str], datetime]  # description, amount, type, category, timestamp
+
+def upsert_rollups(db: Session, changes: List[RollupChange]) -> List[Dict]:
+    """Add (possibly negative) totals and counts to the daily and monthly rollups
+
+    Changes are merged per rollup row first, so each table gets one executemany;
+    the daily changes also move budget spend (add_budget_spend). Returns the net
+    monthly changes, in the shape pushed to event subscribers.
+    """
+    daily: Dict[Tuple[str, str, str], List[float]] = {}
+    monthly: Dict[Tuple[str, str, str], List[float]] = {}
+    for day, transaction_type, category, total, count in changes:
+        for merged, key in ((daily, (day, transaction_type, category)), (monthly, (day[:7], transaction_type, category))):
+            totals = merged.setdefault(key, [0, 0])
+            totals[0] += total
+            totals[1] += count
+    
+    for model, period, merged in ((DailyRollup, "day", daily), (MonthlyRollup, "month", monthly)):
+        # A zero count means the same rows moved out and back in
+        rows = [
+            {period: key, "transaction_type": transaction_type, "category": category, "total": total, "count": count}
+            for (key, transaction_type, category), (total, count) in merged.items() if count
+        ]
+        if not rows:
+            continue
+        table = model.__table__
+        stmt = sqlite_insert(table)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[period, "transaction_type", "category"],
+            set_={"total": table.c.total + stmt.excluded.total, "count": table.c.count + stmt.excluded.count},
+        ), rows)
+        emptied = [row for row in rows if row["count"] < 0]
+        if emptied:
+            db.execute(table.delete().where(
+                table.c[period] == bindparam(period),
+                table.c.transaction_type == bindparam("transaction_type"),
+                table.c.category == bindparam("category"),
+                table.c.count <= 0,
+            ), [{name: row[name] for name in (period, "transaction_type", "category")} for row in emptied])
+    
+    add_budget_spend(db, daily)
+    return [
+        {"month": month, "transaction_type": transaction_type, "category": category, "total": total, "count": count}
+        for (month, transaction_type, category), (total, count) in monthly.items() if count
+    ]
+
+def apply_rollup(db: Session, tx: Transaction, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a transaction from the rollups"""
+    upsert_rollups(db, [(
+        tx.timestamp.strftime("%Y-%m-%d"),
+        tx.transaction_type,
+        tx.category or "Other",
+        sign * abs(tx.amount),
+        sign,
+    )])
+
+def rollup_groups(db: Session, *conditions, entity=Transaction):
+    """(day, type, category, total, count) of the transactions matching conditions, as in the daily rollup"""
+    day_key = func.strftime("%Y-%m-%d", entity.timestamp)
+    category_key = func.coalesce(entity.category, "Other")
+    return db.query(
+        day_key,
+        entity.transaction_type,
+        category_key,
+        func.sum(func.abs(entity.amount)),
+        func.count(entity.id),
+    ).filter(*conditions).group_by(day_key, entity.transaction_type, category_key)
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute the daily and monthly rollups from the transactions table
+
+    The daily rollup spans archived months too; their monthly rows stay frozen
+    in archived_summaries. Budget spend is recounted from the new daily rollup.
+    Returns the number of monthly rows.
+    """
+    db.execute(delete(DailyRollup))
+    for entity in (Transaction, ArchivedTransaction):  # Never the same day in both
+        db.execute(DailyRollup.__table__.insert().from_select(
+            ["day", "transaction_type", "category", "total", "count"],
+            rollup_groups(db, entity=entity).statement,
+        ))
+    db.execute(delete(RollupCoverage).where(RollupCoverage.rollup == "daily"))
+    
+    month_key = func.substr(DailyRollup.day, 1, 7)
+    db.execute(delete(MonthlyRollup))
+    result = db.execute(MonthlyRollup.__table__.insert().from_select(
+        ["month", "transaction_type", "category", "total", "count"],
+        db.query(
+            month_key, DailyRollup.transaction_type, DailyRollup.category,
+            func.sum(DailyRollup.total), func.sum(DailyRollup.count),
+        ).filter(
+            month_key.notin_(db.query(ArchivedMonth.month))
+        ).group_by(month_key, DailyRollup.transaction_type, DailyRollup.category).statement,
+    ))
+    db.execute(delete(BudgetSpend))
+    for budget in db.query(Budget):
+        count_budget_spend(db, budget)
+    bump_data_version(db)
+    db.commit()
+    return result.rowcount
+
+def encode_cursor(timestamp: datetime, transaction_id: int) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque cursor"""
+    raw = f"{timestamp.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        timestamp, transaction_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(transaction_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_fields(fields: str) -> List[str]:
+    """Validate a comma-separated field projection against TransactionResponse"""
+    selected = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in TransactionResponse.model_fields]
+    if not selected or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or fields}")
+    return selected
+
+# Ranked search scores at most this many of a query's newest matches
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "5000"))
+SEARCH_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+def fts_query(q: str) -> str:
+    """Translate a search box string into an FTS5 MATCH expression
+
+    Words are ANDed, "quoted text" matches as a phrase and a trailing * makes a
+    word a prefix. Everything else is quoted, so user input can never reach
+    the FTS5 query syntax (column filters, NEAR, OR/NOT) or raise a syntax error.
+    """
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(q):
+        prefix = False
+        if not phrase:
+            prefix = word.endswith("*")
+            phrase = word.rstrip("*")
+        if phrase.strip():
+            terms.append('"' + phrase.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise HTTPException(status_code=400, detail="Empty search query")
+    return " ".join(terms)
+
+def search_filter(matches: str, floor: Optional[int] = None, entity=Transaction):
+    """Condition restricting transactions (or archived ones) to those matching an fts_query() expression
+
+    With a floor, only matches with id >= floor are considered.
+    """
+    index = f"{entity.__tablename__}_fts"
+    statement = f"SELECT rowid FROM {index} WHERE {index} MATCH :fts_query"
+    params = {"fts_query": matches}
+    if floor is not None:
+        statement += " AND rowid >= :fts_floor"
+        params["fts_floor"] = floor
+    return entity.id.in_(text(statement).bindparams(**params).columns(column("rowid")))
+
+def search_floor(db: Session, matches: str, window: int, entity=Transaction) -> Optional[int]:
+    """Lowest id among the newest `window` matches by id, or None if there are fewer
+
+    FTS5 walks a term's matches in rowid order without reading the rest, so
+    this costs O(window) however common the term is.
+    """
+    index = f"{entity.__tablename__}_fts"
+    return db.execute(
+        text(f"SELECT rowid FROM {index} WHERE {index} MATCH :fts_query "
+             "ORDER BY rowid DESC LIMIT 1 OFFSET :offset"),
+        {"fts_query": matches, "offset": window - 1},
+    ).scalar()
+
+BULK_BATCH_SIZE = 10000
+
+def naive_utc(value: datetime) -> datetime:
+    """Stored timestamps are naive UTC"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def normalize_import_row(record: Dict) -> Dict:
+    """Validate one uploaded record and shape it as a transactions row"""
+    description = record.get("description")
+    if not isinstance(description, str) or not description:
+        raise ValueError("description is required")
+    
+    transaction_type = record.get("transaction_type")
+    if transaction_type not in ["income", "expense"]:
+        raise ValueError("transaction_type must be 'income' or 'expense'")
     
+    try:
+        amount = abs(float(record.get("amount")))
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number")
+    if not math.isfinite(amount):
+        raise ValueError("amount must be a number")
+    if transaction_type == "expense":
+        amount = -amount
+    
+    timestamp = record.get("timestamp")
+    if timestamp:
+        try:
+            timestamp = datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError("timestamp must be ISO 8601")
+        timestamp = naive_utc(timestamp)
+    else:
+        timestamp = datetime.utcnow()
+    
+    # A missing category is filled in per batch by auto_categorize_batch
+    category = record.get("category") or None
+    return {
+        "description": description,
+        "amount": amount,
+        "transaction_type": transaction_type,
+        "category": category,
+        "auto_tagged": not category,
+        "timestamp": timestamp,
+    }
+
+def find_existing_duplicates(db: Session, keys: List[Tuple[str, float, str]], start: datetime, end: datetime):
+    """Return stored timestamps per (description, amount, type) key within [start, end]"""
+    # Join a temp table of keys against ix_transactions_duplicate_lookup: one indexed probe per key
+    conn = db.connection()
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE IF NOT EXISTS import_keys (description TEXT, amount REAL, transaction_type TEXT)"
+    )
+    conn.exec_driver_sql("DELETE FROM import_keys")
+    conn.exec_driver_sql("INSERT INTO import_keys VALUES (?, ?, ?)", keys)
+    existing = conn.execute(
+        text(
+            "SELECT t.description, t.amount, t.transaction_type, t.timestamp "
+            "FROM import_keys k JOIN transactions t "
+            "ON t.description = k.description AND t.amount = k.amount "
+            "AND t.transaction_type = k.transaction_type "
+            "AND t.timestamp >= :start AND t.timestamp <= :end"
+        ).columns(timestamp=DateTime),
+        {"start": start, "end": end},
+    )
+    
+    seen: Dict[Tuple[str, float, str], List[datetime]] = {}
+    for description, amount, transaction_type, timestamp in existing:
+        seen.setdefault((description, amount, transaction_type), []).append(timestamp)
+    return seen
+
+def lock_for_write(db: Session):
+    """Take SQLite's write lock before a read-then-write transaction
+
+    Upgrading a deferred read transaction fails at once with "database is locked"
+    when another connection committed in between; BEGIN IMMEDIATE waits instead.
+    """
+    conn = db.connection()
+    if conn.dialect.name == "sqlite" and not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def import_batch(db: Session, batch: List[Tuple[Optional[Dict], Optional[str]]], first_row: int) -> List[Tuple]:
+    """Validate, de-duplicate and insert one batch of uploaded records in a single DB transaction
+
+    Returns (row, status, detail) tuples in row order.
+    """
+    results = []
+    candidates = []
+    for row, (record, error) in enumerate(batch, start=first_row):
+        if error is None:
+            try:
+                candidates.append((row, normalize_import_row(record)))
+                continue
+            except ValueError as exc:
+                error = str(exc)
+        results.append((row, "error", error))
+    
+    untagged = [values for _, values in candidates if values["category"] is None]
+    categories = auto_categorize_batch(
+        [values["description"] for values in untagged],
+        [values["transaction_type"] for values in untagged],
+        overrides_for(db),
+    )
+    for values, category in zip(untagged, categories):
+        values["category"] = category
+    
+    # Set-based duplicate check: one lookup for the whole batch, then the batch itself
+    seen: Dict[Tuple[str, float, str], List[datetime]] = {}
+    archived = set()
+    if candidates:
+        lock_for_write(db)
+        months = {values["timestamp"].strftime("%Y-%m") for _, values in candidates}
+        archived = {month for (month,) in db.query(ArchivedMonth.month).filter(ArchivedMonth.month.in_(months))}
+        timestamps = [values["timestamp"] for _, values in candidates]
+        keys = list({(v["description"], v["amount"], v["transaction_type"]) for _, v in candidates})
+        seen = find_existing_duplicates(
+            db, keys, min(timestamps) - DUPLICATE_WINDOW, max(timestamps) + DUPLICATE_WINDOW
+        )
+    
+    rows = []
+    stored = []
+    rollup: List[RollupChange] = []
+    occurrences: List[Occurrence] = []
+    for row, values in candidates:
+        timestamp = values["timestamp"]
+        if archived and timestamp.strftime("%Y-%m") in archived:
+            results.append((row, "error", f"Month {timestamp:%Y-%m} is archived"))
+            continue
+        key = (values["description"], values["amount"], values["transaction_type"])
+        previous = seen.setdefault(key, [])
+        if any(abs(timestamp - other) < DUPLICATE_WINDOW for other in previous):
+            results.append((row, "duplicate", "Duplicate transaction detected"))
+            continue
+        previous.append(timestamp)
+        stored.append((key, timestamp))
+        results.append((row, "created", None))
+        
+        # Same text format SQLAlchemy uses for SQLite DateTime columns
+        stored_timestamp = timestamp.isoformat(" ", "microseconds")
+        rows.append((*key, values["category"], values["auto_tagged"], stored_timestamp))
+        rollup.append((stored_timestamp[:10], key[2], values["category"], abs(key[1]), 1))
+        occurrences.append((*key, values["category"], timestamp))
+    
+    if rows:
+        conn = db.connection()
+        # New ids are above the current maximum, with or without AUTOINCREMENT
+        last_id = conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM transactions").scalar()
+        conn.exec_driver_sql("INSERT INTO bulk_inserts (id) VALUES (1)")
+        # Plain DBAPI executemany: skips per-row parameter processing in the ORM/Core layers
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.exec_driver_sql("DELETE FROM bulk_inserts")
+        # What the skipped insert triggers do, once per batch
+        conn.exec_driver_sql(
+            "INSERT INTO transactions_fts (rowid, description) SELECT id, description FROM transactions WHERE id > ?",
+            (last_id,),
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transaction_changes (transaction_id, op) "
+            "SELECT id, 'insert' FROM transactions WHERE id > ? ORDER BY id",
+            (last_id,),
+        )
+        bump_data_version(db)
+        deltas = upsert_rollups(db, rollup)
+        observe_recurring(db, occurrences)
+        db.commit()
+        record_write()
+        index = duplicate_index_for(db)
+        if index is not None and index.warm:
+            for key, timestamp in stored:
+                index.add(key, timestamp)
+        # One event per batch rather than per row
+        event_broker.publish("imported", {"created": len(rows), "deltas": deltas}, topic_for(db))
+    
+    results.sort()
+    return results
+
+# Instrumentation: latency histograms and SQL counters per route, served on /metrics.
+# METRICS_SERVER_TIMING=1 adds a Server-Timing header; SLOW_REQUEST_MS=<ms> logs the
+# SQL statements of any request slower than the threshold.
+metrics = MetricsRegistry()
+SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.environ["SLOW_REQUEST_MS"]) if os.getenv("SLOW_REQUEST_MS") else None
+slow_request_log = logging.getLogger("finance.slow_requests")
+
+# Read caching: the ETags and cached bodies of the endpoints below are keyed by the
+# database's data version (models.DataVersion), which triggers bump in the same DB
+# transaction as every change to transaction rows, whichever process makes it
+CACHED_PATHS = {"/transactions/", "/transactions/search", "/transactions/summary", "/analytics/timeseries"}
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_SIZE", "256")))
+
+def read_data_version(user: Optional[str] = None) -> int:
+    """Current data version of the database (or the user's shard); one primary-key read"""
+    statement = select(DataVersion.version).where(DataVersion.id == 1)
+    if shard_router is None:
+        with engine.connect() as connection:
+            return connection.execute(statement).scalar_one()
+    with shard_router.lease(user) as shard, shard.engine.connect() as connection:
+        return connection.execute(statement).scalar_one()
+
+def bump_data_version(db: Session):
+    """For writes the triggers do not see, such as rebuilt rollups"""
+    db.execute(update(DataVersion).values(version=DataVersion.version + 1))
+
+def record_write():
+    """Drop cached bodies after a committed write; their keys are stale anyway, this frees the memory"""
+    response_cache.clear()
+
+# Push: committed writes are published to /transactions/stream subscribers with
+# the change they made to the monthly rollup
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+event_broker = EventBroker(EVENT_QUEUE_SIZE)
+
+def rollup_delta(tx: Transaction, sign: int = 1) -> Dict:
+    """The change apply_rollup(tx, sign) makes, as pushed to subscribers"""
+    return {
+        "month": tx.timestamp.strftime("%Y-%m"),
+        "transaction_type": tx.transaction_type,
+        "category": tx.category or "Other",
+        "total": sign * abs(tx.amount),
+        "count": sign,
+    }
+
+def publish_transaction_event(db: Session, event_type: str, transaction: TransactionResponse, deltas: List[Dict]):
+    event_broker.publish(event_type, {"transaction": jsonable_encoder(transaction), "deltas": deltas}, topic_for(db))
+
+# Multi-user mode: shards are opened on a user's first request, brought to the
+# latest Alembic revision, and kept in an LRU of SHARD_CACHE_SIZE open engines
+SHARD_CACHE_SIZE = int(os.getenv("SHARD_CACHE_SIZE", "64"))
+SHARD_POOL_SIZE = int(os.getenv("SHARD_POOL_SIZE", "2"))
+USER_HEADER = "X-User-Id"
+
+def open_shard(shard: Shard):
+    shard.state = ShardState(shard)
+    if RETAG_WORKER:
+        # Resume whatever re-tagging was left unfinished when the shard was last open
+        with retag_shards_lock:
+            retag_shards.add(shard.key)
+        retag_wakeup.set()
+
+def create_shard_router(directory: str, capacity: int = SHARD_CACHE_SIZE) -> ShardRouter:
+    return ShardRouter(
+        directory,
+        open_engine=lambda path: create_db_engine(f"sqlite:///{path}", pool_size=SHARD_POOL_SIZE),
+        migrate=AlembicMigrator(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic")),
+        capacity=capacity,
+        on_open=open_shard,
+    )
+
+shard_router: Optional[ShardRouter] = create_shard_router(SHARD_DIR) if SHARD_DIR else None
+
+def request_user(request: Request) -> str:
+    """The shard key of a request in multi-user mode"""
+    user = request.headers.get(USER_HEADER)
+    if not user:
+        raise HTTPException(status_code=400, detail=f"{USER_HEADER} header is required")
+    if not SHARD_KEY.match(user):
+        raise HTTPException(status_code=400, detail=f"Invalid {USER_HEADER} header")
+    return user
+
+def get_db(request: Request):
+    if shard_router is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    else:
+        with shard_router.session(request_user(request)) as db:
+            yield db
+
+# Created on first use so the sync default never loads the async driver
+AsyncSessionLocal = None
+
+async def get_async_db():
+    global AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        AsyncSessionLocal = async_sessionmaker(create_async_db_engine(), expire_on_commit=False)
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Endpoint implementations, shared by the sync handlers and (through
+# AsyncSession.run_sync) the async ones
+def save_transaction(db: Session, transaction: TransactionCreate) -> Transaction:
+    """Validate, de-duplicate, categorize and store a new transaction"""
     # Validate transaction type
     if transaction.transaction_type not in ["income", "expense"]:
         raise HTTPException(status_code=400, detail="transaction_type must be 'income' or 'expense'")
     
-    # Check for duplicates
-    if detect_duplicate(db, transaction.description, transaction.amount, transaction.transaction_type):
+    # Store negative values for expenses
+    amount = abs(transaction.amount)
+    if transaction.transaction_type == "expense":
+        amount = -amount
+    
+    # Check for duplicates (against the stored, signed amount)
+    timestamp = datetime.utcnow()
+    key = (transaction.description, amount, transaction.transaction_type)
+    index = duplicate_index_for(db)
+    if index is not None:
+        if not index.warm:
+            warm_duplicate_index(db)
+        if not index.reserve(key, timestamp):
+            raise HTTPException(status_code=400, detail="Duplicate transaction detected")
+    elif detect_duplicate(db, *key):
         raise HTTPException(status_code=400, detail="Duplicate transaction detected")
     
     # Auto-categorize if not provided
@@ -132,78 +876,276 @@ def create_transaction(transaction: TransactionCreate, db: Session = next(get_db
         category = transaction.category
         auto_tagged = False
     else:
-        category = auto_categorize(transaction.description, transaction.transaction_type)
+        category = auto_categorize(transaction.description, transaction.transaction_type, overrides_for(db))
         auto_tagged = True
     
-    # Store negative values for expenses
-    amount = abs(transaction.amount)
-    if transaction.transaction_type == "expense":
-        amount = -amount
-    
     db_transaction = Transaction(
         description=transaction.description,
         amount=amount,
         transaction_type=transaction.transaction_type,
         category=category,
-        auto_tagged=auto_tagged
+        auto_tagged=auto_tagged,
+        timestamp=timestamp
     )
-    db.add(db_transaction)
-    db.commit()
+    try:
+        db.add(db_transaction)
+        db.flush()
+        apply_rollup(db, db_transaction)
+        observe_recurring(db, [(transaction.description, amount, transaction.transaction_type, category, timestamp)])
+        db.commit()
+    except Exception:
+        if index is not None:
+            index.discard(key, timestamp)
+        raise
+    record_write()
     db.refresh(db_transaction)
+    publish_transaction_event(
+        db,
+        "created", TransactionResponse.model_validate(db_transaction), [rollup_delta(db_transaction)]
+    )
     return db_transaction
 
-@app.get("/transactions/", response_model=List[TransactionResponse])
-def get_transactions(
+def search_rows(query, matches: str, limit: Optional[int], entity=Transaction) -> List:
+    """Run an ordered list query restricted to rows matching an fts_query() expression
+
+    Building the full match set of a common word costs O(matches), so a page is
+    first looked for among the newest matches by id: ids mostly follow
+    timestamps, and the window is accepted once it fills the page and no row
+    outside it sorts ahead of the page's last row (an index range check). The
+    window grows otherwise, ending at the full match set.
+    """
+    window = 8 * (limit + 1) if limit is not None else None
+    while window is not None:
+        floor = search_floor(query.session, matches, window, entity)
+        if floor is None:
+            break
+        rows = query.filter(search_filter(matches, floor, entity)).limit(limit + 1).all()
+        if len(rows) > limit:
+            # Conservative: any row that could sort ahead, whether it matches or not
+            ahead = query.filter(entity.id < floor, entity.timestamp > rows[-1].timestamp).first()
+            if ahead is None:
+                return rows
+        window *= 4
+    query = query.filter(search_filter(matches, entity=entity))
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query.all()
+
+def archive_horizon(db: Session, month: Optional[str] = None, before: Optional[datetime] = None) -> Optional[datetime]:
+    """End of the newest archived month a listing can reach, or None if it needs no archived rows"""
+    query = db.query(ArchivedMonth.month)
+    if month:
+        query = query.filter(ArchivedMonth.month == month)
+    elif before is not None:
+        query = query.filter(ArchivedMonth.month <= before.strftime("%Y-%m"))
+    newest = query.order_by(ArchivedMonth.month.desc()).limit(1).scalar()
+    return month_range(newest)[1] if newest else None
+
+# Streaming fast path for large listings: opt in with ?stream=true, or by accepting NDJSON
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "1000"))
+
+def stream_format(request: Request) -> Optional[str]:
+    """'ndjson' or 'json' when the request asks for the streaming path, else None"""
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "ndjson"
+    if request.query_params.get("stream", "").lower() in ("1", "true", "on", "yes"):
+        return "json"
+    return None
+
+def encode_chunk(names: List[str], rows: List, ndjson: bool) -> bytes:
+    """Rows (column tuples in names order) as a JSON array or NDJSON lines, byte for byte as JSONResponse writes them
+
+    orjson writes floats outside [1e-4, 1e16) without Python's exponent form
+    (1e16 rather than 1e+16), so a chunk holding such an amount goes through json.
+    """
+    positions = list(enumerate(names))  # indexing a Row is cheaper than iterating it
+    records = [{name: row[i] for i, name in positions} for row in rows]
+    if "amount" in names:
+        at = names.index("amount")
+        exact = all(1e-4 <= abs(row[at]) < 1e16 or row[at] == 0 for row in rows)
+    else:
+        exact = True
+    if exact:
+        if ndjson:
+            return b"".join([orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records])
+        return orjson.dumps(records)
+    
+    def render(content) -> bytes:  # as JSONResponse.render
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+    
+    if ndjson:
+        return b"".join([render(record) + b"\n" for record in records])
+    return render(records)
+
+def stream_rows(names: List[str], rows: List, ndjson: bool) -> Iterator[bytes]:
+    """Encode rows STREAM_CHUNK_ROWS at a time, so the first bytes go out before the last row is encoded"""
+    if not ndjson:
+        yield b"["
+    for start in range(0, len(rows), STREAM_CHUNK_ROWS):
+        chunk = encode_chunk(names, rows[start:start + STREAM_CHUNK_ROWS], ndjson)
+        yield chunk if ndjson else (b"," if start else b"") + chunk[1:-1]
+    if not ndjson:
+        yield b"]"
+
+def list_transactions(
+    db: Session,
     month: Optional[str] = None,
     transaction_type: Optional[str] = None,
     category: Optional[str] = None,
-    db: Session = next(get_db())
-):
-    """Get all transactions with optional filters"""
-    query = db.query(Transaction)
-    
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    q: Optional[str] = None,
+    stream: Optional[str] = None
+) -> Response:
+    """Query transactions with filters, full-text search, keyset pagination and field projection
+
+    Archived months are read too, but only when the page can reach them.
+    With stream ('json' or 'ndjson', see stream_format()) rows are read as plain
+    column tuples and encoded by stream_rows() instead of through the models.
+    """
+    selected = parse_fields(fields) if fields else None
+    names = list(dict.fromkeys(selected)) if selected else None
+    if stream and not names:
+        names = list(TransactionResponse.model_fields)
+    # The keyset columns are always read so the next cursor can be built
+    columns = list(dict.fromkeys(names + ["timestamp", "id"])) if names else None
     if month:  # Format: 'YYYY-MM'
-        query = query.filter(func.strftime("%Y-%m", Transaction.timestamp) == month)
-    if transaction_type:
-        query = query.filter(Transaction.transaction_type == transaction_type)
-    if category:
-        query = query.filter(Transaction.category == category)
+        start, end = month_range(month)
+    matches = fts_query(q) if q is not None else None
+    after_timestamp = after_id = None
+    if after:
+        after_timestamp, after_id = decode_cursor(after)
+    
+    def fetch(entity) -> List:
+        if columns:
+            query = db.query(*[getattr(entity, name) for name in columns])
+        else:
+            query = db.query(entity)
+        if month:
+            query = query.filter(entity.timestamp >= start, entity.timestamp < end)
+        if transaction_type:
+            query = query.filter(entity.transaction_type == transaction_type)
+        if category:
+            query = query.filter(entity.category == category)
+        if after:
+            query = query.filter(
+                entity.timestamp <= after_timestamp,
+                tuple_(entity.timestamp, entity.id) < tuple_(after_timestamp, after_id)
+            )
+        query = query.order_by(entity.timestamp.desc(), entity.id.desc())
+        if matches is not None:
+            return search_rows(query, matches, limit, entity)
+        if limit is not None:
+            return query.limit(limit + 1).all()
+        return query.all()
+    
+    rows = fetch(Transaction)
+    horizon = archive_horizon(db, start.strftime("%Y-%m") if month else None, after_timestamp)
+    # Archived rows all sort after the horizon, so a page filled before it is complete
+    if horizon is not None and (limit is None or len(rows) <= limit or rows[limit].timestamp < horizon):
+        rows = list(heapq.merge(
+            rows, fetch(ArchivedTransaction), key=lambda row: (row.timestamp, row.id), reverse=True
+        ))
+    
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
     
-    return query.order_by(Transaction.timestamp.desc()).all()
+    if stream:
+        response = StreamingResponse(
+            stream_rows(names, rows, stream == "ndjson"),
+            media_type=NDJSON_MEDIA_TYPE if stream == "ndjson" else "application/json",
+        )
+    elif selected:
+        response = JSONResponse(content=jsonable_encoder([{name: getattr(row, name) for name in selected} for row in rows]))
+    else:
+        response = JSONResponse(content=jsonable_encoder([TransactionResponse.model_validate(row) for row in rows]))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
-@app.get("/transactions/summary", response_model=List[MonthlySummary])
-def get_summary(db: Session = next(get_db())):
-    """Get monthly income/expense summary grouped by category"""
-    transactions = db.query(Transaction).all()
+def search_transactions(db: Session, q: str, limit: int = 50, offset: int = 0) -> List[Transaction]:
+    """Transactions whose description matches q, best match first (bm25), then newest
+
+    bm25 is computed for every candidate, so a very common word is ranked
+    within its SEARCH_RANK_WINDOW newest matches only (per table, when months
+    are archived).
+    """
+    matches = fts_query(q)
+    
+    def ranked(entity):
+        table = entity.__tablename__
+        statement = text(
+            f"SELECT {table}.*, {table}_fts.rank AS search_rank FROM {table}_fts "
+            f"JOIN {table} ON {table}.id = {table}_fts.rowid "
+            f"WHERE {table}_fts MATCH :fts_query AND {table}_fts.rowid >= :floor "
+            f"ORDER BY {table}_fts.rank, {table}.timestamp DESC, {table}.id DESC "
+            "LIMIT :limit OFFSET :offset"
+        ).bindparams(fts_query=matches, floor=search_floor(db, matches, SEARCH_RANK_WINDOW, entity) or 0)
+        return db.query(entity, column("search_rank")).from_statement(statement)
+    
+    if archive_horizon(db) is None:
+        return [row for row, _ in ranked(Transaction).params(limit=limit, offset=offset)]
+    # Both tables' first offset + limit matches, merged in the same order
+    rows = heapq.merge(
+        *(ranked(entity).params(limit=offset + limit, offset=0) for entity in (Transaction, ArchivedTransaction)),
+        key=lambda pair: (pair[1], datetime.max - pair[0].timestamp, -pair[0].id),
+    )
+    return [row for row, _ in rows][offset:offset + limit]
+
+def summarize_months(db: Session, from_month: Optional[str] = None, to_month: Optional[str] = None) -> List[MonthlySummary]:
+    """Build monthly summaries from the rollup table, and the frozen summaries of archived months in range"""
+    # Bounds are inclusive months (Format: 'YYYY-MM')
+    if from_month:
+        month_range(from_month)
+    if to_month:
+        month_range(to_month)
+    
+    def fetch(entity) -> List:
+        query = db.query(entity.month, entity.transaction_type, entity.category, entity.total, entity.count)
+        if from_month:
+            query = query.filter(entity.month >= from_month)
+        if to_month:
+            query = query.filter(entity.month <= to_month)
+        return query.order_by(entity.month.desc(), entity.category).all()
+    
+    rows = fetch(MonthlyRollup)
+    archived = db.query(ArchivedMonth.month)
+    if from_month:
+        archived = archived.filter(ArchivedMonth.month >= from_month)
+    if to_month:
+        archived = archived.filter(ArchivedMonth.month <= to_month)
+    if archived.first() is not None:
+        # Archived and live months never overlap
+        rows = list(heapq.merge(rows, fetch(ArchivedSummary), key=lambda row: row.month, reverse=True))
     
     summary_dict = {}
-    for tx in transactions:
-        month_key = tx.timestamp.strftime("%Y-%m")
-        if month_key not in summary_dict:
-            summary_dict[month_key] = {
+    for month, transaction_type, category, total, count in rows:
+        if month not in summary_dict:
+            summary_dict[month] = {
                 "income_total": 0,
                 "expense_total": 0,
                 "by_category": {}
             }
         
-        category = tx.category or "Other"
-        amount = abs(tx.amount)
-        
-        if tx.transaction_type == "income":
-            summary_dict[month_key]["income_total"] += amount
-            if category not in summary_dict[month_key]["by_category"]:
-                summary_dict[month_key]["by_category"][category] = {"total": 0, "count": 0}
-            summary_dict[month_key]["by_category"][category]["total"] += amount
-            summary_dict[month_key]["by_category"][category]["count"] += 1
+        if transaction_type == "income":
+            summary_dict[month]["income_total"] += total
         else:
-            summary_dict[month_key]["expense_total"] += amount
-            if category not in summary_dict[month_key]["by_category"]:
-                summary_dict[month_key]["by_category"][category] = {"total": 0, "count": 0}
-            summary_dict[month_key]["by_category"][category]["total"] += amount
-            summary_dict[month_key]["by_category"][category]["count"] += 1
+            summary_dict[month]["expense_total"] += total
+        
+        by_category = summary_dict[month]["by_category"]
+        if category not in by_category:
+            by_category[category] = {"total": 0, "count": 0}
+        by_category[category]["total"] += total
+        by_category[category]["count"] += count
     
     result = []
-    for month, data in sorted(summary_dict.items(), reverse=True):
+    for month, data in summary_dict.items():
         by_category = [
             SummaryItem(category=cat, total=info["total"], count=info["count"])
             for cat, info in data["by_category"].items()
@@ -217,34 +1159,1161 @@ def get_summary(db: Session = next(get_db())):
     
     return result
 
-@app.delete("/transactions/{transaction_id}")
-def delete_transaction(transaction_id: int, db: Session = next(get_db())):
-    """Delete a transaction"""
+# Bucket start for a 'YYYY-MM-DD' day column; weeks start on Monday
+TIMESERIES_BUCKETS = {
+    "day": "day",
+    "week": "date(day, '-6 days', 'weekday 1')",
+    "month": "strftime('%Y-%m-01', day)",
+}
+MAX_TIMESERIES_DAYS = 366 * 50
+
+def daily_source(db: Session) -> Tuple[str, str, Dict]:
+    """CTE body for (day, transaction_type, category, total, count) rows over all
+    history, and SQL for the first and last day they cover
+
+    Read from the daily rollup, with days before its coverage aggregated from
+    transactions on the fly.
+    """
+    rollup = "SELECT day, transaction_type, category, total, count FROM daily_rollups"
+    bounds = "SELECT MIN(day) AS first, MAX(day) AS last FROM daily_rollups"
+    coverage = db.get(RollupCoverage, "daily")
+    if coverage is None:
+        return f"NOT MATERIALIZED ({rollup})", bounds, {}
+    # Materialized: the on-the-fly aggregation runs once however often it is read
+    return (
+        "MATERIALIZED (" + rollup + " WHERE day >= :covered_from UNION ALL "
+        "SELECT strftime('%Y-%m-%d', timestamp), transaction_type, COALESCE(category, 'Other'), "
+        "SUM(ABS(amount)), COUNT(*) FROM transactions WHERE timestamp < :covered_from GROUP BY 1, 2, 3)",
+        "SELECT MIN(first), MAX(last) FROM (" + bounds + " WHERE day >= :covered_from UNION ALL "
+        "SELECT date(MIN(timestamp)), date(MAX(timestamp)) FROM transactions WHERE timestamp < :covered_from)",
+        {"covered_from": coverage.start_day},
+    )
+
+def build_timeseries(
+    db: Session,
+    bucket: str = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None
+) -> Response:
+    """Income, expense, rolling spend and per-category running balances per bucket
+
+    One SQL statement over the daily rows: rolling sums with window frames over a
+    dense day series, running balances with a per-category window, and the JSON
+    itself built by SQLite. Buckets cut by start/end only count their days
+    inside the range. Defaults to the whole history.
+    """
+    source, bounds, params = daily_source(db)
+    if start is None or end is None:
+        first, last = db.execute(text(bounds), params).one()
+        if first is None:
+            return Response(content="[]", media_type="application/json")
+        start = start or date.fromisoformat(first)
+        end = end or date.fromisoformat(last)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_TIMESERIES_DAYS:
+        raise HTTPException(status_code=400, detail="Range too long")
+    
+    bucket_key = TIMESERIES_BUCKETS[bucket]
+    params = {**params, "start": start.isoformat(), "end": end.isoformat()}
+    points = db.execute(text(f"""
+        WITH RECURSIVE daily AS {source},
+        days(day) AS (
+            SELECT date(:start, '-29 days')
+            UNION ALL SELECT date(day, '+1 day') FROM days WHERE day < :end
+        ),
+        per_day AS (
+            SELECT day,
+                SUM(CASE WHEN transaction_type = 'income' THEN total ELSE 0 END) AS income,
+                SUM(CASE WHEN transaction_type = 'income' THEN 0 ELSE total END) AS expense,
+                SUM(count) AS count
+            FROM daily WHERE day >= date(:start, '-29 days') AND day <= :end
+            GROUP BY day
+        ),
+        rolling AS (
+            SELECT day, {bucket_key} AS bucket,
+                COALESCE(income, 0) AS income, COALESCE(expense, 0) AS expense, COALESCE(count, 0) AS count,
+                SUM(COALESCE(expense, 0)) OVER (ORDER BY day ROWS 6 PRECEDING) AS rolling_7d,
+                SUM(COALESCE(expense, 0)) OVER (ORDER BY day ROWS 29 PRECEDING) AS rolling_30d
+            FROM days LEFT JOIN per_day USING (day)
+        ),
+        in_range AS (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY bucket ORDER BY day DESC) AS from_end
+            FROM rolling WHERE day >= :start
+        ),
+        totals AS (
+            SELECT bucket, SUM(income) AS income, SUM(expense) AS expense, SUM(count) AS count,
+                MAX(CASE WHEN from_end = 1 THEN rolling_7d END) AS rolling_7d,
+                MAX(CASE WHEN from_end = 1 THEN rolling_30d END) AS rolling_30d
+            FROM in_range GROUP BY bucket
+        ),
+        -- Days before the range collapse into one opening bucket ('' sorts first), so a
+        -- running sum over buckets is each category's balance at every bucket end
+        per_category AS (
+            SELECT CASE WHEN day < :start THEN '' ELSE {bucket_key} END AS bucket, category,
+                SUM(CASE WHEN transaction_type = 'income' THEN total ELSE -total END) AS net
+            FROM daily WHERE day <= :end
+            GROUP BY 1, 2
+        ),
+        running AS (
+            SELECT bucket, category, net,
+                SUM(net) OVER (PARTITION BY category ORDER BY bucket ROWS UNBOUNDED PRECEDING) AS balance
+            FROM per_category
+        ),
+        categories AS (
+            SELECT bucket, json_group_object(
+                category, json_object('net', ROUND(net, 2), 'balance', ROUND(balance, 2))
+            ) AS categories
+            FROM running WHERE bucket != '' GROUP BY bucket
+        )
+        SELECT json_object(
+            'bucket', bucket, 'income', ROUND(income, 2), 'expense', ROUND(expense, 2),
+            'net', ROUND(income - expense, 2), 'count', count,
+            'rolling_7d_expense', ROUND(rolling_7d, 2), 'rolling_30d_expense', ROUND(rolling_30d, 2),
+            'categories', json(COALESCE(categories.categories, '{{}}'))
+        )
+        FROM totals LEFT JOIN categories USING (bucket) ORDER BY bucket
+    """), params).scalars().all()
+    return Response(content="[" + ",".join(points) + "]", media_type="application/json")
+
+def list_changes(db: Session, since: Optional[str] = None, limit: int = 1000) -> ChangeFeed:
+    """Changes to transactions after the `since` cursor, one entry per transaction
+
+    Without a cursor, returns no changes and the current cursor: take it before
+    a full download, then follow the feed from there.
+    """
+    if since is None:
+        latest = db.query(func.max(TransactionChange.seq)).scalar() or 0
+        return ChangeFeed(changes=[], cursor=str(latest), has_more=False)
+    if not since.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    log = (
+        db.query(TransactionChange.seq, TransactionChange.transaction_id, TransactionChange.op)
+        .filter(TransactionChange.seq > int(since))
+        .order_by(TransactionChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(log) > limit
+    log = log[:limit]
+    
+    # Collapse to the latest change per transaction; an insert followed by updates stays an insert
+    latest: Dict[int, Tuple[int, str]] = {}
+    for seq, transaction_id, op in log:
+        previous = latest.pop(transaction_id, None)
+        if previous and previous[1] == "insert" and op == "update":
+            op = "insert"
+        latest[transaction_id] = (seq, op)
+    
+    live = [transaction_id for transaction_id, (_, op) in latest.items() if op != "delete"]
+    rows = {row.id: row for row in db.query(Transaction).filter(Transaction.id.in_(live))} if live else {}
+    moved = [transaction_id for transaction_id in live if transaction_id not in rows]
+    if moved:
+        # Archived since they were logged; archiving itself is not a change
+        rows.update((row.id, row) for row in db.query(ArchivedTransaction).filter(ArchivedTransaction.id.in_(moved)))
+    
+    changes = []
+    for transaction_id, (seq, op) in latest.items():
+        row = rows.get(transaction_id)
+        if row is None:
+            # Deleted later in the log, possibly beyond this page
+            changes.append(TransactionChangeItem(seq=seq, op="delete", id=transaction_id))
+        else:
+            changes.append(TransactionChangeItem(
+                seq=seq, op=op, id=transaction_id, transaction=TransactionResponse.model_validate(row)
+            ))
+    cursor = str(log[-1].seq) if log else since
+    return ChangeFeed(changes=changes, cursor=cursor, has_more=has_more)
+
+def selection_conditions(selection: BulkSelection) -> List:
+    """WHERE clauses for a bulk request; refuses an empty selection"""
+    if (selection.ids is None) == (selection.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or filter")
+    if selection.ids is not None:
+        return [Transaction.id.in_(selection.ids)]
+    
+    where = selection.filter
+    conditions = []
+    if where.description:
+        conditions.append(Transaction.description.like(where.description))
+    if where.category:
+        conditions.append(Transaction.category == where.category)
+    if where.start is not None:
+        conditions.append(Transaction.timestamp >= naive_utc(where.start))
+    if where.end is not None:
+        conditions.append(Transaction.timestamp < naive_utc(where.end))
+    if where.auto_tagged is not None:
+        conditions.append(Transaction.auto_tagged == where.auto_tagged)
+    if not conditions:
+        raise HTTPException(status_code=400, detail="filter needs at least one condition")
+    return conditions
+
+def reclassify_many(db: Session, request: BulkReclassifyRequest) -> Dict:
+    """Set the category of every selected transaction with one UPDATE"""
+    conditions = selection_conditions(request)
+    lock_for_write(db)
+    groups = rollup_groups(db, *conditions).all()
+    if not groups:
+        db.rollback()
+        return {"affected": 0}
+    
+    # Move the totals from the old categories to the new one in the rollups
+    changes = []
+    for day, transaction_type, category, total, count in groups:
+        changes.append((day, transaction_type, category, -total, -count))
+        changes.append((day, transaction_type, request.category, total, count))
+    deltas = upsert_rollups(db, changes)
+    
+    result = db.execute(
+        update(Transaction).where(*conditions).values(category=request.category, auto_tagged=False),
+        execution_options={"synchronize_session": False},
+    )
+    db.commit()
+    record_write()
+    event_broker.publish("bulk_reclassified", {"affected": result.rowcount, "deltas": deltas}, topic_for(db))
+    return {"affected": result.rowcount}
+
+def delete_many(db: Session, selection: BulkSelection) -> Dict:
+    """Delete every selected transaction with one DELETE"""
+    conditions = selection_conditions(selection)
+    lock_for_write(db)
+    groups = rollup_groups(db, *conditions).all()
+    if not groups:
+        db.rollback()
+        return {"affected": 0}
+    
+    deltas = upsert_rollups(db, [
+        (day, transaction_type, category, -total, -count)
+        for day, transaction_type, category, total, count in groups
+    ])
+    # Deleted rows still inside the duplicate window have to leave the index too
+    recent = []
+    index = duplicate_index_for(db)
+    if index is not None:
+        recent = db.query(
+            Transaction.description, Transaction.amount, Transaction.transaction_type, Transaction.timestamp
+        ).filter(*conditions, Transaction.timestamp >= datetime.utcnow() - DUPLICATE_WINDOW).all()
+    
+    result = db.execute(delete(Transaction).where(*conditions), execution_options={"synchronize_session": False})
+    db.commit()
+    record_write()
+    for description, amount, transaction_type, timestamp in recent:
+        index.discard((description, amount, transaction_type), timestamp)
+    event_broker.publish("bulk_deleted", {"affected": result.rowcount, "deltas": deltas}, topic_for(db))
+    return {"affected": result.rowcount}
+
+# Archiving: closed months move out of the hot transactions table, ids kept, and their
+# monthly rollup rows are frozen into archived_summaries. Listings and summaries read
+# them back only for ranges that reach them. Archived months are read-only; the daily
+# rollup keeps their days so the time series is unaffected.
+ARCHIVE_COLUMNS = ["id", "description", "amount", "transaction_type", "category", "auto_tagged", "timestamp"]
+SUMMARY_COLUMNS = ["month", "transaction_type", "category", "total", "count"]
+
+def archive_range(first_month: str, last_month: str) -> Tuple[str, str, datetime, datetime]:
+    """Normalized inclusive month bounds and the matching [start, end) timestamps"""
+    start, _ = month_range(first_month)
+    last_start, end = month_range(last_month)
+    if start > last_start:
+        raise ValueError("The first month is after the last month")
+    return start.strftime("%Y-%m"), last_start.strftime("%Y-%m"), start, end
+
+def forget_changes(db: Session, since: int):
+    """Drop the change log entries written since `since`: moving rows between the hot
+    and archived tables changes nothing for change feed consumers"""
+    db.execute(delete(TransactionChange).where(TransactionChange.seq > since))
+
+def move_rows(db: Session, source, target, first: str, last: str, start: datetime, end: datetime) -> int:
+    """Move the rows and monthly summaries of a month range between the hot and archived tables"""
+    since = db.query(func.max(TransactionChange.seq)).scalar() or 0
+    in_range = (source.timestamp >= start, source.timestamp < end)
+    moved = db.execute(target.__table__.insert().from_select(
+        ARCHIVE_COLUMNS, db.query(*[getattr(source, name) for name in ARCHIVE_COLUMNS]).filter(*in_range).statement
+    )).rowcount
+    db.execute(delete(source).where(*in_range), execution_options={"synchronize_session": False})
+    forget_changes(db, since)
+    
+    summaries, frozen = (MonthlyRollup, ArchivedSummary) if source is Transaction else (ArchivedSummary, MonthlyRollup)
+    months = (summaries.month >= first, summaries.month <= last)
+    db.execute(frozen.__table__.insert().from_select(
+        SUMMARY_COLUMNS, db.query(*[getattr(summaries, name) for name in SUMMARY_COLUMNS]).filter(*months).statement
+    ))
+    db.execute(delete(summaries).where(*months), execution_options={"synchronize_session": False})
+    # A bulk move leaves the search indexes full of delete markers that every MATCH
+    # would read through; merging them costs a few seconds per million rows, once
+    for table in SEARCHABLE_TABLES:
+        db.execute(text(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('optimize')"))
+    return moved
+
+def ids_never_reused(db: Session) -> bool:
+    """Whether transactions was created with AUTOINCREMENT
+
+    create_all leaves an existing table alone, so only migration 008 rebuilds
+    older ones. Without it a new row can take the id of an archived one.
+    """
+    schema = db.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'")
+    ).scalar()
+    return schema is None or "AUTOINCREMENT" in schema.upper()
+
+def archive_months(db: Session, first_month: str, last_month: str) -> Dict:
+    """Archive the closed months in [first_month, last_month]"""
+    first, last, start, end = archive_range(first_month, last_month)
+    if last >= datetime.utcnow().strftime("%Y-%m"):
+        raise ValueError("Only closed months (before the current one) can be archived")
+    lock_for_write(db)
+    if db.get(RollupCoverage, "daily") is not None:
+        db.rollback()
+        raise ValueError("The daily rollup is incomplete; run scripts/rebuild_rollups.py first")
+    if not ids_never_reused(db):
+        db.rollback()
+        raise ValueError("transactions hands out the ids of deleted rows again; run `alembic upgrade head` first")
+    months = [
+        (month, count) for month, count in db.query(MonthlyRollup.month, func.sum(MonthlyRollup.count))
+        .filter(MonthlyRollup.month >= first, MonthlyRollup.month <= last)
+        .group_by(MonthlyRollup.month)
+    ]
+    if not months:
+        db.rollback()
+        return {"months": [], "transactions": 0}
+    
+    moved = move_rows(db, Transaction, ArchivedTransaction, first, last, start, end)
+    now = datetime.utcnow()
+    db.add_all([ArchivedMonth(month=month, transactions=count, archived_at=now) for month, count in months])
+    db.commit()
+    record_write()
+    return {"months": [month for month, _ in months], "transactions": moved}
+
+def restore_months(db: Session, first_month: str, last_month: str) -> Dict:
+    """Move the archived months in [first_month, last_month] back into the hot table"""
+    first, last, start, end = archive_range(first_month, last_month)
+    lock_for_write(db)
+    months = [
+        month for (month,) in db.query(ArchivedMonth.month)
+        .filter(ArchivedMonth.month >= first, ArchivedMonth.month <= last)
+        .order_by(ArchivedMonth.month)
+    ]
+    if not months:
+        db.rollback()
+        return {"months": [], "transactions": 0}
+    
+    moved = move_rows(db, ArchivedTransaction, Transaction, first, last, start, end)
+    db.execute(delete(ArchivedMonth).where(ArchivedMonth.month.in_(months)))
+    db.commit()
+    record_write()
+    return {"months": months, "transactions": moved}
+
+# Recurring transactions: a merchant's transactions at a steady amount form a series
+# (see recurring.py) that turns recurring after enough regular intervals. New rows
+# advance their series in their own DB transaction; rows older than their series'
+# latest occurrence (backdated imports) and deletions are only reflected after
+# rebuild_recurring(), which derives every series from history in one sorted pass.
+RECURRING_AMOUNT_TOLERANCE = float(os.getenv("RECURRING_AMOUNT_TOLERANCE", "0.2"))  # relative
+
+def observe_recurring(db: Session, occurrences: List[Occurrence]):
+    """Fold new transactions into their series; call inside the transaction that stores them"""
+    merchants = {merchant_key(description) for description, *_ in occurrences}
+    existing = db.query(RecurringSeries).filter(RecurringSeries.merchant.in_(merchants)).all() if merchants else []
+    detector = recurring.Detector(RECURRING_AMOUNT_TOLERANCE, existing)
+    for description, amount, transaction_type, category, timestamp in sorted(occurrences, key=lambda o: o[4]):
+        detector.observe(merchant_key(description), transaction_type, description, category, amount, timestamp)
+    db.add_all([RecurringSeries(**series.values()) for series in detector.created])
+
+def rebuild_recurring(db: Session) -> int:
+    """Recompute every series from history (archived months included); returns the number of series"""
+    lock_for_write(db)
+    detector = recurring.Detector(RECURRING_AMOUNT_TOLERANCE)
+    # Two index-ordered scans merged on the stored timestamp text, which sorts chronologically.
+    # Plain DBAPI cursors: at millions of rows, building Row objects costs as much as the scan.
+    dbapi_connection = db.connection().connection.dbapi_connection
+    scans = [
+        dbapi_connection.cursor().execute(
+            f"SELECT timestamp, description, amount, transaction_type, category FROM {table} ORDER BY timestamp"
+        )
+        for table in ("transactions", "archived_transactions")
+    ]
+    for timestamp, description, amount, transaction_type, category in heapq.merge(*scans):
+        detector.observe(
+            merchant_key(description), transaction_type, description, category, amount,
+            datetime.fromisoformat(timestamp),
+        )
+    db.execute(delete(RecurringSeries))
+    if detector.created:
+        db.execute(RecurringSeries.__table__.insert(), [series.values() for series in detector.created])
+    db.commit()
+    record_write()
+    return len(detector.created)
+
+def list_recurring(db: Session, include_inactive: bool = False) -> List[RecurringTransaction]:
+    """Recurring series, next due first"""
+    today = datetime.utcnow().date()
+    items = [
+        RecurringTransaction(
+            id=series.id,
+            merchant=series.merchant,
+            description=series.description,
+            amount=series.amount,
+            transaction_type=series.transaction_type,
+            category=series.category,
+            frequency=series.frequency,
+            occurrences=series.streak + 1,
+            start_date=series.streak_start.date(),
+            last_date=series.last_seen.date(),
+            next_due_date=recurring.next_due(series),
+            is_active=recurring.is_active(series, today),
+        )
+        for series in db.query(RecurringSeries).filter(
+            RecurringSeries.frequency.isnot(None), RecurringSeries.streak >= recurring.MIN_INTERVALS
+        )
+    ]
+    return sorted(
+        (item for item in items if include_inactive or item.is_active),
+        key=lambda item: (item.next_due_date, item.id),
+    )
+
+# Budgets: spend is kept per budget and period in budget_spend, moved by upsert_rollups()
+# along with the rollups, so every write path keeps it current at the cost of a budget
+# lookup and one upsert per period it touches, and status is a primary-key read. Writes
+# that take a budget of the current period over its warning share or its limit queue a
+# budget_alert event, published once the write commits.
+BUDGET_LEVELS = ("ok", "warning", "exceeded")
+
+def period_start(period: str, day: date) -> date:
+    """First day of the budget period containing day (as TIMESERIES_BUCKETS)"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+def budget_level(budget: Budget, spent: float) -> str:
+    spent = round(spent, 2)
+    if spent > budget.limit:
+        return "exceeded"
+    if spent >= budget.limit * budget.warn_percentage / 100:
+        return "warning"
+    return "ok"
+
+def budget_status(budget: Budget, start: date, spent: float) -> BudgetStatus:
+    return BudgetStatus(
+        id=budget.id,
+        category=budget.category,
+        period=budget.period,
+        limit=budget.limit,
+        warn_percentage=budget.warn_percentage,
+        period_start=start,
+        spent=round(spent, 2),
+        remaining=round(budget.limit - spent, 2),
+        status=budget_level(budget, spent),
+    )
+
+def add_budget_spend(db: Session, daily: Dict[Tuple[str, str, str], List[float]]):
+    """Add merged daily rollup changes to the spend of the budgets they fall under"""
+    expenses = [
+        (date.fromisoformat(day), category, total, count)
+        for (day, transaction_type, category), (total, count) in daily.items()
+        if transaction_type == "expense" and count
+    ]
+    if not expenses:
+        return
+    budgets = db.query(Budget).filter(
+        or_(Budget.category.in_({category for _, category, _, _ in expenses}), Budget.category.is_(None))
+    ).all()
+    merged: Dict[Tuple[Budget, date], List[float]] = {}
+    for budget in budgets:
+        for day, category, total, count in expenses:
+            if budget.category in (None, category):
+                totals = merged.setdefault((budget, period_start(budget.period, day)), [0, 0])
+                totals[0] += total
+                totals[1] += count
+    
+    today = datetime.utcnow().date()
+    table = BudgetSpend.__table__
+    for (budget, start), (total, added) in merged.items():
+        if not added:
+            continue
+        stmt = sqlite_insert(table).values(budget_id=budget.id, period_start=start.isoformat(), spent=total, count=added)
+        spent, count = db.execute(stmt.on_conflict_do_update(
+            index_elements=["budget_id", "period_start"],
+            set_={"spent": table.c.spent + stmt.excluded.spent, "count": table.c.count + stmt.excluded.count},
+        ).returning(table.c.spent, table.c.count)).one()
+        if count <= 0:
+            db.execute(table.delete().where(table.c.budget_id == budget.id, table.c.period_start == start.isoformat()))
+            spent = 0
+        # Only the period in progress alerts; backdated rows just update past periods
+        if start == period_start(budget.period, today):
+            level = budget_level(budget, spent)
+            if BUDGET_LEVELS.index(level) > BUDGET_LEVELS.index(budget_level(budget, spent - total)):
+                db.info.setdefault("budget_alerts", []).append(budget_status(budget, start, spent))
+
+@event.listens_for(Session, "after_commit")
+def publish_budget_alerts(session: Session):
+    for status in session.info.pop("budget_alerts", ()):
+        event_broker.publish("budget_alert", jsonable_encoder(status), topic_for(session))
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_budget_alerts(session: Session, previous_transaction):
+    session.info.pop("budget_alerts", None)
+
+def count_budget_spend(db: Session, budget: Budget):
+    """Fill budget_spend for a budget from history: one aggregate over the daily rows"""
+    source, _, params = daily_source(db)
+    category = "" if budget.category is None else " AND category = :category"
+    db.execute(text(
+        f"WITH daily AS {source} "
+        f"INSERT INTO budget_spend (budget_id, period_start, spent, count) "
+        f"SELECT :budget_id, {TIMESERIES_BUCKETS[budget.period]}, SUM(total), SUM(count) FROM daily "
+        f"WHERE transaction_type = 'expense'{category} GROUP BY 2"
+    ), {**params, "budget_id": budget.id, "category": budget.category})
+
+def find_budget(db: Session, budget_id: int) -> Budget:
+    budget = db.get(Budget, budget_id)
+    if budget is None:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    return budget
+
+def list_budgets(db: Session, day: Optional[date] = None) -> List[BudgetStatus]:
+    """Every budget with its spend in the period containing day (default today)"""
+    day = day or datetime.utcnow().date()
+    budgets = db.query(Budget).order_by(Budget.id).all()
+    starts = {budget.id: period_start(budget.period, day) for budget in budgets}
+    spent = dict(db.query(BudgetSpend.budget_id, BudgetSpend.spent).filter(
+        tuple_(BudgetSpend.budget_id, BudgetSpend.period_start).in_(
+            [(budget_id, start.isoformat()) for budget_id, start in starts.items()]
+        )
+    ).all()) if budgets else {}
+    return [budget_status(budget, starts[budget.id], spent.get(budget.id, 0)) for budget in budgets]
+
+def budget_status_today(db: Session, budget: Budget) -> BudgetStatus:
+    start = period_start(budget.period, datetime.utcnow().date())
+    spend = db.get(BudgetSpend, (budget.id, start.isoformat()))
+    return budget_status(budget, start, spend.spent if spend else 0)
+
+def create_budget(db: Session, request: BudgetCreate) -> BudgetStatus:
+    """Store a budget and count its spend so far; one budget per category and period"""
+    lock_for_write(db)
+    same_category = Budget.category.is_(None) if request.category is None else Budget.category == request.category
+    if db.query(Budget.id).filter(same_category, Budget.period == request.period).first():
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A budget for this category and period already exists")
+    budget = Budget(**request.model_dump())
+    db.add(budget)
+    db.flush()
+    count_budget_spend(db, budget)
+    db.commit()
+    return budget_status_today(db, budget)
+
+def update_budget(db: Session, budget_id: int, request: BudgetUpdate) -> BudgetStatus:
+    """Change a budget's limit or warning share; its spend stays as counted"""
+    budget = find_budget(db, budget_id)
+    for name, value in request.model_dump(exclude_none=True).items():
+        setattr(budget, name, value)
+    db.commit()
+    return budget_status_today(db, budget)
+
+def delete_budget(db: Session, budget_id: int):
+    budget = find_budget(db, budget_id)
+    db.execute(delete(BudgetSpend).where(BudgetSpend.budget_id == budget_id))
+    db.delete(budget)
+    db.commit()
+    return {"message": "Budget deleted"}
+
+# Background re-tagging: spreads a learned override over the merchant's auto-tagged
+# history a bounded id range at a time, committing progress with each chunk
+RETAG_WORKER = os.getenv("RETAG_WORKER", "1").lower() not in ("0", "false", "no")
+RETAG_SCAN_SIZE = int(os.getenv("RETAG_SCAN_SIZE", "20000"))  # ids per chunk
+RETAG_PAUSE_SECONDS = float(os.getenv("RETAG_PAUSE_SECONDS", "0.05"))  # between chunks, to let writers in
+RETAG_POLL_SECONDS = 60.0
+retag_wakeup = threading.Event()
+retag_stop = threading.Event()
+retag_log = logging.getLogger("finance.retag")
+
+def merchant_like_pattern(merchant: str) -> str:
+    """LIKE pattern matched by every description whose merchant_key() is merchant
+
+    SQLite's LIKE folds case for ASCII letters only, so other characters (which
+    lower() may also change in length) become wildcards.
+    """
+    return "%" + re.sub(r"[^\x00-\x7f]+", "%", "%".join(merchant.split())) + "%"
+
+def retag_chunk(db: Session, job_id: int) -> int:
+    """Apply a job's override to its next id range; returns the number of rows changed"""
+    lock_for_write(db)
+    job = db.get(RetagJob, job_id)
+    if job is None or job.status != "pending":
+        db.rollback()  # Superseded meanwhile
+        return 0
+    
+    stop = min(job.last_id + RETAG_SCAN_SIZE, job.end_id)
+    candidates = db.query(
+        Transaction.id, Transaction.description, Transaction.amount, Transaction.category, Transaction.timestamp
+    ).filter(
+        Transaction.id > job.last_id,
+        Transaction.id <= stop,
+        Transaction.auto_tagged == True,
+        Transaction.transaction_type == job.transaction_type,
+        # Cheap prefilter in SQL; merchant_key() decides
+        Transaction.description.like(merchant_like_pattern(job.merchant)),
+    ).all()
+    
+    changed = []
+    moved: List[RollupChange] = []
+    for transaction_id, description, amount, category, timestamp in candidates:
+        if category == job.category or merchant_key(description) != job.merchant:
+            continue
+        changed.append((job.category, transaction_id))
+        day = timestamp.strftime("%Y-%m-%d")
+        moved.append((day, job.transaction_type, category or "Other", -abs(amount), -1))
+        moved.append((day, job.transaction_type, job.category, abs(amount), 1))
+    
+    deltas = []
+    if changed:
+        db.connection().exec_driver_sql("UPDATE transactions SET category = ? WHERE id = ?", changed)
+        deltas = upsert_rollups(db, moved)
+    job.last_id = stop
+    job.updated += len(changed)
+    if stop >= job.end_id:
+        job.status = "done"
+    db.commit()
+    
+    if changed:
+        record_write()
+        event_broker.publish("bulk_reclassified", {"affected": len(changed), "deltas": deltas}, topic_for(db))
+    return len(changed)
+
+def run_retag_jobs(db: Session, stop: Optional[threading.Event] = None, pause: float = 0.0) -> int:
+    """Work through pending re-tag jobs in creation order; returns the number of rows changed"""
+    updated = 0
+    while stop is None or not stop.is_set():
+        job_id = db.query(RetagJob.id).filter(RetagJob.status == "pending").order_by(RetagJob.id).limit(1).scalar()
+        if job_id is None:
+            break
+        updated += retag_chunk(db, job_id)
+        if pause and stop is not None:
+            stop.wait(pause)
+    return updated
+
+# Shards with jobs to look at; sharded databases are only visited when queued here
+retag_shards: Set[str] = set()
+retag_shards_lock = threading.Lock()
+
+def queue_retag(db: Session):
+    """Wake the worker for the jobs just committed through db"""
+    shard = db.info.get("shard")
+    if shard is not None:
+        with retag_shards_lock:
+            retag_shards.add(shard.key)
+    retag_wakeup.set()
+
+def retag_database(session_factory) -> bool:
+    """Run the pending jobs of one database; False if that failed and should be retried"""
+    db = session_factory()
+    try:
+        updated = run_retag_jobs(db, retag_stop, RETAG_PAUSE_SECONDS)
+        if updated:
+            retag_log.info("Re-tagged %d transactions", updated)
+        return True
+    except Exception:
+        retag_log.exception("Re-tagging failed; will retry")
+        return False
+    finally:
+        db.close()
+
+def retag_worker():
+    """Background thread: run pending jobs whenever an override is learned (and on a slow poll)"""
+    while not retag_stop.is_set():
+        retag_wakeup.clear()
+        if shard_router is None:
+            retag_database(SessionLocal)
+        else:
+            with retag_shards_lock:
+                keys = sorted(retag_shards)
+                retag_shards.clear()
+            for key in keys:
+                with shard_router.lease(key) as shard:
+                    if not retag_database(shard.SessionLocal):
+                        with retag_shards_lock:
+                            retag_shards.add(key)
+        retag_wakeup.wait(RETAG_POLL_SECONDS)
+
+def transaction_not_found(db: Session, transaction_id: int) -> HTTPException:
+    """404, or 409 for a transaction of an archived (read-only) month"""
+    if db.get(ArchivedTransaction, transaction_id) is not None:
+        return HTTPException(status_code=409, detail="Transaction is archived; restore its month to change it")
+    return HTTPException(status_code=404, detail="Transaction not found")
+
+def remove_transaction(db: Session, transaction_id: int):
+    """Delete a transaction and take it out of the rollup"""
     db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     if not db_transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+        raise transaction_not_found(db, transaction_id)
     
+    key = (db_transaction.description, db_transaction.amount, db_transaction.transaction_type)
+    timestamp = db_transaction.timestamp
+    deleted = TransactionResponse.model_validate(db_transaction)
+    delta = rollup_delta(db_transaction, sign=-1)
+    apply_rollup(db, db_transaction, sign=-1)
     db.delete(db_transaction)
     db.commit()
+    record_write()
+    index = duplicate_index_for(db)
+    if index is not None:
+        index.discard(key, timestamp)
+    publish_transaction_event(db, "deleted", deleted, [delta])
     return {"message": "Transaction deleted"}
 
-@app.patch("/transactions/{transaction_id}/reclassify", response_model=TransactionResponse)
-def reclassify_transaction(transaction_id: int, update: TransactionUpdate, db: Session = next(get_db())):
-    """Manually reclassify a transaction"""
+def learn_override(db: Session, description: str, transaction_type: str, category: str) -> Optional[str]:
+    """Store a manual correction as a merchant override and queue re-tagging of the merchant's history
+
+    Returns the merchant key, or None if the description has no usable merchant name.
+    """
+    merchant = merchant_key(description)
+    if not merchant:
+        return None
+    
+    now = datetime.utcnow()
+    stmt = sqlite_insert(CategoryOverride).values(
+        merchant=merchant, transaction_type=transaction_type, category=category, updated_at=now
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["merchant", "transaction_type"],
+        set_={"category": stmt.excluded.category, "updated_at": stmt.excluded.updated_at},
+    ))
+    # A newer correction for the same merchant supersedes an unfinished job
+    db.execute(delete(RetagJob).where(
+        RetagJob.merchant == merchant,
+        RetagJob.transaction_type == transaction_type,
+        RetagJob.status == "pending",
+    ))
+    db.add(RetagJob(
+        merchant=merchant,
+        transaction_type=transaction_type,
+        category=category,
+        end_id=db.query(func.max(Transaction.id)).scalar() or 0,
+        created_at=now,
+    ))
+    return merchant
+
+def recategorize_transaction(db: Session, transaction_id: int, category: str) -> Transaction:
+    """Manually set a transaction's category and learn it for the merchant"""
     db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
     if not db_transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
+        raise transaction_not_found(db, transaction_id)
     
-    db_transaction.category = update.category
+    deltas = [rollup_delta(db_transaction, sign=-1)]
+    apply_rollup(db, db_transaction, sign=-1)
+    db_transaction.category = category
     db_transaction.auto_tagged = False
+    apply_rollup(db, db_transaction)
+    deltas.append(rollup_delta(db_transaction))
+    merchant = learn_override(db, db_transaction.description, db_transaction.transaction_type, category)
     db.commit()
+    record_write()
+    if merchant:
+        overrides_for(db).set(merchant, db_transaction.transaction_type, category)
+        queue_retag(db)
     db.refresh(db_transaction)
+    publish_transaction_event(db, "reclassified", TransactionResponse.model_validate(db_transaction), deltas)
     return db_transaction
 
+# API Endpoints
+@app.post("/transactions/", response_model=TransactionResponse)
+def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_db)):
+    """Add a new transaction with auto-categorization"""
+    return save_transaction(db, transaction)
+
+@app.post("/transactions/bulk", response_model=BulkImportResult)
+async def bulk_import_transactions(request: Request, db: Session = Depends(get_db)):
+    """Import a streamed CSV or NDJSON upload in large batches"""
+    fmt = detect_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Upload must be text/csv or application/x-ndjson")
+    
+    results = []
+    try:
+        async for batch in iter_record_batches(request.stream(), fmt, BULK_BATCH_SIZE):
+            results.extend(await run_in_threadpool(import_batch, db, batch, len(results) + 1))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Upload must be UTF-8 encoded")
+    
+    statuses = [status for _, status, _ in results]
+    # Built directly rather than validated per row; the shape matches BulkImportResult
+    return JSONResponse(content={
+        "created": statuses.count("created"),
+        "duplicates": statuses.count("duplicate"),
+        "errors": statuses.count("error"),
+        "rows": [{"row": row, "status": status, "detail": detail} for row, status, detail in results],
+    })
+
+@app.get("/transactions/", response_model=List[TransactionResponse])
+def get_transactions(
+    request: Request,
+    month: Optional[str] = None,
+    transaction_type: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    q: Optional[str] = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Get transactions with optional filters, description search, keyset pagination and field projection
+
+    stream=true (or Accept: application/x-ndjson) streams the same JSON, or NDJSON, from a faster path.
+    """
+    return list_transactions(db, month, transaction_type, category, limit, after, fields, q, stream_format(request))
+
+@app.get("/transactions/search", response_model=List[TransactionResponse])
+def search_descriptions(
+    q: str,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over descriptions, ranked by relevance; supports "phrases" and prefix*"""
+    return search_transactions(db, q, limit, offset)
+
+@app.get("/transactions/summary", response_model=List[MonthlySummary])
+def get_summary(
+    from_month: Optional[str] = None,
+    to_month: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get monthly income/expense summary grouped by category"""
+    return summarize_months(db, from_month, to_month)
+
+@app.get("/analytics/timeseries", response_model=List[TimeseriesPoint])
+def get_timeseries(
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Income/expense per day, week or month with rolling 7/30-day spend and category balances"""
+    return build_timeseries(db, bucket, start, end)
+
+@app.get("/recurring", response_model=List[RecurringTransaction])
+def get_recurring(include_inactive: bool = False, db: Session = Depends(get_db)):
+    """Recurring bills and income detected from the transaction history, next due first"""
+    return list_recurring(db, include_inactive)
+
+@app.get("/budgets", response_model=List[BudgetStatus])
+def get_budgets(day: Optional[date] = None, db: Session = Depends(get_db)):
+    """Budgets with their spend and status in the current period (or the one containing day)"""
+    return list_budgets(db, day)
+
+@app.post("/budgets", response_model=BudgetStatus)
+def add_budget(budget: BudgetCreate, db: Session = Depends(get_db)):
+    """Add a daily, weekly or monthly budget for a category (or all expenses)"""
+    return create_budget(db, budget)
+
+@app.patch("/budgets/{budget_id}", response_model=BudgetStatus)
+def change_budget(budget_id: int, update: BudgetUpdate, db: Session = Depends(get_db)):
+    """Change a budget's limit or warning percentage"""
+    return update_budget(db, budget_id, update)
+
+@app.delete("/budgets/{budget_id}")
+def remove_budget(budget_id: int, db: Session = Depends(get_db)):
+    """Delete a budget"""
+    return delete_budget(db, budget_id)
+
+@app.get("/transactions/changes", response_model=ChangeFeed)
+def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Inserts, updates and deletes (as tombstones) since a cursor, for incremental sync"""
+    return list_changes(db, since, limit)
+
+@app.get("/transactions/stream")
+async def stream_transactions(request: Request):
+    """Server-Sent Events: created, deleted, reclassified and imported, with rollup deltas; budget alerts"""
+    subscription = event_broker.subscribe(request_user(request) if shard_router is not None else None)
+    return StreamingResponse(
+        sse_stream(event_broker, subscription, SSE_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.patch("/transactions/reclassify", response_model=BulkUpdateResult)
+def reclassify_transactions(request: BulkReclassifyRequest, db: Session = Depends(get_db)):
+    """Reclassify every transaction matching an id list or a filter"""
+    return reclassify_many(db, request)
+
+@app.delete("/transactions/", response_model=BulkUpdateResult)
+def delete_transactions(selection: BulkSelection, db: Session = Depends(get_db)):
+    """Delete every transaction matching an id list or a filter"""
+    return delete_many(db, selection)
+
+@app.delete("/transactions/{transaction_id}")
+def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
+    """Delete a transaction"""
+    return remove_transaction(db, transaction_id)
+
+@app.patch("/transactions/{transaction_id}/reclassify", response_model=TransactionResponse)
+def reclassify_transaction(transaction_id: int, update: TransactionUpdate, db: Session = Depends(get_db)):
+    """Manually reclassify a transaction"""
+    return recategorize_transaction(db, transaction_id, update.category)
+
+# Async database mode: same endpoints, run on the event loop through AsyncSession.
+# The router is only built when the mode is enabled, so the default sync server
+# does not pay for registering (and schema-building) a second set of routes.
+def build_async_router() -> APIRouter:
+    from sqlalchemy.ext.asyncio import AsyncSession
+    
+    async_router = APIRouter()
+    
+    @async_router.post("/transactions/", response_model=TransactionResponse)
+    async def create_transaction_async(transaction: TransactionCreate, db: AsyncSession = Depends(get_async_db)):
+        """Add a new transaction with auto-categorization"""
+        return await db.run_sync(save_transaction, transaction)
+
+    @async_router.get("/transactions/", response_model=List[TransactionResponse])
+    async def get_transactions_async(
+        request: Request,
+        month: Optional[str] = None,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        after: Optional[str] = None,
+        fields: Optional[str] = None,
+        q: Optional[str] = None,
+        stream: bool = False,
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """Get transactions with optional filters, description search, keyset pagination and field projection"""
+        return await db.run_sync(
+            list_transactions, month, transaction_type, category, limit, after, fields, q, stream_format(request)
+        )
+
+    @async_router.get("/transactions/search", response_model=List[TransactionResponse])
+    async def search_descriptions_async(
+        q: str,
+        limit: int = Query(50, ge=1, le=500),
+        offset: int = Query(0, ge=0),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """Full-text search over descriptions, ranked by relevance; supports "phrases" and prefix*"""
+        return await db.run_sync(search_transactions, q, limit, offset)
+
+    @async_router.get("/transactions/summary", response_model=List[MonthlySummary])
+    async def get_summary_async(
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None,
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """Get monthly income/expense summary grouped by category"""
+        return await db.run_sync(summarize_months, from_month, to_month)
+
+    @async_router.get("/analytics/timeseries", response_model=List[TimeseriesPoint])
+    async def get_timeseries_async(
+        bucket: str = Query("day", pattern="^(day|week|month)$"),
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """Income/expense per day, week or month with rolling 7/30-day spend and category balances"""
+        return await db.run_sync(build_timeseries, bucket, start, end)
+
+    @async_router.get("/transactions/changes", response_model=ChangeFeed)
+    async def get_changes_async(
+        since: Optional[str] = None,
+        limit: int = Query(1000, ge=1, le=5000),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """Inserts, updates and deletes (as tombstones) since a cursor, for incremental sync"""
+        return await db.run_sync(list_changes, since, limit)
+
+    @async_router.delete("/transactions/{transaction_id}")
+    async def delete_transaction_async(transaction_id: int, db: AsyncSession = Depends(get_async_db)):
+        """Delete a transaction"""
+        return await db.run_sync(remove_transaction, transaction_id)
+
+    @async_router.patch("/transactions/{transaction_id}/reclassify", response_model=TransactionResponse)
+    async def reclassify_transaction_async(
+        transaction_id: int,
+        update: TransactionUpdate,
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """Manually reclassify a transaction"""
+        return await db.run_sync(recategorize_transaction, transaction_id, update.category)
+    
+    return async_router
+
+def enable_async_mode(target: FastAPI = app):
+    """Serve the core endpoints from the async router instead of the sync handlers"""
+    async_router = build_async_router()
+    replaced = {(route.path, frozenset(route.methods)) for route in async_router.routes}
+    target.router.routes = [
+        route for route in target.router.routes
+        if not (isinstance(route, APIRoute) and (route.path, frozenset(route.methods)) in replaced)
+    ]
+    target.include_router(async_router)
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """ETag / If-None-Match handling and LRU caching for the list and summary endpoints"""
+    if request.method != "GET" or request.url.path not in CACHED_PATHS:
+        return await call_next(request)
+    
+    query = request.query_params.multi_items()
+    user = None
+    if shard_router is not None:
+        try:
+            user = request_user(request)
+        except HTTPException:
+            return await call_next(request)  # The endpoint answers with the error
+        query.append((USER_HEADER, user))
+    streamed = stream_format(request) if request.url.path == "/transactions/" else None
+    if streamed:
+        query.append(("stream", streamed))
+    key = cache_key(await run_in_threadpool(read_data_version, user), request.url.path, query)
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    if streamed:
+        # Revalidated with the ETag, but passed through unbuffered rather than cached
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers.update(headers)
+        return response
+    
+    cached = response_cache.get(key)
+    if cached is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        kept_headers = {
+            name: value for name, value in response.headers.items()
+            if name in ("content-type", "x-next-cursor")
+        }
+        response_cache.put(key, body, kept_headers)
+        cached = (body, kept_headers)
+    
+    body, kept_headers = cached
+    return Response(content=body, headers={**kept_headers, **headers})
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Time each request and attribute the SQL it ran to its route"""
+    stats = RequestStats(statements=[] if SLOW_REQUEST_MS is not None else None)
+    token = current_request.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.record(request.method, route_label(request), 500, time.perf_counter() - start, stats)
+        raise
+    finally:
+        current_request.reset(token)
+    elapsed = time.perf_counter() - start
+    
+    metrics.record(request.method, route_label(request), response.status_code, elapsed, stats)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows", '
+            f"total;dur={elapsed * 1000:.2f}"
+        )
+    if SLOW_REQUEST_MS is not None and elapsed * 1000 >= SLOW_REQUEST_MS:
+        slow_request_log.warning(
+            "Slow request %s %s: %.1f ms, %d queries (%.1f ms SQL)\n%s",
+            request.method,
+            request.url.path,
+            elapsed * 1000,
+            stats.queries,
+            stats.sql_seconds * 1000,
+            "\n".join(f"  [{seconds * 1000:.2f} ms] {statement}" for statement, seconds in stats.statements),
+        )
+    return response
+
+def route_label(request: Request) -> str:
+    """Route template for metric labels; cache hits never reach the router"""
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    return request.url.path if request.url.path in CACHED_PATHS else "unmatched"
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus metrics"""
+    body = metrics.render() + (
+        "# HELP stream_subscribers Open /transactions/stream connections.\n"
+        "# TYPE stream_subscribers gauge\n"
+        f"stream_subscribers {len(event_broker)}\n"
+    )
+    if shard_router is not None:
+        body += (
+            "# HELP shards_open Shard engines currently held open.\n"
+            "# TYPE shards_open gauge\n"
+            f"shards_open {len(shard_router)}\n"
+            "# HELP shards_opened_total Shards opened (and migrated if needed).\n"
+            "# TYPE shards_opened_total counter\n"
+            f"shards_opened_total {shard_router.opened}\n"
+            "# HELP shard_evictions_total Shards evicted from the engine LRU.\n"
+            "# TYPE shard_evictions_total counter\n"
+            f"shard_evictions_total {shard_router.evictions}\n"
+        )
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Startup and shutdown, run in this order by lifespan()
+def create_schema():
+    """Create missing tables and indexes; shards are migrated when they are opened instead"""
+    if DB_CREATE_SCHEMA and shard_router is None:
+        Base.metadata.create_all(bind=engine)
+
+def load_duplicate_index():
+    """Warm the duplicate index so the first creates skip SQL as well"""
+    if duplicate_index is not None and shard_router is None:
+        db = SessionLocal()
+        try:
+            warm_duplicate_index(db)
+        finally:
+            db.close()
+
+retag_thread: Optional[threading.Thread] = None
+
+def start_retag_worker():
+    """Resume unfinished re-tagging and pick up new overrides in the background"""
+    global retag_thread
+    if RETAG_WORKER:
+        retag_stop.clear()
+        retag_thread = threading.Thread(target=retag_worker, name="retag", daemon=True)
+        retag_thread.start()
+
+def stop_retag_worker():
+    if retag_thread is not None:
+        retag_stop.set()
+        retag_wakeup.set()
+        retag_thread.join(timeout=5)
+
+def close_shards():
+    if shard_router is not None:
+        shard_router.close()
+
 @app.get("/")
 def root():
     return {"message": "Personal Finance Tracker API", "docs": "/docs"}
 
+if ASYNC_DB_MODE:
+    if SHARD_DIR:
+        raise RuntimeError("SHARD_DIR is not supported together with DB_ASYNC")
+    enable_async_mode()
+
+# CORS Configuration (added last so it wraps every other middleware, 304s included)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
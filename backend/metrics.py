@@ -0,0 +1,147 @@
+"""
+Hot-path instrumentation: request latency histograms and per-request SQL counters
+Rendered in the Prometheus text exposition format by the /metrics endpoint.
+"""
+
+import bisect
+import contextvars
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Seconds; the Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+@dataclass
+class RequestStats:
+    """SQL activity of one request, collected by the engine hooks"""
+    queries: int = 0
+    rows: int = 0
+    sql_seconds: float = 0.0
+    statements: Optional[List[Tuple[str, float]]] = None  # kept only when slow-request logging is on
+
+current_request: contextvars.ContextVar = contextvars.ContextVar("current_request", default=None)
+
+class Histogram:
+    """Cumulative-bucket histogram"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+@dataclass
+class RouteTotals:
+    queries: int = 0
+    rows: int = 0
+    sql_seconds: float = 0.0
+
+@dataclass
+class MetricsRegistry:
+    """Process-wide metrics keyed by route template"""
+    latency: Dict[Tuple[str, str, int], Histogram] = field(default_factory=dict)
+    sql: Dict[Tuple[str, str], RouteTotals] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self.lock:
+            histogram = self.latency.get((method, route, status))
+            if histogram is None:
+                histogram = self.latency[(method, route, status)] = Histogram()
+            histogram.observe(seconds)
+
+            totals = self.sql.setdefault((method, route), RouteTotals())
+            totals.queries += stats.queries
+            totals.rows += stats.rows
+            totals.sql_seconds += stats.sql_seconds
+
+    def reset(self):
+        with self.lock:
+            self.latency.clear()
+            self.sql.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route and status.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self.lock:
+            for (method, route, status), histogram in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{escape(route)}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.total}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+            sql = sorted(self.sql.items())
+            for name, kind, help_text, attribute in (
+                ("db_queries_total", "counter", "SQL statements executed, by route.", "queries"),
+                ("db_rows_returned_total", "counter", "Rows fetched from SELECTs, by route.", "rows"),
+                ("db_query_seconds_total", "counter", "Time spent executing SQL, by route.", "sql_seconds"),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (method, route), totals in sql:
+                    lines.append(
+                        f'{name}{{method="{method}",route="{escape(route)}"}} {getattr(totals, attribute)}'
+                    )
+        return "\n".join(lines) + "\n"
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def instrument_engine(db_engine, count_rows: bool = True):
+    """Attribute every statement run on db_engine to the current request
+
+    Rows are counted through a sqlite3 row_factory, so only on pysqlite connections.
+    """
+    if count_rows:
+        @event.listens_for(db_engine, "connect")
+        def install_row_counter(dbapi_connection, connection_record):
+            if isinstance(dbapi_connection, sqlite3.Connection):
+                dbapi_connection.row_factory = count_row
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_request.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append((statement, elapsed))
+
+    @event.listens_for(db_engine, "handle_error")
+    def discard_timer(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+def count_row(cursor, row):
+    """sqlite3 row_factory that counts rows fetched for the current request"""
+    stats = current_request.get()
+    if stats is not None:
+        stats.rows += 1
+    return row
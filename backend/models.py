@@ -0,0 +1,307 @@
+"""
+Database models and the SQLite DDL that comes with them (change-log and data
+version triggers, full-text indexes, rollup backfill and coverage)
+Kept free of FastAPI and engine setup so migrations and scripts can import the
+schema cheaply; main.py binds it to an engine and creates it at startup.
+"""
+
+import time
+from datetime import datetime
+
+from sqlalchemy import DDL, Boolean, Column, DateTime, Float, Index, Integer, String, event, text
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class Transaction(Base):
+    __tablename__ = "transactions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    description = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    transaction_type = Column(String, nullable=False)  # 'income' or 'expense'
+    category = Column(String, nullable=True)
+    auto_tagged = Column(Boolean, default=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    
+    # Indexes for the endpoint access paths (see migration 003)
+    __table_args__ = (
+        Index("ix_transactions_timestamp", "timestamp"),
+        Index("ix_transactions_category_timestamp", "category", "timestamp"),
+        Index("ix_transactions_type_timestamp", "transaction_type", "timestamp"),
+        Index("ix_transactions_duplicate_lookup", "description", "amount", "transaction_type", "timestamp"),
+        # Ids are never handed out twice, not even those of rows moved to the archive
+        {"sqlite_autoincrement": True},
+    )
+
+class MonthlyRollup(Base):
+    """Running totals per (month, type, category), maintained by the write endpoints"""
+    __tablename__ = "monthly_rollups"
+    
+    month = Column(String, primary_key=True)  # Format: 'YYYY-MM'
+    transaction_type = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+@event.listens_for(MonthlyRollup.__table__, "after_create")
+def monthly_rollup_created(target, connection, **kw):
+    connection.info["monthly_rollup_created"] = True
+
+@event.listens_for(Base.metadata, "after_create")
+def backfill_monthly_rollup(target, connection, **kw):
+    """A monthly rollup created next to existing data is built from it, as migration 002 does"""
+    if connection.info.pop("monthly_rollup_created", False):
+        connection.execute(text(
+            "INSERT INTO monthly_rollups (month, transaction_type, category, total, count) "
+            "SELECT strftime('%Y-%m', timestamp), transaction_type, COALESCE(category, 'Other'), "
+            "SUM(ABS(amount)), COUNT(id) FROM transactions "
+            "GROUP BY strftime('%Y-%m', timestamp), transaction_type, COALESCE(category, 'Other')"
+        ))
+
+class DailyRollup(Base):
+    """Running totals per (day, type, category), maintained alongside the monthly rollup"""
+    __tablename__ = "daily_rollups"
+    
+    day = Column(String, primary_key=True)  # Format: 'YYYY-MM-DD'
+    transaction_type = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+class RollupCoverage(Base):
+    """First day a rollup covers, when it was added to a database that already had data
+
+    Earlier days are aggregated from transactions until rebuild_rollups() backfills
+    them and removes the row; no row means the rollup covers everything.
+    """
+    __tablename__ = "rollup_coverage"
+    
+    rollup = Column(String, primary_key=True)  # 'daily'
+    start_day = Column(String, nullable=False)  # Format: 'YYYY-MM-DD'
+
+@event.listens_for(DailyRollup.__table__, "after_create")
+def daily_rollup_created(target, connection, **kw):
+    connection.info["daily_rollup_created"] = True
+
+@event.listens_for(Base.metadata, "after_create")
+def record_daily_rollup_coverage(target, connection, **kw):
+    """A daily rollup created next to existing data only sees writes from then on"""
+    if connection.info.pop("daily_rollup_created", False):
+        connection.execute(text(
+            "INSERT INTO rollup_coverage (rollup, start_day) "
+            "SELECT 'daily', date(MAX(timestamp), '+1 day') FROM transactions HAVING COUNT(*) > 0"
+        ))
+
+class TransactionChange(Base):
+    """Append-only log of mutations to transactions, read by the change feed
+
+    Written by triggers (see CHANGE_LOG_TRIGGERS), so every write path logs in
+    the same DB transaction as the mutation itself.
+    """
+    __tablename__ = "transaction_changes"
+    __table_args__ = {"sqlite_autoincrement": True}  # seq is never reused
+    
+    seq = Column(Integer, primary_key=True)
+    transaction_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # 'insert', 'update' or 'delete'
+
+class CategoryOverride(Base):
+    """Category learned from a manual reclassification, applied to the merchant's future rows"""
+    __tablename__ = "category_overrides"
+    
+    merchant = Column(String, primary_key=True)  # merchant_key() of the description
+    transaction_type = Column(String, primary_key=True)
+    category = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RetagJob(Base):
+    """Resumable pass applying an override to a merchant's auto-tagged history, by id range"""
+    __tablename__ = "retag_jobs"
+    __table_args__ = {"sqlite_autoincrement": True}  # a superseded job's id is never handed out again
+    
+    id = Column(Integer, primary_key=True)
+    merchant = Column(String, nullable=False)
+    transaction_type = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)  # rows up to here are done
+    end_id = Column(Integer, nullable=False)  # later rows were categorized with the override
+    updated = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="pending")  # 'pending' or 'done'
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedTransaction(Base):
+    """Rows of archived months, moved out of transactions with their ids (see archive_months)"""
+    __tablename__ = "archived_transactions"
+    
+    id = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    transaction_type = Column(String, nullable=False)
+    category = Column(String, nullable=True)
+    auto_tagged = Column(Boolean, default=True)
+    timestamp = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("ix_archived_transactions_timestamp", "timestamp"),)
+
+class ArchivedSummary(Base):
+    """Monthly rollup rows of archived months, frozen when the month was archived"""
+    __tablename__ = "archived_summaries"
+    
+    month = Column(String, primary_key=True)  # Format: 'YYYY-MM'
+    transaction_type = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+
+class ArchivedMonth(Base):
+    """Months whose transactions live in archived_transactions; read-only until restored"""
+    __tablename__ = "archived_months"
+    
+    month = Column(String, primary_key=True)  # Format: 'YYYY-MM'
+    transactions = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class BulkInsert(Base):
+    """Marker row held by import_batch inside its DB transaction, never committed
+
+    The per-row insert triggers on transactions skip while it is there, and the
+    batch updates the search index, change log and data version set-based instead.
+    """
+    __tablename__ = "bulk_inserts"
+    
+    id = Column(Integer, primary_key=True)
+
+BULK_INSERT_SKIP = "WHEN NOT EXISTS (SELECT 1 FROM bulk_inserts)"
+# Triggers created before the skip existed; CREATE ... IF NOT EXISTS would keep the old definitions
+BULK_INSERT_SKIPPING_TRIGGERS = ("transactions_fts_insert", "transactions_log_insert", "transactions_version_insert")
+
+@event.listens_for(BulkInsert.__table__, "after_create")
+def replace_insert_triggers(target, connection, **kw):
+    for trigger in BULK_INSERT_SKIPPING_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+CHANGE_LOG_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS transactions_log_insert AFTER INSERT ON transactions {BULK_INSERT_SKIP}
+    BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'insert'); END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_log_update AFTER UPDATE ON transactions
+    BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (NEW.id, 'update'); END""",
+    """CREATE TRIGGER IF NOT EXISTS transactions_log_delete AFTER DELETE ON transactions
+    BEGIN INSERT INTO transaction_changes (transaction_id, op) VALUES (OLD.id, 'delete'); END""",
+]
+for trigger in CHANGE_LOG_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(trigger).execute_if(dialect="sqlite"))
+
+class DataVersion(Base):
+    """Single-row counter of changes to transaction rows, the version behind ETags and cached responses
+
+    Bumped by triggers (see DATA_VERSION_TRIGGERS) in the DB transaction of the
+    change, so writes from any process (other workers, admin scripts) invalidate
+    what every process has cached. Seeded from the wall clock, so a recreated
+    database does not reuse versions.
+    """
+    __tablename__ = "data_version"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+DATA_VERSION_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {table}_version_{op.lower()} AFTER {op} ON {table}
+    {BULK_INSERT_SKIP if (table, op) == ("transactions", "INSERT") else ""}
+    BEGIN UPDATE data_version SET version = version + 1; END"""
+    for table in ("transactions", "archived_transactions")
+    for op in ("INSERT", "UPDATE", "DELETE")
+]
+for trigger in DATA_VERSION_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(trigger).execute_if(dialect="sqlite"))
+
+@event.listens_for(DataVersion.__table__, "after_create")
+def seed_data_version(target, connection, **kw):
+    connection.execute(text("INSERT INTO data_version (id, version) VALUES (1, :version)"),
+                       {"version": time.time_ns() // 1000})
+
+# Full-text index over descriptions, one per table in SEARCHABLE_TABLES ({table}_fts).
+# External content: the FTS table stores only the inverted index and reads the text
+# back from {table} by rowid. The prefix indexes keep short 'term*' queries from
+# scanning the whole vocabulary.
+SEARCHABLE_TABLES = ("transactions", "archived_transactions")
+SEARCH_INDEX_DDL = """CREATE VIRTUAL TABLE {table}_fts USING fts5(
+    description, content='{table}', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3')"""
+SEARCH_INDEX_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} {skip}
+    BEGIN INSERT INTO {table}_fts (rowid, description) VALUES (NEW.id, NEW.description); END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table}
+    BEGIN INSERT INTO {table}_fts ({table}_fts, rowid, description)
+    VALUES ('delete', OLD.id, OLD.description); END""",
+    """CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF description ON {table}
+    BEGIN INSERT INTO {table}_fts ({table}_fts, rowid, description)
+    VALUES ('delete', OLD.id, OLD.description);
+    INSERT INTO {table}_fts (rowid, description) VALUES (NEW.id, NEW.description); END""",
+]
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    """Create the FTS indexes, building each from existing rows the first time"""
+    if connection.dialect.name != "sqlite":
+        return
+    for table in SEARCHABLE_TABLES:
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_fts",)
+        ).first()
+        if not exists:
+            connection.exec_driver_sql(SEARCH_INDEX_DDL.format(table=table))
+            connection.exec_driver_sql(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        skip = BULK_INSERT_SKIP if table == "transactions" else ""
+        for trigger in SEARCH_INDEX_TRIGGERS:
+            connection.exec_driver_sql(trigger.format(table=table, skip=skip))
+
+# Not part of the metadata, so drop_all would leave an index pointing at stale rowids
+for table in SEARCHABLE_TABLES:
+    event.listen(
+        Base.metadata, "before_drop", DDL(f"DROP TABLE IF EXISTS {table}_fts").execute_if(dialect="sqlite")
+    )
+
+class RecurringSeries(Base):
+    """A merchant's transactions at a steady amount, with the run of regular intervals found so far
+
+    Advanced by each new transaction (see recurring.advance) and rebuilt from
+    history by rebuild_recurring(); one-off series are kept too, as the next
+    occurrence may turn them recurring.
+    """
+    __tablename__ = "recurring_series"
+    __table_args__ = (Index("ix_recurring_series_merchant", "merchant", "transaction_type"),)
+    
+    id = Column(Integer, primary_key=True)
+    merchant = Column(String, nullable=False)  # merchant_key() of the descriptions
+    transaction_type = Column(String, nullable=False)
+    description = Column(String, nullable=False)  # latest occurrence
+    category = Column(String, nullable=True)
+    amount = Column(Float, nullable=False)  # latest occurrence, the reference for the amount tolerance
+    occurrences = Column(Integer, nullable=False)
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    frequency = Column(String, nullable=True)  # 'weekly', ..., 'yearly'; None after an irregular interval
+    streak = Column(Integer, nullable=False)  # consecutive intervals at frequency
+    streak_start = Column(DateTime, nullable=False)
+
+class Budget(Base):
+    """A spending limit per day, week or month for one expense category, or (category None) for all of them"""
+    __tablename__ = "budgets"
+    __table_args__ = (Index("ix_budgets_category", "category"),)
+    
+    id = Column(Integer, primary_key=True)
+    category = Column(String, nullable=True)
+    period = Column(String, nullable=False)  # 'day', 'week' (from Monday) or 'month'
+    limit = Column(Float, nullable=False)
+    warn_percentage = Column(Float, nullable=False, default=80)  # share of limit that raises a warning
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class BudgetSpend(Base):
+    """Running expense total of a budget per period, maintained alongside the rollups"""
+    __tablename__ = "budget_spend"
+    
+    budget_id = Column(Integer, primary_key=True)
+    period_start = Column(String, primary_key=True)  # Format: 'YYYY-MM-DD'
+    spent = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,179 @@
+"""
+Recurring-transaction detection
+Occurrences are grouped by merchant (merchant_key() of the description) and
+transaction type, and within a merchant into series whose amounts stay within
+a relative tolerance. A series is recurring once enough consecutive intervals
+between its occurrences fall in the same frequency band. One step function,
+advance(), serves both the full rebuild (a single pass over history sorted by
+timestamp) and the incremental update made for each new transaction.
+"""
+
+import bisect
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (frequency, shortest and longest interval in days); the bands leave room for
+# months of different lengths and for payments moved to the next business day
+FREQUENCIES = [
+    ("weekly", 6, 8),
+    ("biweekly", 13, 15),
+    ("monthly", 27, 34),
+    ("quarterly", 85, 97),
+    ("yearly", 355, 376),
+]
+LONGEST_INTERVAL = {name: longest for name, _, longest in FREQUENCIES}
+CALENDAR_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+FIXED_DAYS = {"weekly": 7, "biweekly": 14}
+
+# Consecutive intervals at one frequency before a series counts as recurring (three occurrences)
+MIN_INTERVALS = 2
+
+class Series:
+    """A merchant's occurrences at a steady amount: the state advance() moves forward
+
+    Attribute names follow the recurring_series table, so its ORM rows can be
+    advanced the same way.
+    """
+
+    __slots__ = (
+        "merchant", "transaction_type", "description", "category", "amount", "occurrences",
+        "first_seen", "last_seen", "frequency", "streak", "streak_start",
+    )
+
+    def __init__(self, merchant: str, transaction_type: str, description: str, category: Optional[str],
+                 amount: float, timestamp: datetime):
+        self.merchant = merchant
+        self.transaction_type = transaction_type
+        self.description = description
+        self.category = category
+        self.amount = amount
+        self.occurrences = 1
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.frequency: Optional[str] = None
+        self.streak = 0  # consecutive intervals at frequency
+        self.streak_start = timestamp
+
+    def values(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def frequency_of(interval: timedelta) -> Optional[str]:
+    days = interval.total_seconds() / 86400
+    for name, shortest, longest in FREQUENCIES:
+        if shortest <= days <= longest:
+            return name
+    return None
+
+def advance(series, description: str, category: Optional[str], amount: float, timestamp: datetime):
+    """Fold in an occurrence no older than series.last_seen"""
+    frequency = frequency_of(timestamp - series.last_seen)
+    if frequency is None:
+        series.frequency, series.streak, series.streak_start = None, 0, timestamp
+    elif frequency == series.frequency:
+        series.streak += 1
+    else:
+        series.frequency, series.streak, series.streak_start = frequency, 1, series.last_seen
+    # The latest occurrence sets the amount, so gradual price changes stay in the series
+    series.description = description
+    series.category = category
+    series.amount = amount
+    series.occurrences += 1
+    series.last_seen = timestamp
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+def next_due(series) -> date:
+    last = series.last_seen.date()
+    if series.frequency in CALENDAR_MONTHS:
+        return add_months(last, CALENDAR_MONTHS[series.frequency])
+    return last + timedelta(days=FIXED_DAYS[series.frequency])
+
+def is_active(series, today: date) -> bool:
+    """Not overdue: the next occurrence could still arrive within the frequency band"""
+    return (today - series.last_seen.date()).days <= LONGEST_INTERVAL[series.frequency]
+
+class Group:
+    """A merchant's series kept sorted by amount, so matching an occurrence is a bisect"""
+
+    __slots__ = ("amounts", "members")
+
+    def __init__(self):
+        self.amounts: List[float] = []
+        self.members: List = []
+
+    def add(self, series):
+        index = bisect.bisect_right(self.amounts, series.amount)
+        self.amounts.insert(index, series.amount)
+        self.members.insert(index, series)
+
+    def remove(self, series):
+        index = bisect.bisect_left(self.amounts, series.amount)
+        while self.members[index] is not series:
+            index += 1
+        del self.amounts[index], self.members[index]
+
+    def closest(self, amount: float, tolerance: float):
+        """The series whose latest amount is nearest to amount, if within tolerance (relative), else None
+
+        Ties go to the older series, so the choice doesn't depend on insertion order.
+        """
+        amounts = self.amounts
+        candidates = self.members
+        if tolerance < 1:
+            # Moving away from amount, the gap grows faster than the tolerance allows for,
+            # so only the nearest amount on either side (and its equals) can match
+            index = bisect.bisect_left(amounts, amount)
+            start = bisect.bisect_left(amounts, amounts[index - 1]) if index else 0
+            stop = bisect.bisect_right(amounts, amounts[index]) if index < len(amounts) else index
+            candidates = candidates[start:stop]
+        best, best_gap = None, None
+        for series in candidates:
+            gap = abs(amount - series.amount)
+            if gap <= tolerance * abs(series.amount) and (
+                best is None or gap < best_gap or (gap == best_gap and series.first_seen < best.first_seen)
+            ):
+                best, best_gap = series, gap
+        return best
+
+class Detector:
+    """Series for occurrences fed in timestamp order, continuing from existing series
+
+    existing can be any objects with Series' attributes (e.g. ORM rows); series
+    started here are collected in created.
+    """
+
+    def __init__(self, tolerance: float, existing: Iterable = ()):
+        self.tolerance = tolerance
+        self.created: List[Series] = []
+        self._groups: Dict[Tuple[str, str], Group] = {}
+        for series in existing:
+            self._group(series.merchant, series.transaction_type).add(series)
+
+    def _group(self, merchant: str, transaction_type: str) -> Group:
+        group = self._groups.get((merchant, transaction_type))
+        if group is None:
+            group = self._groups[merchant, transaction_type] = Group()
+        return group
+
+    def observe(self, merchant: str, transaction_type: str, description: str, category: Optional[str],
+                amount: float, timestamp: datetime) -> bool:
+        """Add an occurrence; False if it is older than the latest one of its series and was left out"""
+        group = self._group(merchant, transaction_type)
+        series = group.closest(amount, self.tolerance)
+        if series is None:
+            series = Series(merchant, transaction_type, description, category, amount, timestamp)
+            group.add(series)
+            self.created.append(series)
+        elif timestamp < series.last_seen:
+            return False
+        elif amount == series.amount:
+            advance(series, description, category, amount, timestamp)
+        else:
+            group.remove(series)
+            advance(series, description, category, amount, timestamp)
+            group.add(series)
+        return True
@@ -1,12 +1,37 @@
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from main import app, SessionLocal, Transaction, Base, engine
-from sqlalchemy import text
+from main import app, SessionLocal, Transaction, MonthlyRollup, Base, engine, rebuild_rollups, encode_cursor
+import main
+from categorizer import KeywordMatcher, merchant_key
+from dedup import DuplicateIndex
+from events import EventBroker, sse_stream
+from http_cache import ResponseCache
+from sqlalchemy import text, event, inspect
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../sdk'))
+from finance_sdk import AsyncFinanceTrackerSDK, FinanceTrackerSDK, Transaction as SDKTransaction
 
 # Create test database
 @pytest.fixture(scope="function")
 def db():
     Base.metadata.create_all(bind=engine)
+    if main.duplicate_index is not None:
+        main.duplicate_index.clear()
+    main.category_overrides.clear()
+    main.record_write()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -14,6 +39,21 @@ def db():
 def client(db):
     return TestClient(app)
 
+def create_baseline_database():
+    """Replace the schema with the transactions table of migration 001, holding two September rows"""
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE transactions (id INTEGER NOT NULL PRIMARY KEY, description VARCHAR NOT NULL, "
+            "amount FLOAT NOT NULL, transaction_type VARCHAR NOT NULL, category VARCHAR, "
+            "auto_tagged BOOLEAN NOT NULL DEFAULT 1, timestamp DATETIME NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (description, amount, transaction_type, category, timestamp) VALUES "
+            "('Rent', -1200, 'expense', 'Rent', '2026-09-01 09:00:00.000000'), "
+            "('Salary', 3000, 'income', 'Salary', '2026-09-15 09:00:00.000000')"
+        )
+
 class TestTransactionCreation:
     def test_add_expense_transaction(self, client):
         """Test adding an expense transaction"""
@@ -95,6 +135,166 @@ class TestAutoCategorization:
             assert response.status_code == 200
             assert response.json()["category"] == "Transport"
 
+class TestCategoryMatcher:
+    def test_rule_order_wins_over_text_position(self):
+        """Test that the first matching category in rule order wins, as before"""
+        matcher = KeywordMatcher({"Food": ["uber eats"], "Transport": ["uber", "gas"], "Utilities": ["gas bill"]})
+        assert matcher.match("Monthly gas bill") == "Transport"
+        assert matcher.match("UBER EATS delivery") == "Food"
+        assert matcher.match("uber to airport") == "Transport"
+        assert matcher.match("Bookshop") is None
+
+    def test_overlapping_keywords(self):
+        """Test keywords found only through suffix links"""
+        matcher = KeywordMatcher({"A": ["she"], "B": ["he", "hers"]})
+        assert matcher.match("ushers") == "A"
+        assert matcher.match("his hers") == "B"
+
+    def test_batch_matches_single(self):
+        """Test that auto_categorize_batch agrees with auto_categorize"""
+        descriptions = ["Starbucks", "Monthly salary", "Unknown", "Unknown", "Gas bill"]
+        types = ["expense", "income", "income", "expense", "expense"]
+        assert main.auto_categorize_batch(descriptions, types) == [
+            main.auto_categorize(d, t) for d, t in zip(descriptions, types)
+        ]
+
+    def test_set_category_map_recompiles(self):
+        """Test that replacing the rules rebuilds the matcher"""
+        original = main.CATEGORY_MAP
+        try:
+            main.set_category_map({"Groceries": ["trader joe"], **original})
+            assert main.auto_categorize("Trader Joe's", "expense") == "Groceries"
+        finally:
+            main.set_category_map(original)
+        assert main.auto_categorize("Trader Joe's", "expense") == "Other"
+
+class TestLearnedCategories:
+    def _insert(self, rows):
+        """Historical rows as (description, category, auto_tagged)"""
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+                "VALUES (?, -10.0, 'expense', ?, ?, '2024-01-15 12:00:00.000000')",
+                rows,
+            )
+        db = SessionLocal()
+        rebuild_rollups(db)
+        db.close()
+
+    def _categories(self):
+        db = SessionLocal()
+        try:
+            return [(tx.description, tx.category, tx.auto_tagged) for tx in db.query(Transaction).order_by(Transaction.id)]
+        finally:
+            db.close()
+
+    def test_merchant_key(self):
+        """Test that store numbers and punctuation do not split a merchant"""
+        assert merchant_key("STARBUCKS #1234") == merchant_key("Starbucks 88") == "starbucks"
+        assert merchant_key("McDonald's lunch") == "mcdonald's lunch"
+        assert merchant_key("#1234") == ""
+
+    def test_reclassify_teaches_future_rows(self, client):
+        """Test that a manual correction categorizes the merchant's next transactions"""
+        tx_id = client.post("/transactions/", json={
+            "description": "Acme Cloud #1", "amount": 15.00, "transaction_type": "expense"
+        }).json()["id"]
+        client.patch(f"/transactions/{tx_id}/reclassify", json={"category": "Subscriptions"})
+
+        response = client.post("/transactions/", json={
+            "description": "ACME CLOUD 2", "amount": 15.00, "transaction_type": "expense"
+        })
+        assert response.json()["category"] == "Subscriptions"
+        assert response.json()["auto_tagged"] is True
+        # Income from the same name is a different override key
+        assert main.auto_categorize("Acme Cloud", "income") == "Salary"
+        # Bulk imports go through the same lookup
+        assert main.auto_categorize_batch(["Acme Cloud 3", "Pizza"], ["expense", "expense"]) == ["Subscriptions", "Food"]
+
+        # Persisted: a fresh cache reloads it from the database
+        main.category_overrides.clear()
+        assert main.auto_categorize("Acme Cloud 4", "expense") == "Subscriptions"
+
+    def test_retag_job_spreads_correction(self, client, monkeypatch):
+        """Test that the job re-tags auto-tagged history in chunks and leaves manual rows alone"""
+        self._insert([
+            ("Spotify #1", "Entertainment", True),
+            ("Spotify #2", "Entertainment", True),
+            ("Spotify family", "Entertainment", True),
+            ("Spotify #3", "Music", False),
+            ("Spotify #4", "Entertainment", True),
+            ("Pizza", "Food", True),
+        ])
+        client.patch("/transactions/1/reclassify", json={"category": "Subscriptions"})
+
+        monkeypatch.setattr(main, "RETAG_SCAN_SIZE", 2)
+        db = SessionLocal()
+        try:
+            assert main.run_retag_jobs(db) == 2
+            job = db.query(main.RetagJob).one()
+            assert (job.status, job.last_id, job.updated) == ("done", 6, 2)
+        finally:
+            db.close()
+
+        assert self._categories() == [
+            ("Spotify #1", "Subscriptions", False),
+            ("Spotify #2", "Subscriptions", True),
+            ("Spotify family", "Entertainment", True),  # a different merchant key
+            ("Spotify #3", "Music", False),
+            ("Spotify #4", "Subscriptions", True),
+            ("Pizza", "Food", True),
+        ]
+        summary = client.get("/transactions/summary").json()[0]["by_category"]
+        assert {item["category"]: item["count"] for item in summary} == {
+            "Subscriptions": 3, "Entertainment": 1, "Music": 1, "Food": 1
+        }
+
+    def test_retag_job_matches_accented_merchants(self, client):
+        """Test that re-tagging reaches history whose non-ASCII letters differ in case"""
+        self._insert([("CAFÉ NERO 12", "Other", True), ("Café Nero 7", "Other", True), ("Cafe Nero 3", "Other", True)])
+        client.patch("/transactions/2/reclassify", json={"category": "Coffee"})
+        db = SessionLocal()
+        try:
+            assert main.run_retag_jobs(db) == 1
+        finally:
+            db.close()
+        assert [category for _, category, _ in self._categories()] == ["Coffee", "Coffee", "Other"]
+        created = client.post("/transactions/", json={"description": "CAFÉ NERO 99", "amount": 4.0, "transaction_type": "expense"})
+        assert created.json()["category"] == "Coffee"
+
+    def test_retag_job_resumes(self, client, monkeypatch):
+        """Test that progress is committed per chunk and a new correction supersedes the old job"""
+        self._insert([(f"Hulu {i}", "Entertainment", True) for i in range(1, 7)])
+        client.patch("/transactions/1/reclassify", json={"category": "Streaming"})
+        monkeypatch.setattr(main, "RETAG_SCAN_SIZE", 2)
+
+        db = SessionLocal()
+        first_job = db.query(main.RetagJob.id).scalar()
+        assert main.retag_chunk(db, first_job) == 1  # ids 1-2, id 1 is manual now
+        db.close()
+
+        # Interrupted here; a second correction replaces the unfinished job
+        client.patch("/transactions/2/reclassify", json={"category": "Video"})
+        db = SessionLocal()
+        try:
+            assert db.get(main.RetagJob, first_job) is None
+            main.run_retag_jobs(db)
+        finally:
+            db.close()
+        assert [category for _, category, _ in self._categories()] == ["Streaming"] + ["Video"] * 5
+
+    def test_background_worker(self, db, monkeypatch):
+        """Test that the startup worker picks up a new correction without another request"""
+        self._insert([("Disney plus 1", "Entertainment", True), ("Disney plus 2", "Entertainment", True)])
+        monkeypatch.setattr(main, "RETAG_PAUSE_SECONDS", 0)
+        with TestClient(app) as client:
+            client.patch("/transactions/1/reclassify", json={"category": "Streaming"})
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and self._categories()[1][1] != "Streaming":
+                time.sleep(0.02)
+        assert self._categories()[1][1] == "Streaming"
+        assert not main.retag_thread.is_alive()
+
 class TestDuplicateDetection:
     def test_duplicate_detection(self, client):
         """Test duplicate transaction detection"""
@@ -115,6 +315,58 @@ class TestDuplicateDetection:
         assert response2.status_code == 400
         assert "Duplicate transaction detected" in response2.json()["detail"]
 
+    def test_duplicate_check_skips_sql(self, client):
+        """Test that a duplicate is rejected from the in-memory index without querying transactions"""
+        payload = {"description": "Cinema", "amount": 20.00, "transaction_type": "expense"}
+        assert client.post("/transactions/", json=payload).status_code == 200
+
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.post("/transactions/", json=payload)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        assert response.status_code == 400
+        assert not [sql for sql in statements if "transactions" in sql]
+
+    def test_duplicate_allowed_after_delete(self, client):
+        """Test that deleting a transaction frees its key in the index"""
+        payload = {"description": "Gym", "amount": 30.00, "transaction_type": "expense"}
+        tx_id = client.post("/transactions/", json=payload).json()["id"]
+        client.delete(f"/transactions/{tx_id}")
+        assert client.post("/transactions/", json=payload).status_code == 200
+
+    def test_index_warms_from_database(self, client):
+        """Test that rows stored before the index was loaded are still detected"""
+        db = SessionLocal()
+        db.add(Transaction(
+            description="Spotify",
+            amount=-9.99,
+            transaction_type="expense",
+            category="Entertainment",
+            timestamp=datetime.utcnow()
+        ))
+        db.commit()
+        db.close()
+        main.duplicate_index.clear()
+
+        response = client.post("/transactions/", json={
+            "description": "Spotify",
+            "amount": 9.99,
+            "transaction_type": "expense"
+        })
+        assert response.status_code == 400
+
+    def test_window_eviction(self):
+        """Test that keys expire once they leave the window"""
+        index = DuplicateIndex(timedelta(hours=1))
+        start = datetime(2024, 1, 1, 12, 0)
+        index.load([(("Rent", -900.0, "expense"), start)], now=start)
+        assert index.is_duplicate(("Rent", -900.0, "expense"), now=start + timedelta(minutes=59))
+        assert not index.is_duplicate(("Rent", -900.0, "expense"), now=start + timedelta(minutes=61))
+        assert len(index) == 0
+
     def test_different_amount_not_duplicate(self, client):
         """Test that different amounts are not flagged as duplicate"""
         client.post("/transactions/", json={
@@ -130,6 +382,96 @@ class TestDuplicateDetection:
         })
         assert response.status_code == 200
 
+class TestBulkImport:
+    def test_csv_import(self, client):
+        """Test importing a CSV statement with auto-categorization"""
+        body = (
+            "description,amount,transaction_type,category,timestamp\n"
+            "Starbucks,4.50,expense,,2024-01-03T08:00:00\n"
+            "\"Rent, January\",1200,expense,Rent,2024-01-01T00:00:00\n"
+            "Paycheck,3000,income,,2024-01-15T09:00:00\n"
+        )
+        response = client.post("/transactions/bulk", content=body, headers={"Content-Type": "text/csv"})
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["created"], data["duplicates"], data["errors"]) == (3, 0, 0)
+
+        transactions = {tx["description"]: tx for tx in client.get("/transactions/").json()}
+        assert transactions["Starbucks"]["category"] == "Food"
+        assert transactions["Starbucks"]["amount"] == -4.50
+        assert transactions["Rent, January"]["auto_tagged"] == False
+        assert transactions["Paycheck"]["timestamp"] == "2024-01-15T09:00:00"
+
+        summary = client.get("/transactions/summary").json()
+        assert summary[0]["income_total"] == 3000.00
+        assert summary[0]["expense_total"] == 1204.50
+
+    def test_ndjson_import_reports_rows(self, client):
+        """Test per-row results for created, duplicate and invalid NDJSON records"""
+        client.post("/transactions/", json={
+            "description": "Netflix",
+            "amount": 15.99,
+            "transaction_type": "expense"
+        })
+        lines = [
+            '{"description": "Netflix", "amount": 15.99, "transaction_type": "expense"}',
+            '{"description": "Gym", "amount": 30, "transaction_type": "expense", "timestamp": "2024-02-01T10:00:00"}',
+            '{"description": "Gym", "amount": 30, "transaction_type": "expense", "timestamp": "2024-02-01T10:30:00"}',
+            '{"description": "Bad", "amount": 1, "transaction_type": "refund"}',
+            'not json',
+        ]
+        response = client.post(
+            "/transactions/bulk",
+            content="\n".join(lines),
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["status"] for row in data["rows"]] == ["duplicate", "created", "duplicate", "error", "error"]
+        assert [row["row"] for row in data["rows"]] == [1, 2, 3, 4, 5]
+        assert (data["created"], data["duplicates"], data["errors"]) == (1, 2, 2)
+
+    def test_non_finite_amounts_rejected(self, client):
+        """Test reporting nan and inf amounts as row errors instead of storing them"""
+        body = (
+            "description,amount,transaction_type\n"
+            "Lunch,nan,expense\n"
+            "Dinner,inf,expense\n"
+            "Coffee,3.50,expense\n"
+        )
+        response = client.post("/transactions/bulk", content=body, headers={"Content-Type": "text/csv"})
+        assert response.status_code == 200
+        data = response.json()
+        assert [row["status"] for row in data["rows"]] == ["error", "error", "created"]
+        assert [row["detail"] for row in data["rows"][:2]] == ["amount must be a number"] * 2
+        assert [tx["description"] for tx in client.get("/transactions/").json()] == ["Coffee"]
+        assert client.get("/transactions/summary").status_code == 200
+
+    def test_batch_maintains_search_feed_and_version(self, client):
+        """Test that an import updates what its skipped row triggers would have"""
+        client.post("/transactions/", json={"description": "Netflix", "amount": 15.99, "transaction_type": "expense"})
+        cursor = client.get("/transactions/changes").json()["cursor"]
+        etag = client.get("/transactions/").headers["ETag"]
+        body = "description,amount,transaction_type\nWhole Foods,80,expense\nShell gas,40,expense\n"
+        client.post("/transactions/bulk", content=body, headers={"Content-Type": "text/csv"})
+        
+        assert [tx["description"] for tx in client.get("/transactions/search?q=shell").json()] == ["Shell gas"]
+        changes = client.get("/transactions/changes", params={"since": cursor}).json()["changes"]
+        assert [(change["op"], change["transaction"]["description"]) for change in changes] == [
+            ("insert", "Whole Foods"), ("insert", "Shell gas"),
+        ]
+        assert client.get("/transactions/", headers={"If-None-Match": etag}).status_code == 200
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT COUNT(*) FROM bulk_inserts").scalar() == 0
+        # Single-row writes still go through the triggers
+        client.post("/transactions/", json={"description": "Shell station", "amount": 30, "transaction_type": "expense"})
+        assert len(client.get("/transactions/search?q=shell").json()) == 2
+
+    def test_unsupported_content_type(self, client):
+        """Test rejecting uploads that are neither CSV nor NDJSON"""
+        response = client.post("/transactions/bulk", content="{}", headers={"Content-Type": "application/json"})
+        assert response.status_code == 415
+
 class TestTransactionRetrieval:
     def test_get_all_transactions(self, client):
         """Test retrieving all transactions"""
@@ -188,6 +530,314 @@ class TestTransactionRetrieval:
         assert len(data) == 1
         assert data[0]["category"] == "Food"
 
+class TestPagination:
+    def _seed(self, count):
+        db = SessionLocal()
+        for i in range(count):
+            db.add(Transaction(
+                description=f"Coffee {i}",
+                amount=-3.00,
+                transaction_type="expense",
+                category="Food",
+                # Pairs share a timestamp to exercise the id tie-break
+                timestamp=datetime(2024, 1, 1 + i // 2)
+            ))
+        db.commit()
+        db.close()
+
+    def test_keyset_pages_cover_all_rows(self, client):
+        """Test walking every page with the next cursor"""
+        self._seed(7)
+        seen = []
+        url = "/transactions/?limit=3"
+        while True:
+            response = client.get(url)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 3
+            seen.extend(tx["id"] for tx in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            url = f"/transactions/?limit=3&after={cursor}"
+
+        full = [tx["id"] for tx in client.get("/transactions/").json()]
+        assert seen == full
+        assert len(set(seen)) == 7
+
+    def test_no_cursor_on_last_page(self, client):
+        """Test that a page holding the remaining rows has no cursor"""
+        self._seed(2)
+        response = client.get("/transactions/?limit=2")
+        assert len(response.json()) == 2
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_invalid_cursor(self, client):
+        """Test rejecting a malformed cursor"""
+        response = client.get("/transactions/?after=not-a-cursor")
+        assert response.status_code == 400
+
+    def test_field_projection(self, client):
+        """Test returning only the requested fields"""
+        self._seed(1)
+        response = client.get("/transactions/?fields=description,amount")
+        assert response.status_code == 200
+        assert response.json() == [{"description": "Coffee 0", "amount": -3.00}]
+
+    def test_unknown_field(self, client):
+        """Test rejecting a projection of unknown fields"""
+        response = client.get("/transactions/?fields=description,secret")
+        assert response.status_code == 400
+
+class TestStreaming:
+    def _seed(self):
+        db = SessionLocal()
+        rows = [
+            ("Café \"Zoë\" 東京\n\t\x01", -4.5, "Food", datetime(2024, 1, 1, 8, 30)),
+            ("Salary", 5000.0, "Salary", datetime(2024, 1, 1, 9, 0, 0, 123456)),
+            ("Lottery", 1e16, "Other", datetime(2024, 1, 2)),
+            ("Rounding", 0.00001, "Other", datetime(2024, 1, 2)),
+            ("Refund", -0.0, "Shopping", datetime(2024, 1, 3, 23, 59, 59, 999999)),
+        ]
+        for i in range(3):
+            rows.append((f"Uber ride {i}", -12.75, "Transport", datetime(2024, 1, 4 + i)))
+        for description, amount, category, timestamp in rows:
+            db.add(Transaction(
+                description=description, amount=amount, transaction_type="income" if amount > 0 else "expense",
+                category=category, timestamp=timestamp,
+            ))
+        db.commit()
+        db.close()
+
+    def test_stream_matches_default_output(self, client, monkeypatch):
+        """Test that the streaming path returns the default path's bytes and headers"""
+        self._seed()
+        monkeypatch.setattr(main, "STREAM_CHUNK_ROWS", 3)
+        for query in ["", "limit=3", "fields=amount,description,id", "category=Transport", "q=uber", "month=2024-01&limit=100"]:
+            default = client.get(f"/transactions/?{query}")
+            streamed = client.get(f"/transactions/?{query}&stream=true")
+            assert streamed.status_code == 200
+            assert streamed.content == default.content, query
+            assert streamed.headers["content-type"] == default.headers["content-type"]
+            assert streamed.headers.get("X-Next-Cursor") == default.headers.get("X-Next-Cursor")
+        assert client.get("/transactions/?stream=true&category=None").content == b"[]"
+
+    def test_ndjson(self, client, monkeypatch):
+        """Test that NDJSON holds one default-path object per line"""
+        self._seed()
+        monkeypatch.setattr(main, "STREAM_CHUNK_ROWS", 3)
+        expected = client.get("/transactions/?fields=id,amount,timestamp").json()
+        response = client.get("/transactions/?fields=id,amount,timestamp", headers={"Accept": "application/x-ndjson"})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.content.endswith(b"\n")
+        assert [json.loads(line) for line in response.content.splitlines()] == expected
+
+    def test_stream_revalidates_without_caching(self, client):
+        """Test that streamed responses get an ETag of their own but are not kept in the response cache"""
+        self._seed()
+        main.response_cache.clear()
+        streamed = client.get("/transactions/?stream=true")
+        ndjson = client.get("/transactions/", headers={"Accept": "application/x-ndjson"})
+        assert len(main.response_cache) == 0
+        default = client.get("/transactions/")
+        assert len({streamed.headers["ETag"], ndjson.headers["ETag"], default.headers["ETag"]}) == 3
+        
+        again = client.get("/transactions/?stream=true", headers={"If-None-Match": streamed.headers["ETag"]})
+        assert again.status_code == 304
+
+class TestSearch:
+    def _add(self, client, *descriptions):
+        for description in descriptions:
+            response = client.post("/transactions/", json={
+                "description": description, "amount": 10.00, "transaction_type": "expense"
+            })
+            assert response.status_code == 200
+
+    def _search(self, client, q, **params):
+        response = client.get("/transactions/search", params={"q": q, **params})
+        assert response.status_code == 200
+        return [tx["description"] for tx in response.json()]
+
+    def test_prefix_and_phrase(self, client):
+        """Test that words are ANDed, "quotes" match a phrase and a trailing * a prefix"""
+        self._add(client, "Starbucks Coffee #12", "Whole Foods Market", "Foods Whole Sale", "Starbright Cinema")
+        assert sorted(self._search(client, "starb*")) == ["Starbright Cinema", "Starbucks Coffee #12"]
+        assert self._search(client, "starb") == []
+        assert sorted(self._search(client, "whole foods")) == ["Foods Whole Sale", "Whole Foods Market"]
+        assert self._search(client, '"whole foods"') == ["Whole Foods Market"]
+
+    def test_case_and_diacritics_folded(self, client):
+        """Test that matching ignores case and accents"""
+        self._add(client, "Café Nero")
+        assert self._search(client, "CAFE") == ["Café Nero"]
+
+    def test_ranked_by_relevance(self, client):
+        """Test that closer matches rank first"""
+        self._add(client, "Amazon Marketplace order refund adjustment", "Amazon Amazon Prime")
+        assert self._search(client, "amazon") == ["Amazon Amazon Prime", "Amazon Marketplace order refund adjustment"]
+        assert self._search(client, "amazon", limit=1, offset=1) == ["Amazon Marketplace order refund adjustment"]
+
+    def test_query_syntax_is_literal(self, client):
+        """Test that FTS5 operators in user input are searched for, not interpreted"""
+        self._add(client, "Shell OR station", "Nero coffee")
+        assert self._search(client, "description:nero") == []
+        assert self._search(client, "coffee OR shell") == []
+        assert self._search(client, 'shell "unterminated') == []
+        assert self._search(client, "shell OR") == ["Shell OR station"]
+        assert client.get("/transactions/search", params={"q": ' * "" '}).status_code == 400
+
+    def test_list_filter(self, client):
+        """Test q on the list endpoint alongside the other filters and keyset pagination"""
+        self._add(client, "Uber trip", "Uber Eats order", "Uber trip home", "Lyft trip")
+        response = client.get("/transactions/?q=uber&category=Transport")
+        assert sorted(tx["description"] for tx in response.json()) == ["Uber trip", "Uber trip home"]
+        
+        first = client.get("/transactions/?q=trip&limit=2")
+        assert [tx["description"] for tx in first.json()] == ["Lyft trip", "Uber trip home"]
+        second = client.get(f"/transactions/?q=trip&limit=2&after={first.headers['X-Next-Cursor']}")
+        assert [tx["description"] for tx in second.json()] == ["Uber trip"]
+        assert "X-Next-Cursor" not in second.headers
+        assert client.get("/transactions/?q=*").status_code == 400
+
+    def test_list_pages_with_backdated_rows(self, client):
+        """Test that search pages stay in timestamp order when ids do not follow timestamps"""
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+                "VALUES (?, -4.0, 'expense', 'Food', 1, ?)",
+                [(f"Coffee {i}", f"2024-01-01 00:00:{(i * 37) % 60:02d}.{i:06d}") for i in range(60)],
+            )
+        expected = [tx["id"] for tx in client.get("/transactions/?q=coffee").json()]
+        assert len(expected) == 60
+
+        paged = []
+        url = "/transactions/?q=coffee&limit=3"
+        while url:
+            response = client.get(url)
+            paged += [tx["id"] for tx in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/transactions/?q=coffee&limit=3&after={cursor}" if cursor else None
+        assert paged == expected
+
+    def test_rank_window(self, client, monkeypatch):
+        """Test that ranked search scores only the newest SEARCH_RANK_WINDOW matches"""
+        monkeypatch.setattr(main, "SEARCH_RANK_WINDOW", 2)
+        self._add(client, "Gym membership", "Gym day pass", "Gym")
+        assert sorted(self._search(client, "gym")) == ["Gym", "Gym day pass"]
+
+    def test_index_follows_writes(self, client):
+        """Test that inserts, imports, updates and deletes through any path keep the index in sync"""
+        self._add(client, "Netflix subscription", "Spotify subscription")
+        client.post("/transactions/bulk", content=json.dumps(
+            {"description": "Hulu subscription", "amount": 8.0, "transaction_type": "expense"}
+        ), headers={"Content-Type": "application/x-ndjson"})
+        assert len(self._search(client, "subscription")) == 3
+        
+        netflix = client.get("/transactions/?q=netflix").json()[0]
+        client.delete(f"/transactions/{netflix['id']}")
+        client.request("DELETE", "/transactions/", json={"filter": {"description": "Hulu%"}})
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE transactions SET description = 'Spotify family plan'")
+        assert self._search(client, "subscription") == []
+        assert self._search(client, "family") == ["Spotify family plan"]
+
+    def test_backfills_existing_rows(self, client):
+        """Test that creating the index on an existing database indexes the rows already there"""
+        self._add(client, "Costco wholesale")
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE transactions_fts")
+            for trigger in ("insert", "delete", "update"):
+                conn.exec_driver_sql(f"DROP TRIGGER transactions_fts_{trigger}")
+        Base.metadata.create_all(bind=engine)
+        main.record_write()
+        assert self._search(client, "costco") == ["Costco wholesale"]
+
+    def test_sdk_search(self, client):
+        """Test SDK search_transactions"""
+        self._add(client, "Trader Joe's", "Joe's Pizza")
+        sdk = FinanceTrackerSDK("http://testserver")
+        sdk.session = client
+        assert [tx.description for tx in sdk.search_transactions("trader jo*")] == ["Trader Joe's"]
+        assert len(sdk.search_transactions("joe", limit=1)) == 1
+
+class TestConditionalRequests:
+    def test_not_modified_until_write(self, client):
+        """Test 304 on a matching If-None-Match, and a new ETag once data changes"""
+        client.post("/transactions/", json={
+            "description": "Salary",
+            "amount": 3000.00,
+            "transaction_type": "income"
+        })
+        for url in ("/transactions/?limit=10", "/transactions/summary"):
+            first = client.get(url)
+            etag = first.headers["ETag"]
+            second = client.get(url, headers={"If-None-Match": etag})
+            assert second.status_code == 304
+            assert second.headers["ETag"] == etag
+
+        etag = client.get("/transactions/summary").headers["ETag"]
+        client.post("/transactions/", json={
+            "description": "Rent payment",
+            "amount": 1000.00,
+            "transaction_type": "expense"
+        })
+        response = client.get("/transactions/summary", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json()[0]["expense_total"] == 1000.00
+
+    def test_writes_from_other_processes_invalidate(self, client):
+        """Test that a write made outside this process changes the ETag and bypasses cached bodies"""
+        etag = client.get("/transactions/summary").headers["ETag"]
+        assert client.get("/transactions/summary").json() == []
+        
+        other = sqlite3.connect(engine.url.database)  # another worker or an admin script
+        with other:
+            other.execute(
+                "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+                "VALUES ('Rent', -1000, 'expense', 'Rent', 0, '2024-03-01 00:00:00.000000')"
+            )
+        other.close()
+        db = SessionLocal()
+        try:
+            rebuild_rollups(db)
+        finally:
+            db.close()
+        
+        response = client.get("/transactions/summary", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()[0]["expense_total"] == 1000.00
+
+    def test_etag_depends_on_query(self, client):
+        """Test that different filters get different ETags"""
+        expense = client.get("/transactions/?transaction_type=expense")
+        income = client.get("/transactions/?transaction_type=income")
+        assert expense.headers["ETag"] != income.headers["ETag"]
+
+    def test_cached_body_and_headers(self, client):
+        """Test that a cache hit replays the body and pagination header"""
+        for amount in (10.00, 20.00):
+            client.post("/transactions/", json={
+                "description": f"Coffee {amount}",
+                "amount": amount,
+                "transaction_type": "expense"
+            })
+        first = client.get("/transactions/?limit=1")
+        assert len(main.response_cache) == 1
+        second = client.get("/transactions/?limit=1")
+        assert second.json() == first.json()
+        assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+
+    def test_cache_is_bounded(self):
+        """Test LRU eviction of the response cache"""
+        cache = ResponseCache(maxsize=2)
+        cache.put("a", b"1", {})
+        cache.put("b", b"2", {})
+        cache.get("a")
+        cache.put("c", b"3", {})
+        assert cache.get("b") is None
+        assert cache.get("a") == (b"1", {})
+
 class TestTransactionDeletion:
     def test_delete_transaction(self, client):
         """Test deleting a transaction"""
@@ -233,6 +883,270 @@ class TestReclassification:
         assert data["category"] == "Entertainment"
         assert data["auto_tagged"] == False
 
+class TestBulkOperations:
+    @pytest.fixture
+    def seeded(self, client):
+        ids = {}
+        for description, amount, category in [
+            ("Starbucks #1", 4.00, None),
+            ("Starbucks #2", 5.00, None),
+            ("STARBUCKS reserve", 6.00, None),
+            ("Uber", 20.00, None),
+            ("Gift", 30.00, "Shopping"),
+        ]:
+            payload = {"description": description, "amount": amount, "transaction_type": "expense"}
+            if category:
+                payload["category"] = category
+            ids[description] = client.post("/transactions/", json=payload).json()["id"]
+        return ids
+
+    def _rollup_matches_rebuild(self):
+        db = SessionLocal()
+        try:
+            incremental = sorted(tuple(row) for row in db.query(
+                MonthlyRollup.month, MonthlyRollup.transaction_type, MonthlyRollup.category,
+                MonthlyRollup.total, MonthlyRollup.count
+            ))
+            rebuild_rollups(db)
+            rebuilt = sorted(tuple(row) for row in db.query(
+                MonthlyRollup.month, MonthlyRollup.transaction_type, MonthlyRollup.category,
+                MonthlyRollup.total, MonthlyRollup.count
+            ))
+        finally:
+            db.close()
+        return incremental == rebuilt
+
+    def test_reclassify_by_filter(self, client, seeded):
+        """Test reclassifying by a case-insensitive description pattern in one UPDATE"""
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.patch("/transactions/reclassify", json={
+                "category": "Coffee",
+                "filter": {"description": "starbucks%"}
+            })
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        assert response.status_code == 200
+        assert response.json() == {"affected": 3}
+        assert len([sql for sql in statements if sql.startswith("UPDATE transactions")]) == 1
+
+        coffee = client.get("/transactions/", params={"category": "Coffee"}).json()
+        assert {tx["description"] for tx in coffee} == {"Starbucks #1", "Starbucks #2", "STARBUCKS reserve"}
+        assert all(tx["auto_tagged"] is False for tx in coffee)
+        summary = client.get("/transactions/summary").json()[0]["by_category"]
+        assert {item["category"]: item["count"] for item in summary} == {"Coffee": 3, "Transport": 1, "Shopping": 1}
+        assert self._rollup_matches_rebuild()
+
+    def test_reclassify_by_ids(self, client, seeded):
+        """Test reclassifying an explicit id list"""
+        response = client.patch("/transactions/reclassify", json={
+            "category": "Entertainment",
+            "ids": [seeded["Uber"], seeded["Gift"], 999]
+        })
+        assert response.json() == {"affected": 2}
+        assert len(client.get("/transactions/", params={"category": "Entertainment"}).json()) == 2
+        assert self._rollup_matches_rebuild()
+
+    def test_delete_by_filter(self, client, seeded):
+        """Test deleting by category and auto_tagged flag"""
+        response = client.request("DELETE", "/transactions/", json={
+            "filter": {"category": "Food", "auto_tagged": True}
+        })
+        assert response.json() == {"affected": 3}
+        assert {tx["description"] for tx in client.get("/transactions/").json()} == {"Uber", "Gift"}
+        assert self._rollup_matches_rebuild()
+
+        # Deleted rows leave the duplicate index as well
+        again = client.post("/transactions/", json={
+            "description": "Starbucks #1",
+            "amount": 4.00,
+            "transaction_type": "expense"
+        })
+        assert again.status_code == 200
+
+    def test_delete_by_ids_and_date_range(self, client, seeded):
+        """Test deleting an id list, and a date range that matches nothing"""
+        response = client.request("DELETE", "/transactions", json={"ids": [seeded["Gift"]]})
+        assert response.json() == {"affected": 1}
+        response = client.request("DELETE", "/transactions/", json={
+            "filter": {"start": "2000-01-01T00:00:00Z", "end": "2001-01-01T00:00:00Z"}
+        })
+        assert response.json() == {"affected": 0}
+        assert len(client.get("/transactions/").json()) == 4
+
+    def test_selection_must_be_specific(self, client, seeded):
+        """Test that an empty filter, or ids together with a filter, is rejected"""
+        assert client.request("DELETE", "/transactions/", json={"filter": {}}).status_code == 400
+        assert client.request("DELETE", "/transactions/", json={}).status_code == 400
+        response = client.patch("/transactions/reclassify", json={
+            "category": "Food", "ids": [1], "filter": {"category": "Food"}
+        })
+        assert response.status_code == 400
+        assert len(client.get("/transactions/").json()) == 5
+
+    def test_sdk_bulk_methods(self, client, seeded):
+        """Test the SDK wrappers for both bulk endpoints"""
+        sdk = FinanceTrackerSDK("http://testserver")
+        sdk.session = client
+        assert sdk.reclassify_transactions("Coffee", filters={"description": "%starbucks%"}) == 3
+        assert sdk.delete_transactions(ids=[seeded["Uber"]]) == 1
+        assert sdk.delete_transactions(filters={"category": "Coffee"}) == 3
+        with pytest.raises(ValueError):
+            sdk.delete_transactions()
+
+class TestChangeFeed:
+    def add(self, client, description, amount=10.00):
+        return client.post("/transactions/", json={
+            "description": description,
+            "amount": amount,
+            "transaction_type": "expense"
+        }).json()["id"]
+
+    def test_feed_reports_inserts_updates_and_deletes(self, client):
+        """Test that the feed returns each mutation since the cursor, deletes as tombstones"""
+        kept = self.add(client, "Kept")
+        cursor = client.get("/transactions/changes").json()["cursor"]
+        assert client.get("/transactions/changes", params={"since": cursor}).json()["changes"] == []
+
+        added = self.add(client, "Starbucks")
+        client.patch(f"/transactions/{kept}/reclassify", json={"category": "Shopping"})
+        client.delete(f"/transactions/{kept}")
+        feed = client.get("/transactions/changes", params={"since": cursor}).json()
+
+        assert [(change["op"], change["id"]) for change in feed["changes"]] == [("insert", added), ("delete", kept)]
+        assert feed["changes"][0]["transaction"]["category"] == "Food"
+        assert feed["changes"][1]["transaction"] is None
+        assert feed["has_more"] is False
+        assert client.get("/transactions/changes", params={"since": feed["cursor"]}).json()["changes"] == []
+
+    def test_update_reports_current_row(self, client):
+        """Test that a reclassification shows up as an update carrying the new category"""
+        tx_id = self.add(client, "Coffee")
+        cursor = client.get("/transactions/changes").json()["cursor"]
+        client.patch(f"/transactions/{tx_id}/reclassify", json={"category": "Entertainment"})
+        change = client.get("/transactions/changes", params={"since": cursor}).json()["changes"][0]
+        assert change["op"] == "update"
+        assert change["transaction"]["category"] == "Entertainment"
+
+    def test_feed_pages(self, client):
+        """Test paging through the feed with has_more"""
+        for i in range(5):
+            self.add(client, f"Item {i}")
+        cursor, ids = "0", []
+        while True:
+            feed = client.get("/transactions/changes", params={"since": cursor, "limit": 2}).json()
+            ids += [change["id"] for change in feed["changes"]]
+            cursor = feed["cursor"]
+            if not feed["has_more"]:
+                break
+        assert len(ids) == 5 and len(set(ids)) == 5
+
+    def test_bulk_import_is_logged(self, client):
+        """Test that rows inserted by the bulk endpoint appear in the feed"""
+        cursor = client.get("/transactions/changes").json()["cursor"]
+        client.post(
+            "/transactions/bulk",
+            content="description,amount,transaction_type\nUber,10,expense\nLyft,12,expense\n",
+            headers={"Content-Type": "text/csv"}
+        )
+        feed = client.get("/transactions/changes", params={"since": cursor}).json()
+        assert [change["transaction"]["description"] for change in feed["changes"]] == ["Uber", "Lyft"]
+
+    def test_invalid_cursor(self, client):
+        """Test that a malformed cursor is rejected"""
+        assert client.get("/transactions/changes", params={"since": "abc"}).status_code == 400
+
+    def test_sdk_mirror_applies_deltas(self, client):
+        """Test that the SDK mirror matches the server after incremental syncs"""
+        sdk = FinanceTrackerSDK("http://testserver")
+        sdk.session = client
+        first = self.add(client, "Pizza")
+        self.add(client, "Metro")
+        sdk.sync()
+        assert {tx.description for tx in sdk.mirrored_transactions()} == {"Pizza", "Metro"}
+
+        third = self.add(client, "Netflix")
+        client.patch(f"/transactions/{third}/reclassify", json={"category": "Shopping"})
+        client.delete(f"/transactions/{first}")
+        assert sdk.sync() == 2  # one insert (already reclassified) and one delete
+
+        server = client.get("/transactions/").json()
+        assert [tx.id for tx in sdk.mirrored_transactions()] == [tx["id"] for tx in server]
+        assert sdk.mirror[third].category == "Shopping"
+
+class TestEventStream:
+    def test_slow_subscriber_drops_oldest(self):
+        """Test that a full queue keeps the newest events and counts the dropped ones"""
+        async def scenario():
+            broker = EventBroker(queue_size=3)
+            subscription = broker.subscribe()
+            for i in range(5):
+                broker.publish("created", {"n": i})
+            return await subscription.get(timeout=0.1)
+
+        events, dropped = asyncio.run(scenario())
+        assert [json.loads(data)["n"] for _, _, data in events] == [2, 3, 4]
+        assert dropped == 2
+
+    def test_publish_from_another_thread(self):
+        """Test that a publish from a worker thread wakes a waiting subscriber"""
+        async def scenario():
+            broker = EventBroker()
+            subscription = broker.subscribe()
+            threading.Timer(0.05, broker.publish, ("deleted", {"id": 1})).start()
+            return await subscription.get(timeout=5)
+
+        events, _ = asyncio.run(scenario())
+        assert [event_type for _, event_type, _ in events] == ["deleted"]
+
+    def test_sse_stream_format(self):
+        """Test the SSE framing, idle keepalives and unsubscribe on close"""
+        async def scenario():
+            broker = EventBroker()
+            subscription = broker.subscribe()
+            stream = sse_stream(broker, subscription, keepalive=0.01)
+            frames = [await stream.__anext__(), await stream.__anext__()]
+            broker.publish("created", {"id": 7})
+            frames.append(await stream.__anext__())
+            await stream.aclose()
+            return frames, len(broker)
+
+        frames, subscribers = asyncio.run(scenario())
+        assert frames == ["retry: 3000\n\n", ": keepalive\n\n", 'id: 1\nevent: created\ndata: {"id":7}\n\n']
+        assert subscribers == 0
+
+    def test_writes_publish_rollup_deltas(self, client):
+        """Test that create, reclassify and delete push the transaction and its rollup deltas"""
+        async def scenario():
+            subscription = main.event_broker.subscribe()
+            try:
+                created = await asyncio.to_thread(client.post, "/transactions/", json={
+                    "description": "Starbucks",
+                    "amount": 5.00,
+                    "transaction_type": "expense"
+                })
+                tx_id = created.json()["id"]
+                await asyncio.to_thread(
+                    client.patch, f"/transactions/{tx_id}/reclassify", json={"category": "Shopping"}
+                )
+                await asyncio.to_thread(client.delete, f"/transactions/{tx_id}")
+                return await subscription.get(timeout=1)
+            finally:
+                main.event_broker.unsubscribe(subscription)
+
+        events, _ = asyncio.run(scenario())
+        payloads = [(event_type, json.loads(data)) for _, event_type, data in events]
+        assert [event_type for event_type, _ in payloads] == ["created", "reclassified", "deleted"]
+        month = payloads[0][1]["transaction"]["timestamp"][:7]
+        assert payloads[0][1]["deltas"] == [
+            {"month": month, "transaction_type": "expense", "category": "Food", "total": 5.0, "count": 1}
+        ]
+        assert [(d["category"], d["count"]) for d in payloads[1][1]["deltas"]] == [("Food", -1), ("Shopping", 1)]
+        assert payloads[2][1]["transaction"]["category"] == "Shopping"
+        assert payloads[2][1]["deltas"][0]["total"] == -5.0
+
 class TestMonthlySummary:
     def test_monthly_summary(self, client):
         """Test getting monthly summary"""
@@ -277,3 +1191,950 @@ class TestMonthlySummary:
         assert len(food_items) > 0
         assert food_items[0]["total"] == 27.00
         assert food_items[0]["count"] == 2
+
+    def test_summary_month_bounds(self, client):
+        """Test limiting the summary to a month range"""
+        db = SessionLocal()
+        for month in (1, 2, 3):
+            db.add(Transaction(
+                description=f"Rent {month}",
+                amount=-1000.00,
+                transaction_type="expense",
+                category="Rent",
+                timestamp=datetime(2024, month, 15)
+            ))
+        db.commit()
+        rebuild_rollups(db)
+        db.close()
+
+        response = client.get("/transactions/summary?from_month=2024-02&to_month=2024-03")
+        assert response.status_code == 200
+        data = response.json()
+        assert [m["month"] for m in data] == ["2024-03", "2024-02"]
+        assert data[0]["expense_total"] == 1000.00
+        assert data[0]["by_category"] == [{"category": "Rent", "total": 1000.00, "count": 1}]
+
+    def test_summary_invalid_month(self, client):
+        """Test rejecting malformed month bounds"""
+        response = client.get("/transactions/summary?from_month=2024-13")
+        assert response.status_code == 400
+
+class TestMonthlyRollup:
+    def _rollup(self):
+        db = SessionLocal()
+        rows = {(r.transaction_type, r.category): (r.total, r.count) for r in db.query(MonthlyRollup).all()}
+        db.close()
+        return rows
+
+    def test_rollup_follows_writes(self, client):
+        """Test that create, reclassify and delete keep the rollup in step"""
+        tx_id = client.post("/transactions/", json={
+            "description": "McDonald's",
+            "amount": 12.00,
+            "transaction_type": "expense"
+        }).json()["id"]
+        client.post("/transactions/", json={
+            "description": "Pizza",
+            "amount": 8.00,
+            "transaction_type": "expense"
+        })
+        assert self._rollup() == {("expense", "Food"): (20.00, 2)}
+
+        client.patch(f"/transactions/{tx_id}/reclassify", json={"category": "Entertainment"})
+        assert self._rollup() == {
+            ("expense", "Food"): (8.00, 1),
+            ("expense", "Entertainment"): (12.00, 1),
+        }
+
+        client.delete(f"/transactions/{tx_id}")
+        assert self._rollup() == {("expense", "Food"): (8.00, 1)}
+
+    def test_rebuild_matches_incremental(self, client):
+        """Test that a rebuild reproduces the incrementally maintained rollup"""
+        for description, amount, tx_type in [
+            ("Salary", 3000.00, "income"),
+            ("Rent payment", 1000.00, "expense"),
+            ("Netflix", 15.00, "expense"),
+        ]:
+            client.post("/transactions/", json={
+                "description": description,
+                "amount": amount,
+                "transaction_type": tx_type
+            })
+        incremental = self._rollup()
+
+        db = SessionLocal()
+        assert rebuild_rollups(db) == 3
+        db.close()
+        assert self._rollup() == incremental
+
+    def test_daily_rollup_matches_rebuild(self, client):
+        """Test that imports and bulk edits keep the daily rollup equal to a rebuild"""
+        lines = ["description,amount,transaction_type,timestamp"]
+        lines += [f"Pizza {i},{5 + i},expense,2024-03-{1 + i % 9:02d}T12:00:00" for i in range(30)]
+        lines += ["Salary,3000,income,2024-03-01T09:00:00", "Uber,20,expense,2024-04-02T08:00:00"]
+        client.post("/transactions/bulk", content="\n".join(lines), headers={"Content-Type": "text/csv"})
+        client.patch("/transactions/reclassify", json={"filter": {"description": "Pizza 1%"}, "category": "Shopping"})
+        client.request("DELETE", "/transactions/", json={"filter": {"description": "Pizza 2%"}})
+        uber = client.get("/transactions/?q=uber").json()[0]
+        client.delete(f"/transactions/{uber['id']}")
+
+        def daily():
+            db = SessionLocal()
+            try:
+                return {
+                    (r.day, r.transaction_type, r.category): (round(r.total, 2), r.count)
+                    for r in db.query(main.DailyRollup).all()
+                }
+            finally:
+                db.close()
+
+        incremental = daily()
+        assert ("2024-04-02", "expense", "Transport") not in incremental
+        db = SessionLocal()
+        rebuild_rollups(db)
+        db.close()
+        assert daily() == incremental
+
+class TestTimeseries:
+    def _import(self, client, rows):
+        """Rows as (description, amount, transaction_type, timestamp)"""
+        lines = ["description,amount,transaction_type,timestamp"]
+        lines += [",".join(str(value) for value in row) for row in rows]
+        response = client.post("/transactions/bulk", content="\n".join(lines), headers={"Content-Type": "text/csv"})
+        assert response.json()["errors"] == 0
+
+    def _series(self, client, **params):
+        response = client.get("/analytics/timeseries", params=params)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_daily_buckets(self, client):
+        """Test dense daily buckets with totals, rolling spend and running category balances"""
+        self._import(client, [
+            ("Salary", 1000, "income", "2024-01-01T09:00:00"),
+            ("Pizza", 10, "expense", "2024-01-01T12:00:00"),
+            ("Pizza", 20, "expense", "2024-01-03T12:00:00"),
+            ("Uber", 5, "expense", "2024-01-09T12:00:00"),
+        ])
+        series = self._series(client)
+        assert [point["bucket"] for point in series] == [f"2024-01-{day:02d}" for day in range(1, 10)]
+        first, third, last = series[0], series[2], series[-1]
+        assert (first["income"], first["expense"], first["net"], first["count"]) == (1000, 10, 990, 2)
+        assert first["categories"] == {
+            "Salary": {"net": 1000, "balance": 1000},
+            "Food": {"net": -10, "balance": -10},
+        }
+        assert third["rolling_7d_expense"] == 30
+        assert series[1] == {
+            "bucket": "2024-01-02", "income": 0, "expense": 0, "net": 0, "count": 0,
+            "rolling_7d_expense": 10, "rolling_30d_expense": 10, "categories": {},
+        }
+        # 2024-01-03 is still inside the 7 days ending on the 9th, 2024-01-01 is not
+        assert (last["rolling_7d_expense"], last["rolling_30d_expense"]) == (25, 35)
+        assert last["categories"] == {"Transport": {"net": -5, "balance": -5}}
+
+    def test_week_and_month_buckets(self, client):
+        """Test that weeks start on Monday and balances carry in from before the range"""
+        self._import(client, [
+            ("Pizza", 10, "expense", "2024-01-31T12:00:00"),
+            ("Pizza", 20, "expense", "2024-02-04T12:00:00"),  # Sunday
+            ("Pizza", 40, "expense", "2024-02-05T12:00:00"),  # Monday
+        ])
+        weeks = self._series(client, bucket="week", start="2024-02-01", end="2024-02-29")
+        assert [point["bucket"] for point in weeks] == ["2024-01-29", "2024-02-05", "2024-02-12", "2024-02-19", "2024-02-26"]
+        assert weeks[0]["expense"] == 20  # only the days inside the range
+        assert weeks[0]["categories"]["Food"] == {"net": -20, "balance": -30}
+        assert weeks[1]["categories"]["Food"] == {"net": -40, "balance": -70}
+        assert weeks[1]["rolling_30d_expense"] == 70
+        
+        months = self._series(client, bucket="month")
+        assert [(point["bucket"], point["expense"]) for point in months] == [("2024-01-01", 10), ("2024-02-01", 60)]
+
+    def test_follows_writes(self, client):
+        """Test that the series reflects writes immediately, through the daily rollup"""
+        self._import(client, [("Pizza", 10, "expense", "2024-01-01T12:00:00")])
+        assert self._series(client)[0]["expense"] == 10
+        tx_id = client.get("/transactions/").json()[0]["id"]
+        client.patch(f"/transactions/{tx_id}/reclassify", json={"category": "Shopping"})
+        assert self._series(client)[0]["categories"] == {"Shopping": {"net": -10, "balance": -10}}
+        client.delete(f"/transactions/{tx_id}")
+        assert self._series(client) == []
+
+    def test_uncovered_days_aggregated_on_the_fly(self, client):
+        """Test that days before the daily rollup's coverage come from transactions"""
+        self._import(client, [
+            ("Pizza", 10, "expense", "2024-01-01T12:00:00"),
+            ("Pizza", 20, "expense", "2024-01-02T12:00:00"),
+        ])
+        expected = self._series(client)
+        # As left by migration 007 on a database that already had these rows
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM daily_rollups")
+            conn.exec_driver_sql("INSERT INTO rollup_coverage (rollup, start_day) VALUES ('daily', '2024-01-03')")
+        main.record_write()
+        assert self._series(client) == expected
+        
+        self._import(client, [("Pizza", 40, "expense", "2024-01-03T12:00:00")])
+        assert [point["expense"] for point in self._series(client)] == [10, 20, 40]
+        
+        db = SessionLocal()
+        rebuild_rollups(db)
+        assert db.query(main.RollupCoverage).count() == 0
+        db.close()
+        main.record_write()
+        assert [point["expense"] for point in self._series(client)] == [10, 20, 40]
+
+    def test_invalid_parameters(self, client):
+        """Test bucket and range validation"""
+        assert client.get("/analytics/timeseries?bucket=year").status_code == 422
+        assert client.get("/analytics/timeseries?start=2024-02-01&end=2024-01-01").status_code == 400
+        assert client.get("/analytics/timeseries?start=1900-01-01&end=2024-01-01").status_code == 400
+        assert self._series(client) == []
+
+class TestRecurring:
+    def _import(self, client, rows):
+        lines = ["description,amount,transaction_type,timestamp"]
+        lines += [f"{description},{amount},{kind},{timestamp.isoformat()}" for description, amount, kind, timestamp in rows]
+        response = client.post("/transactions/bulk", content="\n".join(lines), headers={"Content-Type": "text/csv"})
+        assert response.json()["errors"] == 0
+
+    def _series(self):
+        db = SessionLocal()
+        try:
+            return sorted(
+                tuple(value for name, value in vars(series).items() if name not in ("_sa_instance_state", "id"))
+                for series in db.query(main.RecurringSeries)
+            )
+        finally:
+            db.close()
+
+    def _history(self):
+        start = datetime(2024, 1, 5, 20, 0)
+        rows = []
+        for month, day in enumerate([5, 5, 6, 5, 7]):
+            rows.append((f"NETFLIX.COM {month:02d}", 15.99, "expense", start.replace(month=month + 1, day=day)))
+        for week in range(6):
+            rows.append(("Gym membership", 12.00 + week % 2, "expense", start + timedelta(weeks=week, hours=week)))
+        for day in (3, 4, 9, 17, 18, 30, 41):
+            rows.append(("Uber trip", 10.00 + day % 3, "expense", start + timedelta(days=day)))
+        for cycle in range(4):
+            rows.append(("ACME Payroll", 2000 + 25 * cycle, "income", start + timedelta(days=14 * cycle)))
+        rows.append(("NETFLIX.COM 99", 45.99, "expense", datetime(2024, 3, 20)))  # another plan: its own series
+        return sorted(rows, key=lambda row: row[3])
+
+    def test_detects_frequencies(self, client):
+        """Test monthly, weekly and biweekly series, with irregular and off-amount rows left out"""
+        self._import(client, self._history())
+        assert client.get("/recurring").json() == []  # all overdue by now
+        
+        items = client.get("/recurring?include_inactive=true").json()
+        assert sorted(item["merchant"] for item in items) == ["acme payroll", "gym membership", "netflix com"]
+        detected = {item["merchant"]: item for item in items}
+        netflix = detected["netflix com"]
+        assert (netflix["frequency"], netflix["occurrences"], netflix["amount"]) == ("monthly", 5, -15.99)
+        assert (netflix["start_date"], netflix["last_date"], netflix["next_due_date"]) == ("2024-01-05", "2024-05-07", "2024-06-07")
+        assert netflix["is_active"] is False
+        assert (detected["gym membership"]["frequency"], detected["gym membership"]["occurrences"]) == ("weekly", 6)
+        assert detected["acme payroll"]["frequency"] == "biweekly"
+        assert detected["acme payroll"]["amount"] == 2075.0
+
+    def test_incremental_matches_rebuild(self, client):
+        """Test that series advanced row by row equal a rebuild from history"""
+        history = self._history()
+        for start in range(0, len(history), 5):
+            self._import(client, history[start:start + 5])
+        incremental = self._series()
+        
+        db = SessionLocal()
+        try:
+            assert main.rebuild_recurring(db) == len(incremental)
+        finally:
+            db.close()
+        assert self._series() == incremental
+
+    def test_create_advances_series(self, client):
+        """Test that creating a transaction makes a series recurring without a rebuild"""
+        now = datetime.utcnow()
+        self._import(client, [("Spotify", 9.99, "expense", now - timedelta(days=62)), ("Spotify", 9.99, "expense", now - timedelta(days=31))])
+        assert client.get("/recurring").json() == []
+        
+        client.post("/transactions/", json={"description": "Spotify", "amount": 10.49, "transaction_type": "expense"})
+        [item] = client.get("/recurring").json()
+        assert (item["frequency"], item["occurrences"], item["amount"], item["is_active"]) == ("monthly", 3, -10.49, True)
+        assert item["next_due_date"] > now.date().isoformat()
+
+    def test_backdated_rows_wait_for_rebuild(self, client):
+        """Test that rows older than their series are folded in by a rebuild only"""
+        history = [("Insurance", 80.00, "expense", datetime(2024, month, 10)) for month in range(1, 5)]
+        self._import(client, history[2:])
+        self._import(client, history[:2])
+        assert client.get("/recurring?include_inactive=true").json() == []
+        
+        db = SessionLocal()
+        try:
+            main.rebuild_recurring(db)
+        finally:
+            db.close()
+        [item] = client.get("/recurring?include_inactive=true").json()
+        assert (item["occurrences"], item["start_date"]) == (4, "2024-01-10")
+
+class TestBudgets:
+    def _expense(self, client, description, amount, category=None):
+        return client.post("/transactions/", json={
+            "description": description, "amount": amount, "transaction_type": "expense", "category": category
+        }).json()
+
+    def _status(self, client, **params):
+        return {(item["category"], item["period"]): item for item in client.get("/budgets", params=params).json()}
+
+    def test_spend_follows_writes(self, client):
+        """Test that budgets count earlier spend and follow create, reclassify and delete"""
+        now = datetime.utcnow()
+        last_month = (now.replace(day=1) - timedelta(days=1)).replace(hour=12)
+        client.post("/transactions/bulk", content=f"description,amount,transaction_type,timestamp\nStarbucks,40,expense,{last_month.isoformat()}",
+                    headers={"Content-Type": "text/csv"})
+        self._expense(client, "Starbucks", 20)
+        self._expense(client, "Uber", 12)
+        client.post("/transactions/", json={"description": "Salary", "amount": 3000, "transaction_type": "income"})
+        
+        assert client.post("/budgets", json={"category": "Food", "limit": 50}).json()["spent"] == 20.0
+        assert client.post("/budgets", json={"limit": 100, "period": "day"}).json()["spent"] == 32.0
+        assert client.post("/budgets", json={"category": "Food", "limit": 80}).status_code == 409
+        
+        lunch = self._expense(client, "Chipotle", 25, "Food")
+        status = self._status(client)
+        assert (status["Food", "month"]["spent"], status["Food", "month"]["status"]) == (45.0, "warning")
+        assert status[None, "day"]["spent"] == 57.0
+        
+        client.patch(f"/transactions/{lunch['id']}/reclassify", json={"category": "Shopping"})
+        assert self._status(client)["Food", "month"]["spent"] == 20.0
+        client.delete(f"/transactions/{lunch['id']}")
+        assert self._status(client)[None, "day"]["spent"] == 32.0
+        
+        past = self._status(client, day=last_month.date().isoformat())
+        assert (past["Food", "month"]["period_start"], past["Food", "month"]["spent"]) == (last_month.strftime("%Y-%m-01"), 40.0)
+        assert past[None, "day"]["spent"] == 40.0
+        
+        budget_id = status["Food", "month"]["id"]
+        assert client.patch(f"/budgets/{budget_id}", json={"limit": 15}).json()["status"] == "exceeded"
+        client.delete(f"/budgets/{budget_id}")
+        assert list(self._status(client)) == [(None, "day")]
+        assert client.patch(f"/budgets/{budget_id}", json={"limit": 15}).status_code == 404
+
+    def test_alerts_on_crossings(self, client):
+        """Test that writes taking a budget over its warning share or limit publish one alert each"""
+        client.post("/budgets", json={"category": "Food", "limit": 50, "warn_percentage": 80})
+        
+        async def scenario():
+            subscription = main.event_broker.subscribe()
+            try:
+                for amount in (30, 12, 3, 10):
+                    await asyncio.to_thread(self._expense, client, f"Starbucks {amount}", amount)
+                await asyncio.to_thread(self._expense, client, "Uber", 100)
+                return await subscription.get(timeout=1)
+            finally:
+                main.event_broker.unsubscribe(subscription)
+        
+        events, _ = asyncio.run(scenario())
+        alerts = [json.loads(data) for _, event_type, data in events if event_type == "budget_alert"]
+        assert [(alert["status"], alert["spent"]) for alert in alerts] == [("warning", 42.0), ("exceeded", 55.0)]
+        assert alerts[0]["category"] == "Food"
+
+    def test_rebuild_recounts_spend(self, client):
+        """Test that rebuild_rollups leaves budget spend as the writes left it"""
+        client.post("/budgets", json={"limit": 100, "period": "week"})
+        for amount in (5, 7.5, 12.25):
+            self._expense(client, f"Starbucks {amount}", amount)
+        before = client.get("/budgets").json()
+        
+        db = SessionLocal()
+        try:
+            db.execute(text("UPDATE budget_spend SET spent = 0"))
+            db.commit()
+            rebuild_rollups(db)
+        finally:
+            db.close()
+        assert client.get("/budgets").json() == before
+        assert before[0]["spent"] == 24.75
+
+class TestArchive:
+    def _seed(self, client):
+        """Two closed months via import, then a current one through the API"""
+        lines = ["description,amount,transaction_type,timestamp"]
+        lines += [f"Pizza {i},{10 + i},expense,2024-01-{1 + i:02d}T12:00:00" for i in range(5)]
+        lines += [f"Uber {i},{20 + i},expense,2024-02-{1 + i:02d}T12:00:00" for i in range(5)]
+        lines += ["Salary,3000,income,2024-02-28T09:00:00"]
+        client.post("/transactions/bulk", content="\n".join(lines), headers={"Content-Type": "text/csv"})
+        for description in ("Starbucks", "Netflix"):
+            client.post("/transactions/", json={"description": description, "amount": 5.00, "transaction_type": "expense"})
+
+    def _pages(self, client, **params):
+        pages, cursor = [], None
+        while True:
+            response = client.get("/transactions/", params={**params, **({"after": cursor} if cursor else {})})
+            pages.append([tx["id"] for tx in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return pages
+
+    def _archive(self, operation, first, last=None):
+        db = SessionLocal()
+        try:
+            return operation(db, first, last or first)
+        finally:
+            db.close()
+
+    def test_archived_months_read_transparently(self, client):
+        """Test that listings, summaries, search and the change feed look the same after archiving"""
+        self._seed(client)
+        listing = client.get("/transactions/").json()
+        pages = self._pages(client, limit=3)
+        summary = client.get("/transactions/summary").json()
+        february = client.get("/transactions/?month=2024-02&category=Transport").json()
+        cursor = client.get("/transactions/changes").json()["cursor"]
+
+        result = self._archive(main.archive_months, "2024-01", "2024-02")
+        assert result == {"months": ["2024-01", "2024-02"], "transactions": 11}
+        db = SessionLocal()
+        assert db.query(Transaction).count() == 2
+        assert db.query(MonthlyRollup).filter(MonthlyRollup.month < "2024-03").count() == 0
+        db.close()
+
+        assert client.get("/transactions/").json() == listing
+        assert self._pages(client, limit=3) == pages
+        assert client.get("/transactions/summary").json() == summary
+        assert client.get("/transactions/?month=2024-02&category=Transport").json() == february
+        assert [tx["description"] for tx in client.get("/transactions/?q=pizza&limit=2").json()] == ["Pizza 4", "Pizza 3"]
+        assert client.get("/transactions/summary?from_month=2024-02&to_month=2024-02").json() == [summary[1]]
+        assert client.get("/transactions/changes", params={"since": cursor}).json()["changes"] == []
+
+    def test_search_reaches_archived_months(self, client):
+        """Test that ranked search merges archived matches with current ones"""
+        lines = ["description,amount,transaction_type,timestamp"]
+        lines += [f"Netflix plan {month},15.99,expense,2024-{month:02d}-05T12:00:00" for month in (1, 2, 3)]
+        lines += ["Netflix,15.99,expense,2024-03-20T12:00:00"]
+        client.post("/transactions/bulk", content="\n".join(lines), headers={"Content-Type": "text/csv"})
+        before = client.get("/transactions/search?q=netflix").json()
+        
+        self._archive(main.archive_months, "2024-01", "2024-02")
+        after = client.get("/transactions/search?q=netflix").json()
+        # bm25 is computed per index, so only the set is the same as before archiving
+        assert sorted(tx["id"] for tx in after) == sorted(tx["id"] for tx in before)
+        assert after[0]["description"] == "Netflix"
+        pages = [client.get(f"/transactions/search?q=netflix&limit=2&offset={offset}").json() for offset in (0, 2)]
+        assert pages[0] + pages[1] == after
+
+    def test_archived_months_are_read_only(self, client):
+        """Test that archived rows cannot be changed and their months take no new rows"""
+        self._seed(client)
+        archived_id = client.get("/transactions/?month=2024-01").json()[0]["id"]
+        self._archive(main.archive_months, "2024-01")
+
+        assert client.delete(f"/transactions/{archived_id}").status_code == 409
+        response = client.patch(f"/transactions/{archived_id}/reclassify", json={"category": "Shopping"})
+        assert response.status_code == 409
+        assert client.delete("/transactions/999999").status_code == 404
+        
+        response = client.post(
+            "/transactions/bulk",
+            content="description,amount,transaction_type,timestamp\nLate,5,expense,2024-01-31T12:00:00\nOn time,5,expense,2024-02-27T12:00:00",
+            headers={"Content-Type": "text/csv"},
+        ).json()
+        assert (response["created"], response["errors"]) == (1, 1)
+        assert response["rows"][0]["detail"] == "Month 2024-01 is archived"
+
+    def test_restore_and_rebuild(self, client):
+        """Test that restoring returns rows and summaries to the hot tables, and that rebuilds keep archives frozen"""
+        self._seed(client)
+        listing = client.get("/transactions/").json()
+        summary = client.get("/transactions/summary").json()
+        series = client.get("/analytics/timeseries?bucket=month").json()
+
+        self._archive(main.archive_months, "2024-01", "2024-02")
+        db = SessionLocal()
+        rebuild_rollups(db)
+        db.close()
+        main.record_write()
+        assert client.get("/transactions/summary").json() == summary
+        assert client.get("/analytics/timeseries?bucket=month").json() == series
+
+        assert self._archive(main.restore_months, "2024-02")["transactions"] == 6
+        assert self._archive(main.restore_months, "2024-01", "2024-12")["months"] == ["2024-01"]
+        db = SessionLocal()
+        assert db.query(main.ArchivedTransaction).count() == db.query(main.ArchivedSummary).count() == 0
+        db.close()
+        assert client.get("/transactions/").json() == listing
+        assert client.get("/transactions/summary").json() == summary
+        assert client.get("/transactions/?q=uber").json()  # back in the hot search index
+
+    def test_archived_ids_not_reused(self, client):
+        """Test that archiving the most recently added row does not free its id"""
+        self._seed(client)
+        client.post(
+            "/transactions/bulk",
+            content="description,amount,transaction_type,timestamp\nBackdated,5,expense,2024-01-15T12:00:00",
+            headers={"Content-Type": "text/csv"},
+        )
+        backdated = client.get("/transactions/?month=2024-01&q=backdated").json()[0]["id"]
+        self._archive(main.archive_months, "2024-01")
+        created = client.post("/transactions/", json={"description": "Lunch", "amount": 8.00, "transaction_type": "expense"})
+        assert created.json()["id"] > backdated
+        assert self._archive(main.restore_months, "2024-01")["transactions"] == 6
+
+    def test_archive_refused_while_ids_are_reused(self, db):
+        """Test that a transactions table from before migration 008 is not archived from"""
+        create_baseline_database()
+        Base.metadata.create_all(bind=engine)
+        session = SessionLocal()
+        try:
+            rebuild_rollups(session)
+            with pytest.raises(ValueError, match="alembic upgrade"):
+                main.archive_months(session, "2026-09", "2026-09")
+            assert session.query(main.ArchivedMonth).count() == 0
+        finally:
+            session.close()
+
+    def test_archive_refusals(self, client):
+        """Test that open months and months without a complete daily rollup are not archived"""
+        self._seed(client)
+        with pytest.raises(ValueError, match="closed months"):
+            self._archive(main.archive_months, "2024-01", datetime.utcnow().strftime("%Y-%m"))
+        
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO rollup_coverage (rollup, start_day) VALUES ('daily', '2024-03-01')")
+        with pytest.raises(ValueError, match="rebuild_rollups"):
+            self._archive(main.archive_months, "2024-02")
+
+class TestQueryPlans:
+    def _captured_plans(self, client, requests):
+        """Run requests and EXPLAIN every SELECT they issue against transactions"""
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM transactions" in statement:
+                statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            for method, url, body in requests:
+                client.request(method, url, json=body)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        plans = []
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+                plans.append((statement, [row[-1] for row in rows]))
+        return plans
+
+    def test_endpoint_queries_use_indexes(self, client):
+        """Test that list filters and duplicate detection never full-scan transactions"""
+        expense = {"description": "McDonald's", "amount": 12.00, "transaction_type": "expense"}
+        plans = self._captured_plans(client, [
+            ("POST", "/transactions/", expense),
+            ("GET", "/transactions/", None),
+            ("GET", "/transactions/?month=2024-01", None),
+            ("GET", "/transactions/?category=Food&month=2024-01", None),
+            ("GET", "/transactions/?transaction_type=expense", None),
+            ("GET", f"/transactions/?limit=10&after={encode_cursor(datetime(2030, 1, 1), 1)}", None),
+            ("DELETE", "/transactions/1", None),
+        ])
+        assert len(plans) >= 6
+        for statement, details in plans:
+            for detail in details:
+                if "transactions" in detail:
+                    assert "USING" in detail, f"{detail} for {statement}"
+
+    def test_duplicate_lookup_index(self, client, monkeypatch):
+        """Test that detect_duplicate (the fallback without the in-memory index) uses the composite index"""
+        monkeypatch.setattr(main, "duplicate_index", None)
+        plans = self._captured_plans(client, [
+            ("POST", "/transactions/", {"description": "Rent", "amount": 900.00, "transaction_type": "expense"}),
+        ])
+        assert any("ix_transactions_duplicate_lookup" in d for _, details in plans for d in details)
+
+class TestConcurrency:
+    def test_sqlite_pragmas_applied(self, db):
+        """Test that pooled connections come up in WAL mode with the configured PRAGMAs"""
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+    def test_reads_proceed_during_write(self, client):
+        """Test that list and summary requests complete while another connection holds a write open"""
+        client.post("/transactions/", json={
+            "description": "Committed",
+            "amount": 10.00,
+            "transaction_type": "expense"
+        })
+
+        # An EXCLUSIVE write transaction blocks readers under a rollback journal, but not under WAL
+        writer = sqlite3.connect(engine.url.database, isolation_level=None)
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute(
+            "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+            "VALUES ('In flight', -5.0, 'expense', 'Other', 1, '2024-01-01 00:00:00.000000')"
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                responses = list(pool.map(
+                    lambda url: client.get(url),
+                    ["/transactions/", "/transactions/summary"] * 4
+                ))
+            assert all(response.status_code == 200 for response in responses)
+            # Readers see the last committed snapshot only
+            assert [tx["description"] for tx in responses[0].json()] == ["Committed"]
+        finally:
+            writer.execute("COMMIT")
+            writer.close()
+        # The write bypassed the API, so the cached reads have to be invalidated by hand
+        main.record_write()
+
+        assert len(client.get("/transactions/").json()) == 2
+
+    def test_concurrent_bulk_imports(self, client):
+        """Test that overlapping bulk imports wait for the write lock instead of failing"""
+        def upload(n):
+            rows = "\n".join(f"Import {n}-{i},{i + 1},expense" for i in range(200))
+            return client.post(
+                "/transactions/bulk",
+                content=f"description,amount,transaction_type\n{rows}",
+                headers={"Content-Type": "text/csv"}
+            )
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            responses = list(pool.map(upload, range(12)))
+        assert all(response.status_code == 200 for response in responses)
+        assert sum(response.json()["created"] for response in responses) == 2400
+
+class TestSharding:
+    @pytest.fixture
+    def router(self, tmp_path, monkeypatch):
+        router = main.create_shard_router(str(tmp_path), capacity=2)
+        monkeypatch.setattr(main, "shard_router", router)
+        yield router
+        router.close()
+        main.retag_shards.clear()
+        main.record_write()
+
+    @pytest.fixture
+    def sharded_client(self, router):
+        return TestClient(app)
+
+    def _post(self, client, user, description, amount=10.00):
+        return client.post("/transactions/", headers={"X-User-Id": user}, json={
+            "description": description, "amount": amount, "transaction_type": "expense"
+        })
+
+    def test_users_are_isolated(self, sharded_client, router):
+        """Test that each user reads, de-duplicates and caches against their own database"""
+        assert self._post(sharded_client, "alice", "Pizza").status_code == 200
+        assert self._post(sharded_client, "bob", "Pizza").status_code == 200  # not a duplicate of alice's
+        assert self._post(sharded_client, "bob", "Pizza").status_code == 400
+        self._post(sharded_client, "bob", "Uber", 20.00)
+
+        alice = sharded_client.get("/transactions/", headers={"X-User-Id": "alice"})
+        bob = sharded_client.get("/transactions/", headers={"X-User-Id": "bob"})
+        assert [tx["description"] for tx in alice.json()] == ["Pizza"]
+        assert [tx["description"] for tx in bob.json()] == ["Uber", "Pizza"]
+        assert alice.headers["ETag"] != bob.headers["ETag"]
+        summary = sharded_client.get("/transactions/summary", headers={"X-User-Id": "alice"}).json()
+        assert summary[0]["expense_total"] == 10.00
+        assert router.keys() == ["alice", "bob"]
+
+    def test_user_header_required(self, sharded_client):
+        """Test that requests without a valid user id are rejected"""
+        assert sharded_client.get("/transactions/").status_code == 400
+        assert sharded_client.get("/transactions/", headers={"X-User-Id": "../alice"}).status_code == 400
+        assert sharded_client.get("/transactions/stream").status_code == 400
+
+    def test_learned_categories_stay_per_user(self, sharded_client):
+        """Test that one user's manual correction does not categorize another user's transactions"""
+        tx_id = self._post(sharded_client, "alice", "Acme Cloud #1").json()["id"]
+        sharded_client.patch(
+            f"/transactions/{tx_id}/reclassify", headers={"X-User-Id": "alice"}, json={"category": "Subscriptions"}
+        )
+        assert self._post(sharded_client, "alice", "Acme Cloud #2").json()["category"] == "Subscriptions"
+        assert self._post(sharded_client, "bob", "Acme Cloud #2").json()["category"] == "Other"
+        assert main.retag_shards == {"alice", "bob"}
+
+    def test_lru_eviction_disposes_after_last_lease(self, router):
+        """Test that the least recently used shard is evicted, and disposed once no request holds it"""
+        disposed = []
+        alice = router.acquire("alice")
+        event.listen(alice.engine, "engine_disposed", lambda engine: disposed.append("alice"))
+        with router.lease("bob") as bob:
+            event.listen(bob.engine, "engine_disposed", lambda engine: disposed.append("bob"))
+        with router.lease("alice"):
+            pass  # alice is now the most recently used
+        with router.lease("carol"):
+            pass
+        assert len(router) == 2 and router.evictions == 1
+        assert disposed == ["bob"]
+        
+        router.acquire("dave")  # evicts alice while it is still leased
+        assert disposed == ["bob"]
+        router.release(alice)
+        assert disposed == ["bob", "alice"]
+        
+        with router.session("alice") as db:  # reopened from disk
+            assert db.query(Transaction).count() == 0
+
+    def test_existing_shard_migrated_on_open(self, router):
+        """Test that a shard left at an older revision is brought to head when opened"""
+        from alembic import command
+
+        old = main.create_db_engine(f"sqlite:///{router.path('legacy')}")
+        migrator = main.AlembicMigrator(os.path.join(os.path.dirname(main.__file__), "alembic"))
+        with old.begin() as conn:
+            migrator.config.attributes["connection"] = conn
+            command.upgrade(migrator.config, "005")
+            del migrator.config.attributes["connection"]
+            conn.exec_driver_sql(
+                "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+                "VALUES ('Pizza', -10.0, 'expense', 'Food', 1, '2024-01-15 12:00:00.000000')"
+            )
+        old.dispose()
+
+        with router.session("legacy") as db:
+            assert db.execute(text("SELECT version_num FROM alembic_version")).scalar() == migrator.head
+            # 006 backfilled the search index, 007 left the old days to on-the-fly aggregation
+            assert db.execute(text("SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH 'pizza'")).all()
+            assert db.query(main.RollupCoverage).one().start_day == "2024-01-16"
+
+    def test_fan_out(self, sharded_client, router):
+        """Test running a task on every shard, with failures reported per shard"""
+        from shards import fan_out
+
+        self._post(sharded_client, "alice", "Pizza")
+        self._post(sharded_client, "bob", "Pizza")
+        self._post(sharded_client, "bob", "Uber")
+
+        def count(shard):
+            with shard.engine.connect() as conn:
+                if shard.key == "bob":
+                    conn.exec_driver_sql("SELECT * FROM missing_table")
+                return conn.exec_driver_sql("SELECT COUNT(*) FROM transactions").scalar()
+
+        results = fan_out(router, count, workers=2)
+        assert results["alice"] == 1
+        assert isinstance(results["bob"], Exception)
+
+class TestAsyncMode:
+    @pytest.fixture
+    def async_client(self, db):
+        async_app = FastAPI()
+        main.enable_async_mode(async_app)
+        with TestClient(async_app) as client:
+            yield client
+            if main.AsyncSessionLocal is not None:
+                client.portal.call(main.AsyncSessionLocal.kw["bind"].dispose)
+        main.AsyncSessionLocal = None
+
+    def test_async_handlers_round_trip(self, async_client):
+        """Test create, list, summary, reclassify and delete through the async handlers"""
+        response = async_client.post("/transactions/", json={
+            "description": "McDonald's",
+            "amount": 12.00,
+            "transaction_type": "expense"
+        })
+        assert response.status_code == 200
+        tx_id = response.json()["id"]
+        assert response.json()["category"] == "Food"
+
+        duplicate = async_client.post("/transactions/", json={
+            "description": "McDonald's",
+            "amount": 12.00,
+            "transaction_type": "expense"
+        })
+        assert duplicate.status_code == 400
+
+        assert [tx["id"] for tx in async_client.get("/transactions/?category=Food").json()] == [tx_id]
+        assert async_client.get("/transactions/summary").json()[0]["expense_total"] == 12.00
+
+        response = async_client.patch(f"/transactions/{tx_id}/reclassify", json={"category": "Entertainment"})
+        assert response.json()["category"] == "Entertainment"
+
+        assert async_client.delete(f"/transactions/{tx_id}").status_code == 200
+        assert async_client.delete(f"/transactions/{tx_id}").status_code == 404
+        assert async_client.get("/transactions/summary").json() == []
+
+    def test_async_connections_use_pragmas(self, async_client):
+        """Test that the aiosqlite engine applies the same PRAGMAs"""
+        async_client.get("/transactions/")
+        async def journal_mode():
+            async with main.AsyncSessionLocal() as session:
+                return (await session.execute(text("PRAGMA journal_mode"))).scalar()
+        assert async_client.portal.call(journal_mode) == "wal"
+
+class TestColdStart:
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Test that importing the app neither opens the database nor loads the rarely used modules"""
+        statement = (
+            "import sys, models; fastapi = 'fastapi' in sys.modules; import main; "
+            "print(fastapi, 'alembic' in sys.modules, 'sqlalchemy.ext.asyncio' in sys.modules)"
+        )
+        database = tmp_path / "cold.db"
+        result = subprocess.run(
+            [sys.executable, "-c", statement],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env={**os.environ, "DATABASE_URL": f"sqlite:///{database}", "RETAG_WORKER": "0"},
+            capture_output=True, text=True, timeout=60,
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ["False", "False", "False"]
+        assert not database.exists()
+
+    def test_schema_created_at_startup(self, db, monkeypatch):
+        """Test that the startup hook creates the schema unless migrations manage it"""
+        Base.metadata.drop_all(bind=engine)
+        monkeypatch.setattr(main, "DB_CREATE_SCHEMA", False)
+        main.create_schema()
+        assert not inspect(engine).has_table("transactions")
+        
+        monkeypatch.setattr(main, "DB_CREATE_SCHEMA", True)
+        with TestClient(app) as client:
+            assert client.get("/transactions/").json() == []
+        assert client.get("/transactions/search?q=pizza").json() == []
+
+    def test_startup_on_existing_database(self, db):
+        """Test that creating the schema next to existing rows builds the monthly rollup from them"""
+        create_baseline_database()
+        with TestClient(app) as client:
+            assert len(client.get("/transactions/").json()) == 2
+            summary = client.get("/transactions/summary?month=2026-09").json()
+        assert (summary[0]["income_total"], summary[0]["expense_total"]) == (3000, 1200)
+
+class TestMetrics:
+    def test_metrics_exposition(self, client):
+        """Test latency histograms and SQL counters on /metrics"""
+        main.metrics.reset()
+        client.post("/transactions/", json={
+            "description": "McDonald's",
+            "amount": 12.00,
+            "transaction_type": "expense"
+        })
+        client.get("/transactions/")
+        client.delete("/transactions/999")
+
+        body = client.get("/metrics").text
+        assert 'http_request_duration_seconds_count{method="POST",route="/transactions/",status="200"} 1' in body
+        assert 'http_request_duration_seconds_count{method="DELETE",route="/transactions/{transaction_id}",status="404"} 1' in body
+        assert 'le="+Inf"' in body
+        # The listed row and the data version behind the ETag
+        assert 'db_rows_returned_total{method="GET",route="/transactions/"} 2' in body
+        queries = [line for line in body.splitlines() if line.startswith('db_queries_total{method="POST"')]
+        assert queries and int(queries[0].split()[-1]) > 0
+
+    def test_server_timing_header(self, client, monkeypatch):
+        """Test the optional Server-Timing header"""
+        monkeypatch.setattr(main, "SERVER_TIMING", True)
+        response = client.get("/transactions/summary")
+        assert response.headers["Server-Timing"].startswith("db;dur=")
+
+    def test_slow_request_log(self, client, monkeypatch, caplog):
+        """Test that slow requests log the SQL they ran"""
+        monkeypatch.setattr(main, "SLOW_REQUEST_MS", 0.0)
+        with caplog.at_level("WARNING", logger="finance.slow_requests"):
+            client.get("/transactions/?category=Food")
+        assert "Slow request GET /transactions/" in caplog.text
+        assert "FROM transactions" in caplog.text
+
+class TestAsyncSDK:
+    @staticmethod
+    def run(transport, scenario, **options):
+        async def go():
+            async with AsyncFinanceTrackerSDK("http://testserver", transport=transport, **options) as sdk:
+                return await scenario(sdk)
+        return asyncio.run(go())
+
+    def test_add_many_uses_bulk_endpoint(self, db):
+        """Test that batches go through the bulk endpoint in chunks and come back in input order"""
+        items = [
+            {"description": f"Coffee {i}", "amount": 3.5, "transaction_type": "expense"}
+            for i in range(25)
+        ]
+        items.append(dict(items[0]))
+
+        async def scenario(sdk):
+            result = await sdk.add_transactions_many(items, concurrency=3)
+            return result, sdk.bulk_supported, await sdk.get_transactions()
+
+        result, bulk_supported, stored = self.run(httpx.ASGITransport(app=app), scenario, bulk_chunk_size=10)
+        assert bulk_supported is True
+        assert (result.created, result.duplicates, result.errors) == (25, 1, 0)
+        assert [row.row for row in result.rows] == list(range(1, 27))
+        assert result.rows[-1].status == "duplicate"
+        assert len(stored) == 25 and isinstance(stored[0], SDKTransaction)
+        assert stored[0].category == "Food"
+
+    def test_add_many_falls_back_without_bulk_endpoint(self, db):
+        """Test one POST per transaction when the server has no bulk endpoint"""
+        legacy_app = FastAPI()
+        legacy_app.router.routes = [route for route in app.router.routes if route.path != "/transactions/bulk"]
+        items = [
+            {"description": "Uber", "amount": 20, "transaction_type": "expense"},
+            {"description": "Uber", "amount": 20, "transaction_type": "expense"},
+            {"description": "Paycheck", "amount": 100, "transaction_type": "bogus"},
+        ]
+
+        async def scenario(sdk):
+            # One at a time so the duplicate is checked after the original is stored
+            return await sdk.add_transactions_many(items, concurrency=1), sdk.bulk_supported
+
+        result, bulk_supported = self.run(httpx.ASGITransport(app=legacy_app), scenario)
+        assert bulk_supported is False
+        assert [row.status for row in result.rows] == ["created", "duplicate", "error"]
+        assert result.rows[0].transaction.category == "Transport"
+
+    def test_retries_transient_errors(self):
+        """Test that 503s and connection errors are retried with backoff"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            if len(calls) == 2:
+                return httpx.Response(503)
+            return httpx.Response(200, json=[])
+
+        async def scenario(sdk):
+            return await sdk.get_summary()
+
+        assert self.run(httpx.MockTransport(handler), scenario, backoff=0) == []
+        assert len(calls) == 3
+
+    def test_posts_retried_only_when_not_processed(self):
+        """Test that a POST is not replayed after a timeout or a 502, but is after a refused connect or a 503"""
+        def transport(failures):
+            calls = []
+
+            def handler(request):
+                calls.append(request)
+                if len(calls) <= len(failures):
+                    failure = failures[len(calls) - 1]
+                    if isinstance(failure, int):
+                        return httpx.Response(failure, headers={"Retry-After": "3600"})
+                    raise failure("failed", request=request)
+                return httpx.Response(200, json={"created": 1, "duplicates": 0, "errors": 0, "rows": []})
+            return httpx.MockTransport(handler), calls
+
+        async def scenario(sdk):
+            return (await sdk._request("POST", "/transactions/bulk", json=[])).status_code
+
+        for failures, status, sent in (
+            ([httpx.ConnectError, 503], 200, 3),
+            ([502], 502, 1),
+        ):
+            mock, calls = transport(failures)
+            # Retry-After is capped at max_backoff rather than slept for an hour
+            assert self.run(mock, scenario, backoff=0, max_backoff=0) == status
+            assert len(calls) == sent
+        mock, calls = transport([httpx.ReadTimeout])
+        with pytest.raises(httpx.ReadTimeout):
+            self.run(mock, scenario, backoff=0)
+        assert len(calls) == 1
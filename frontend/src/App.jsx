@@ -1,6 +1,6 @@
 "use client"
 
-import { useEffect, useState } from "react"
+import { useEffect, useRef, useState } from "react"
 import axios from "axios"
 import "./App.css"
 import TransactionForm from "./components/TransactionForm"
@@ -8,9 +8,66 @@ import TransactionList from "./components/TransactionList"
 import MonthlySummary from "./components/MonthlySummary"
 
 const API_BASE_URL = "http://localhost:8000"
+const PAGE_SIZE = 100
+
+// Apply rollup deltas pushed by /transactions/stream to the summary state
+function applyDeltas(summary, deltas) {
+  const months = new Map(summary.map((month) => [month.month, { ...month, by_category: [...month.by_category] }]))
+  for (const delta of deltas) {
+    const month = months.get(delta.month) || { month: delta.month, income_total: 0, expense_total: 0, by_category: [] }
+    if (delta.transaction_type === "income") month.income_total += delta.total
+    else month.expense_total += delta.total
+
+    const index = month.by_category.findIndex((item) => item.category === delta.category)
+    const current = index >= 0 ? month.by_category[index] : { category: delta.category, total: 0, count: 0 }
+    const updated = { ...current, total: current.total + delta.total, count: current.count + delta.count }
+    if (index >= 0) month.by_category[index] = updated
+    else month.by_category.push(updated)
+    month.by_category = month.by_category.filter((item) => item.count > 0)
+    months.set(delta.month, month)
+  }
+  return [...months.values()]
+    .filter((month) => month.by_category.length > 0)
+    .sort((a, b) => b.month.localeCompare(a.month))
+}
+
+// The rollup deltas of replacing `before` with `after` (either may be null), as the server sends them
+function transactionDeltas(before, after) {
+  const deltas = []
+  for (const [tx, sign] of [[before, -1], [after, 1]]) {
+    if (!tx) continue
+    deltas.push({
+      month: tx.timestamp.slice(0, 7),
+      transaction_type: tx.transaction_type,
+      category: tx.category || "Other",
+      total: sign * Math.abs(tx.amount),
+      count: sign,
+    })
+  }
+  return deltas
+}
+
+function matchesFilters(tx, filters) {
+  return (
+    (!filters.month || tx.timestamp.startsWith(filters.month)) &&
+    (!filters.type || tx.transaction_type === filters.type) &&
+    (!filters.category || tx.category === filters.category)
+  )
+}
+
+// Insert a new transaction in the list's newest-first order, unless it sorts into a page not loaded yet
+function insertTransaction(list, tx, hasMore) {
+  if (list.some((item) => item.id === tx.id)) return list
+  const index = list.findIndex(
+    (item) => item.timestamp < tx.timestamp || (item.timestamp === tx.timestamp && item.id < tx.id),
+  )
+  if (index < 0) return hasMore ? list : [...list, tx]
+  return [...list.slice(0, index), tx, ...list.slice(index)]
+}
 
 function App() {
   const [transactions, setTransactions] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
   const [summary, setSummary] = useState([])
   const [activeTab, setActiveTab] = useState("add")
   const [filters, setFilters] = useState({
@@ -19,17 +76,41 @@ function App() {
     category: "",
   })
   const [loading, setLoading] = useState(false)
+  // Read by the stream listener, which is only re-created when the filters change
+  const hasMore = useRef(false)
+  // Writes applied from one side (our own response or the stream) and not yet seen on the other
+  const unpaired = useRef(new Set())
+
+  // Apply a created, deleted or reclassified transaction exactly once, whether our own
+  // response or its stream event arrives first
+  const applyWrite = (type, transaction, deltas) => {
+    const key = `${type}:${transaction.id}:${transaction.category}`
+    if (unpaired.current.delete(key)) return
+    unpaired.current.add(key)
+    setSummary((previous) => applyDeltas(previous, deltas))
+    if (type === "deleted") {
+      setTransactions((previous) => previous.filter((tx) => tx.id !== transaction.id))
+    } else if (type === "reclassified") {
+      setTransactions((previous) => previous.map((tx) => (tx.id === transaction.id ? transaction : tx)))
+    } else if (matchesFilters(transaction, filters)) {
+      setTransactions((previous) => insertTransaction(previous, transaction, hasMore.current))
+    }
+  }
 
-  const fetchTransactions = async () => {
+  const fetchTransactions = async (after = null) => {
     try {
       setLoading(true)
       const params = new URLSearchParams()
       if (filters.month) params.append("month", filters.month)
       if (filters.type) params.append("transaction_type", filters.type)
       if (filters.category) params.append("category", filters.category)
+      params.append("limit", PAGE_SIZE)
+      if (after) params.append("after", after)
 
       const response = await axios.get(`${API_BASE_URL}/transactions/?${params}`)
-      setTransactions(response.data)
+      setTransactions((previous) => (after ? [...previous, ...response.data] : response.data))
+      setNextCursor(response.headers["x-next-cursor"] || null)
+      hasMore.current = Boolean(response.headers["x-next-cursor"])
     } catch (error) {
       console.error("Error fetching transactions:", error)
       alert("Failed to fetch transactions")
@@ -55,9 +136,33 @@ function App() {
     fetchSummary()
   }, [])
 
-  const handleAddTransaction = () => {
-    fetchTransactions()
-    fetchSummary()
+  // Live updates for writes made elsewhere; our own are applied from their responses
+  useEffect(() => {
+    const stream = new EventSource(`${API_BASE_URL}/transactions/stream`)
+    const onChange = (event) => {
+      const { transaction, deltas } = JSON.parse(event.data)
+      applyWrite(event.type, transaction, deltas)
+    }
+    for (const type of ["created", "deleted", "reclassified"]) stream.addEventListener(type, onChange)
+    // Bulk changes and missed events: fall back to a full refresh
+    const onResync = () => {
+      unpaired.current.clear()
+      fetchTransactions()
+      fetchSummary()
+    }
+    for (const type of ["imported", "bulk_reclassified", "bulk_deleted", "overflow"]) {
+      stream.addEventListener(type, onResync)
+    }
+    let connected = false
+    stream.onopen = () => {
+      if (connected) onResync() // reconnected: events may have been missed
+      connected = true
+    }
+    return () => stream.close()
+  }, [filters])
+
+  const handleAddTransaction = (created) => {
+    applyWrite("created", created, transactionDeltas(null, created))
     setActiveTab("list")
   }
 
@@ -65,8 +170,8 @@ function App() {
     if (!window.confirm("Are you sure you want to delete this transaction?")) return
     try {
       await axios.delete(`${API_BASE_URL}/transactions/${id}`)
-      fetchTransactions()
-      fetchSummary()
+      const deleted = transactions.find((tx) => tx.id === id)
+      applyWrite("deleted", deleted, transactionDeltas(deleted, null))
     } catch (error) {
       console.error("Error deleting transaction:", error)
       alert("Failed to delete transaction")
@@ -75,11 +180,11 @@ function App() {
 
   const handleReclassify = async (id, newCategory) => {
     try {
-      await axios.patch(`${API_BASE_URL}/transactions/${id}/reclassify`, {
+      const before = transactions.find((tx) => tx.id === id)
+      const response = await axios.patch(`${API_BASE_URL}/transactions/${id}/reclassify`, {
         category: newCategory,
       })
-      fetchTransactions()
-      fetchSummary()
+      applyWrite("reclassified", response.data, transactionDeltas(before, response.data))
     } catch (error) {
       console.error("Error reclassifying transaction:", error)
       alert("Failed to reclassify transaction")
@@ -153,6 +258,11 @@ function App() {
                 onReclassify={handleReclassify}
               />
             )}
+            {!loading && nextCursor && (
+              <button className="nav-btn" onClick={() => fetchTransactions(nextCursor)}>
+                Load more
+              </button>
+            )}
           </section>
         )}
 
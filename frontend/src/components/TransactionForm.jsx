@@ -30,7 +30,7 @@ function TransactionForm({ onSuccess, apiUrl }) {
 
     try {
       setLoading(true)
-      await axios.post(`${apiUrl}/transactions/`, {
+      const response = await axios.post(`${apiUrl}/transactions/`, {
         description: formData.description,
         amount: Number.parseFloat(formData.amount),
         transaction_type: formData.transaction_type,
@@ -43,7 +43,7 @@ function TransactionForm({ onSuccess, apiUrl }) {
         category: "",
       })
       alert("Transaction added successfully!")
-      onSuccess()
+      onSuccess(response.data)
     } catch (error) {
       console.error("Error adding transaction:", error)
       alert(error.response?.data?.detail || "Failed to add transaction")
@@ -0,0 +1,83 @@
+"""
+Archive closed months out of the hot transactions table, or restore them.
+Archived months stay visible to listings and summaries but are read-only.
+
+Usage:
+  python scripts/archive_months.py status
+  python scripts/archive_months.py archive 2023-01 2023-12
+  python scripts/archive_months.py restore 2023-06
+  python scripts/archive_months.py --shard-dir ./shards archive 2023-01 2023-12
+
+With --shard-dir (or SHARD_DIR) the command runs on every user's shard, or
+on the --users given.
+"""
+
+import argparse
+import os
+import sys
+
+from fastapi import HTTPException
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../backend')
+
+def run(api, session_factory, args):
+    db = session_factory()
+    try:
+        if args.command == "status":
+            return [
+                f"{month.month}\t{month.transactions}\tarchived {month.archived_at:%Y-%m-%d %H:%M}"
+                for month in db.query(api.ArchivedMonth).order_by(api.ArchivedMonth.month)
+            ]
+        operation = api.archive_months if args.command == "archive" else api.restore_months
+        result = operation(db, args.first, args.last or args.first)
+        verb = "Archived" if args.command == "archive" else "Restored"
+        months = ", ".join(result["months"]) or "nothing to do"
+        return [f"{verb} {result['transactions']} transactions ({months})"]
+    except HTTPException as error:
+        raise ValueError(error.detail)
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shard-dir", default=os.getenv("SHARD_DIR"), help="run on per-user shards (defaults to $SHARD_DIR)")
+    parser.add_argument("--users", help="comma-separated user ids (default: every shard)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="list archived months")
+    for name in ("archive", "restore"):
+        command = commands.add_parser(name, help=f"{name} the months from FIRST to LAST (inclusive)")
+        command.add_argument("first", help="YYYY-MM")
+        command.add_argument("last", nargs="?", help="YYYY-MM (default: FIRST)")
+    args = parser.parse_args()
+
+    if args.shard_dir:
+        os.environ["SHARD_DIR"] = args.shard_dir
+    sys.path.insert(0, BACKEND_DIR)
+    import main as api
+
+    if api.shard_router is None:
+        api.create_schema()
+        try:
+            lines = run(api, api.SessionLocal, args)
+        except ValueError as error:
+            print(f"error: {error}", file=sys.stderr)
+            return 1
+        print("\n".join(lines))
+        return 0
+
+    from shards import fan_out
+    keys = args.users.split(",") if args.users else None
+    results = fan_out(api.shard_router, lambda shard: run(api, shard.SessionLocal, args), keys)
+    api.shard_router.close()
+    failed = 0
+    for key, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{key}\terror: {result}", file=sys.stderr)
+        else:
+            for line in result:
+                print(f"{key}\t{line}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Compare requests/second of the sync (default) and async (DB_ASYNC=1) database modes.
+Starts the API under uvicorn once per mode against a fresh SQLite file and
+drives the same concurrent request mix at both.
+
+Usage: python scripts/bench_db_modes.py [--requests 2000] [--concurrency 50]
+Requires httpx for the load generator.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../backend')
+
+def start_server(port, async_mode, db_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DB_ASYNC="1" if async_mode else "0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+async def wait_until_ready(client):
+    for _ in range(100):
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+async def run_load(base_url, total, concurrency):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_until_ready(client)
+        counter = iter(range(total))
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                kind = i % 4
+                if kind == 0:
+                    response = await client.post("/transactions/", json={
+                        "description": f"Coffee #{i}",
+                        "amount": 3.5,
+                        "transaction_type": "expense",
+                    })
+                elif kind == 1:
+                    response = await client.get("/transactions/summary")
+                else:
+                    response = await client.get("/transactions/", params={"limit": 50})
+                if response.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return total / elapsed, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for async_mode in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            server = start_server(args.port, async_mode, os.path.join(tmp, "bench.db"))
+            try:
+                rps, errors = asyncio.run(run_load(f"http://127.0.0.1:{args.port}", args.requests, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+        mode = "async" if async_mode else "sync"
+        print(f"{mode:5s}: {rps:8.1f} req/s ({errors} errors, {args.requests} requests, concurrency {args.concurrency})")
+
+if __name__ == "__main__":
+    main()
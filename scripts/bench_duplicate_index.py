@@ -0,0 +1,107 @@
+"""
+Benchmark POST /transactions/ latency with and without the in-memory duplicate index.
+Seeds a throwaway SQLite database with recent history, then times single
+creates (in-process, no network) with the index enabled and disabled.
+
+Usage: python scripts/bench_duplicate_index.py [--rows 100000] [--posts 2000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Removed when the run ends; created before importing main, which reads DATABASE_URL
+tmp_dir = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir.name, 'bench.db')}")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from fastapi.testclient import TestClient
+import main
+
+def seed(rows):
+    """Recent history, so the SQL duplicate check has real work to do"""
+    now = datetime.utcnow()
+    merchants = [keyword for keywords in main.CATEGORY_MAP.values() for keyword in keywords]
+    batch = []
+    for i in range(rows):
+        merchant = random.choice(merchants)
+        batch.append((
+            f"{merchant} #{i % 500}",
+            -round(random.uniform(1, 200), 2),
+            "expense",
+            main.auto_categorize(merchant, "expense"),
+            True,
+            (now - timedelta(seconds=random.randint(0, 7200))).isoformat(" ", "microseconds"),
+        ))
+    with main.engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+
+def time_posts(client, posts, label):
+    latencies = []
+    for i in range(posts):
+        payload = {"description": f"{label} purchase {i}", "amount": 10 + i % 50, "transaction_type": "expense"}
+        start = time.perf_counter()
+        response = client.post("/transactions/", json=payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "mean": statistics.fmean(latencies),
+    }
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--posts", type=int, default=2000)
+    args = parser.parse_args()
+
+    main.Base.metadata.create_all(bind=main.engine)
+    seed(args.rows)
+    client = TestClient(app=main.app)
+    index = main.duplicate_index or main.DuplicateIndex(main.DUPLICATE_WINDOW)
+    db = main.SessionLocal()
+    main.duplicate_index = index
+    main.warm_duplicate_index(db)
+
+    # The duplicate check on its own
+    key = ("coffee #1", -10.0, "expense")
+    start = time.perf_counter()
+    for _ in range(args.posts):
+        main.detect_duplicate(db, *key)
+    sql_check = (time.perf_counter() - start) / args.posts * 1000
+    start = time.perf_counter()
+    for _ in range(args.posts):
+        index.is_duplicate(key)
+    index_check = (time.perf_counter() - start) / args.posts * 1000
+    db.close()
+    print(f"duplicate check: SQL {sql_check:.4f} ms, index {index_check:.4f} ms")
+
+    # End-to-end POST latency, alternating rounds so both see the same table size
+    results = {False: [], True: []}
+    for round_ in range(4):
+        for enabled in (False, True):
+            main.duplicate_index = index if enabled else None
+            label = f"r{round_}-{'on' if enabled else 'off'}"
+            results[enabled].append(time_posts(client, args.posts // 4, label))
+    for enabled, label in ((False, "without index"), (True, "with index")):
+        p50 = statistics.median(stats["p50"] for stats in results[enabled])
+        p95 = statistics.median(stats["p95"] for stats in results[enabled])
+        print(f"POST {label:14s} p50 {p50:.3f} ms  p95 {p95:.3f} ms")
+
+if __name__ == "__main__":
+    try:
+        run_benchmark()
+    finally:
+        main.engine.dispose()
+        tmp_dir.cleanup()
@@ -0,0 +1,72 @@
+"""
+Compare the default and streaming serialization paths of GET /transactions/.
+Lists every row of a synthetic database (generate_data.py) through the
+default path (ORM objects validated by TransactionResponse), the streaming
+JSON path (?stream=true) and NDJSON, checks the JSON bodies are identical and
+reports the median time per path. The response cache is cleared before each
+request, so every run queries and encodes from scratch.
+
+Usage: python scripts/bench_serialization.py [--rows 100000] [--runs 5] [--fields id,amount,timestamp]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import generate_data
+
+PATHS = [
+    ("default", {}, {}),
+    ("stream json", {"stream": "true"}, {}),
+    ("stream ndjson", {}, {"Accept": "application/x-ndjson"}),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--fields", help="also compare a field projection")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("RETAG_WORKER", "0")
+        db_path = os.path.join(tmp, "serialization.db")
+        rows = generate_data.generate(db_path, args.rows)
+        main_module = generate_data.load_app(db_path)
+        from fastapi.testclient import TestClient
+        client = TestClient(main_module.app)
+
+        projections = [None] + ([args.fields] if args.fields else [])
+        print(f"{rows} rows, median of {args.runs} runs")
+        print(f"{'path':<16}{'fields':<24}{'ms':>8}{'MB':>8}{'speedup':>9}")
+        for fields in projections:
+            bodies = {}
+            baseline = None
+            for name, params, headers in PATHS:
+                params = dict(params, **({"fields": fields} if fields else {}))
+                timings = []
+                for _ in range(args.runs):
+                    main_module.record_write()
+                    start = time.perf_counter()
+                    response = client.get("/transactions/", params=params, headers=headers)
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                bodies[name] = response.content
+                median = statistics.median(timings) * 1000
+                baseline = baseline or median
+                print(f"{name:<16}{fields or '(all)':<24}{median:>8.0f}{len(response.content) / 1e6:>8.1f}"
+                      f"{baseline / median:>8.1f}x")
+            if bodies["stream json"] != bodies["default"]:
+                print("error: streamed JSON differs from the default response", file=sys.stderr)
+                return 1
+        main_module.engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Measure API cold start: module import time and time to first response.
+Import time is taken in a fresh interpreter per run; time to first response
+starts uvicorn and polls until GET /transactions/ answers, once against a new
+database file (schema created at startup) and once against an existing one.
+Medians are checked against budgets, so the script can guard against
+regressions in CI.
+
+Usage: python scripts/bench_startup.py [--runs 5] [--import-budget-ms 1500] [--first-response-budget-ms 3000]
+Requires httpx.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../backend')
+IMPORT_STATEMENT = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+def server_env(db_path):
+    return dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", RETAG_WORKER="0")
+
+def import_time(db_path):
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_STATEMENT],
+        cwd=BACKEND_DIR, env=server_env(db_path), capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip()) * 1000
+
+def first_response_time(port, db_path, timeout=30.0):
+    """Milliseconds from spawning uvicorn to the first successful listing"""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=server_env(db_path),
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get("/transactions/", params={"limit": 1}).status_code == 200:
+                        return (time.perf_counter() - start) * 1000
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError(f"server exited with status {server.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError("server did not answer in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--import-budget-ms", type=float, default=1500)
+    parser.add_argument("--first-response-budget-ms", type=float, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        imports, fresh, existing = [], [], []
+        for run in range(args.runs):
+            db_path = os.path.join(tmp, f"startup-{run}.db")
+            imports.append(import_time(db_path))
+            fresh.append(first_response_time(args.port, db_path))
+            existing.append(first_response_time(args.port, db_path))
+
+    results = [
+        ("import", imports, args.import_budget_ms),
+        ("first response, new database", fresh, args.first_response_budget_ms),
+        ("first response, existing database", existing, args.first_response_budget_ms),
+    ]
+    over = 0
+    print(f"{'measurement':<36}{'median ms':>10}{'min ms':>10}{'budget ms':>11}")
+    for name, samples, budget in results:
+        median = statistics.median(samples)
+        over += median > budget
+        flag = "  OVER BUDGET" if median > budget else ""
+        print(f"{name:<36}{median:>10.0f}{min(samples):>10.0f}{budget:>11.0f}{flag}")
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
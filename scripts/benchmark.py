@@ -0,0 +1,368 @@
+"""
+Benchmark every API endpoint against a synthetic dataset
+Runs a fixed request mix in-process (TestClient, sequential) and over HTTP
+(uvicorn + concurrent httpx clients) against a scratch copy of a database
+built by generate_data.py, and reports p50/p95/p99 latency, throughput and
+peak RSS per scenario. Results can be saved as JSON and compared with an
+earlier run to catch regressions.
+
+Usage: python scripts/benchmark.py [--rows 100000] [--mode both] [--requests 200] [--concurrency 20]
+                                   [--output results.json] [--compare baseline.json] [--threshold 0.25]
+Requires httpx for the HTTP mode.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(SCRIPTS_DIR, '../backend')
+sys.path.insert(0, SCRIPTS_DIR)
+
+import generate_data
+
+WARMUP_REQUESTS = 5
+BULK_ROWS = 100
+RECLASSIFY_CATEGORIES = ["Food", "Shopping", "Entertainment"]
+BUDGET_PERIODS = ["day", "week", "month"]
+# Mix of common words, a rare prefix and a phrase
+SEARCH_TERMS = ["uber", "starb*", "\"electric bill\"", "pizza #12*"]
+
+class Scenarios:
+    """The request mix, shared by both modes
+
+    Scenarios run one after another in this order; create stores the ids it
+    gets back so reclassify and delete touch only rows the benchmark added, and
+    the bulk operations select the batches bulk_import added. Budgets come last
+    so earlier writes are timed against the dataset's own (budget-free) state.
+    """
+
+    # Change state in a way a repeat cannot: no warmup requests
+    UNREPEATABLE = ("create", "delete", "bulk_import", "bulk_delete", "budget_create")
+
+    def __init__(self, latest_month: str, run_tag: str):
+        self.latest_month = latest_month
+        self.run_tag = run_tag
+        self.created = []
+        self.changes_cursor = None
+
+    def plan(self):
+        """(name, request factory, response hook) in execution order"""
+        return [
+            ("list_latest", lambda i: ("GET", "/transactions/", {"params": {"limit": 100}}), None),
+            ("list_month", lambda i: ("GET", "/transactions/", {"params": {"month": self.latest_month}}), None),
+            ("list_category", lambda i: ("GET", "/transactions/", {"params": {"category": "Food", "limit": 100}}), None),
+            ("search", lambda i: ("GET", "/transactions/search", {"params": {"q": SEARCH_TERMS[i % len(SEARCH_TERMS)]}}), None),
+            ("list_search", lambda i: ("GET", "/transactions/", {"params": {"q": SEARCH_TERMS[i % len(SEARCH_TERMS)], "limit": 100}}), None),
+            ("summary", lambda i: ("GET", "/transactions/summary", {}), None),
+            ("summary_range", lambda i: ("GET", "/transactions/summary", {"params": {"to_month": self.latest_month}}), None),
+            ("timeseries", lambda i: ("GET", "/analytics/timeseries", {"params": {"bucket": "day"}}), None),
+            ("changes_cursor", lambda i: ("GET", "/transactions/changes", {}), self.remember_cursor),
+            ("create", self.create, self.remember_id),
+            ("reclassify", self.reclassify, None),
+            ("delete", self.delete, None),
+            ("bulk_import", self.bulk_import, None),
+            ("bulk_reclassify", self.bulk_reclassify, None),
+            ("bulk_delete", self.bulk_delete, None),
+            ("changes", lambda i: ("GET", "/transactions/changes", {"params": {"since": self.changes_cursor}}), None),
+            ("recurring", lambda i: ("GET", "/recurring", {"params": {"include_inactive": "true"}}), None),
+            ("budget_create", self.budget_create, None),
+            ("budgets", lambda i: ("GET", "/budgets", {}), None),
+            ("metrics", lambda i: ("GET", "/metrics", {}), None),
+        ]
+
+    def create(self, i):
+        return ("POST", "/transactions/", {"json": {
+            "description": f"Bench {self.run_tag} coffee {i}",
+            "amount": 3.5 + i % 20,
+            "transaction_type": "expense",
+        }})
+
+    def remember_id(self, response):
+        if response.status_code == 200:
+            self.created.append(response.json()["id"])
+
+    def reclassify(self, i):
+        transaction_id = self.created[i % len(self.created)]
+        category = RECLASSIFY_CATEGORIES[i % len(RECLASSIFY_CATEGORIES)]
+        return ("PATCH", f"/transactions/{transaction_id}/reclassify", {"json": {"category": category}})
+
+    def delete(self, i):
+        return ("DELETE", f"/transactions/{self.created[i % len(self.created)]}", {})
+
+    def bulk_import(self, i):
+        lines = ["description,amount,transaction_type"]
+        lines += [f"Bench {self.run_tag} import {i}-{row},{5 + row % 40},expense" for row in range(BULK_ROWS)]
+        return ("POST", "/transactions/bulk", {
+            "content": "\n".join(lines).encode(),
+            "headers": {"Content-Type": "text/csv"},
+        })
+
+    def import_batch(self, i):
+        """Filter selecting the rows bulk_import request i added"""
+        return {"description": f"Bench {self.run_tag} import {i}-%"}
+
+    def bulk_reclassify(self, i):
+        category = RECLASSIFY_CATEGORIES[i % len(RECLASSIFY_CATEGORIES)]
+        return ("PATCH", "/transactions/reclassify", {"json": {"filter": self.import_batch(i), "category": category}})
+
+    def bulk_delete(self, i):
+        return ("DELETE", "/transactions/", {"json": {"filter": self.import_batch(i)}})
+
+    def remember_cursor(self, response):
+        if response.status_code == 200 and self.changes_cursor is None:
+            self.changes_cursor = response.json()["cursor"]
+
+    def budget_create(self, i):
+        # One budget per category and period, so each request gets its own category
+        return ("POST", "/budgets", {"json": {
+            "category": f"Bench {self.run_tag} {i}",
+            "period": BUDGET_PERIODS[i % len(BUDGET_PERIODS)],
+            "limit": 100 + i,
+        }})
+
+    def count(self, name, requested):
+        # Each created row can only be deleted once
+        return min(requested, len(self.created)) if name == "delete" else requested
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(latencies, errors, elapsed):
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 3) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 3) if latencies else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+def peak_rss_mb(pid=None):
+    """Peak resident set size of this process, or of pid via /proc (Linux only)"""
+    if pid is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # KiB on Linux, bytes on macOS
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def run_inprocess(main, scenarios, requests):
+    from fastapi.testclient import TestClient
+
+    results = {}
+    with TestClient(app=main.app) as client:
+        for name, factory, hook in scenarios.plan():
+            for i in range(WARMUP_REQUESTS if name not in scenarios.UNREPEATABLE else 0):
+                method, url, kwargs = factory(i)
+                client.request(method, url, **kwargs)
+
+            latencies, errors = [], 0
+            start = time.perf_counter()
+            for i in range(scenarios.count(name, requests)):
+                method, url, kwargs = factory(i)
+                sent = time.perf_counter()
+                response = client.request(method, url, **kwargs)
+                latencies.append((time.perf_counter() - sent) * 1000)
+                if response.status_code >= 400:
+                    errors += 1
+                if hook:
+                    hook(response)
+            results[name] = summarize(latencies, errors, time.perf_counter() - start)
+    return {"scenarios": results, "peak_rss_mb": peak_rss_mb()}
+
+def start_server(port, db_path, env_overrides):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", **env_overrides)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+async def drive_http(base_url, scenarios, requests, concurrency):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for _ in range(100):
+            try:
+                await client.get("/")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError("server did not start")
+
+        results = {}
+        for name, factory, hook in scenarios.plan():
+            latencies, errors = [], 0
+            counter = iter(range(scenarios.count(name, requests)))
+
+            async def worker():
+                nonlocal errors
+                for i in counter:
+                    method, url, kwargs = factory(i)
+                    sent = time.perf_counter()
+                    response = await client.request(method, url, **kwargs)
+                    latencies.append((time.perf_counter() - sent) * 1000)
+                    if response.status_code >= 400:
+                        errors += 1
+                    if hook:
+                        hook(response)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            results[name] = summarize(latencies, errors, time.perf_counter() - start)
+    return results
+
+def run_http(db_path, scenarios, requests, concurrency, port, env_overrides):
+    server = start_server(port, db_path, env_overrides)
+    try:
+        results = asyncio.run(drive_http(f"http://127.0.0.1:{port}", scenarios, requests, concurrency))
+        rss = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"scenarios": results, "peak_rss_mb": rss}
+
+def latest_month(db_path):
+    with sqlite3.connect(db_path) as conn:
+        month = conn.execute("SELECT strftime('%Y-%m', max(timestamp)) FROM transactions").fetchone()[0]
+    return month or datetime.utcnow().strftime("%Y-%m")
+
+def row_count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT count(*) FROM transactions").fetchone()[0]
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """Scenarios whose p95 rose or throughput fell by more than threshold"""
+    regressions = []
+    for mode, run in results["modes"].items():
+        previous_run = baseline.get("modes", {}).get(mode)
+        if not previous_run:
+            continue
+        for name, stats in run["scenarios"].items():
+            previous = previous_run["scenarios"].get(name)
+            if not previous:
+                continue
+            if previous["p95_ms"] and stats["p95_ms"] and stats["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+                regressions.append(f"{mode}/{name}: p95 {previous['p95_ms']} -> {stats['p95_ms']} ms")
+            if (previous["throughput_rps"] and stats["throughput_rps"]
+                    and stats["throughput_rps"] < previous["throughput_rps"] * (1 - threshold)):
+                regressions.append(
+                    f"{mode}/{name}: throughput {previous['throughput_rps']} -> {stats['throughput_rps']} req/s"
+                )
+    return regressions
+
+def print_report(results):
+    for mode, run in results["modes"].items():
+        print(f"\n{mode} (peak RSS {run['peak_rss_mb']} MB)")
+        print(f"  {'scenario':15s} {'reqs':>6s} {'err':>4s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'req/s':>9s}")
+        for name, stats in run["scenarios"].items():
+            print(
+                f"  {name:15s} {stats['requests']:6d} {stats['errors']:4d} {stats['p50_ms'] or 0:9.3f} "
+                f"{stats['p95_ms'] or 0:9.3f} {stats['p99_ms'] or 0:9.3f} {stats['throughput_rps'] or 0:9.1f}"
+            )
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default=None, help="dataset to benchmark (generated if missing); never modified")
+    parser.add_argument("--rows", type=int, default=100000, help="rows to generate when the dataset is missing")
+    parser.add_argument("--mode", choices=["inprocess", "http", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients in HTTP mode")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--with-cache", action="store_true", help="leave the GET response cache enabled")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default 25%%)")
+    args = parser.parse_args()
+
+    dataset = args.db or os.path.join(tempfile.gettempdir(), f"finance-bench-{args.rows}.db")
+    if not os.path.exists(dataset):
+        print(f"Generating {args.rows} rows into {dataset}")
+        subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS_DIR, "generate_data.py"), "--rows", str(args.rows), "--db", dataset],
+            check=True,
+        )
+
+    # Repeated GETs would otherwise be served from the LRU and measure nothing but the cache
+    env_overrides = {} if args.with_cache else {"RESPONSE_CACHE_SIZE": "0"}
+    os.environ.update(env_overrides)
+    month = latest_month(dataset)
+    results = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": row_count(dataset),
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "response_cache": args.with_cache,
+        },
+        "modes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.mode in ("http", "both"):
+            scratch = os.path.join(tmp, "http.db")
+            shutil.copyfile(dataset, scratch)
+            results["modes"]["http"] = run_http(
+                scratch, Scenarios(month, "http"), args.requests, args.concurrency, args.port, env_overrides
+            )
+        if args.mode in ("inprocess", "both"):
+            scratch = os.path.join(tmp, "inprocess.db")
+            shutil.copyfile(dataset, scratch)
+            main = generate_data.load_app(scratch)
+            results["modes"]["inprocess"] = run_inprocess(main, Scenarios(month, "inprocess"), args.requests)
+            main.engine.dispose()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as previous:
+            regressions = compare(results, json.load(previous), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    run_benchmark()
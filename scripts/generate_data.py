@@ -0,0 +1,157 @@
+"""
+Synthetic transaction history for load testing
+Generates a reproducible, realistic mix spread over several years: monthly
+salary (and the odd bonus), rent and utility bills, plus everyday spending
+at merchants taken from CATEGORY_MAP. Rows are written with bulk inserts
+and the rollups and recurring series are rebuilt at the end.
+
+Usage: python scripts/generate_data.py --rows 1000000 [--years 5] [--db path/to/finance.db] [--seed 42]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../backend')
+
+# (category, low, high) amount ranges for everyday spending
+SPENDING = {
+    "Food": (3, 60),
+    "Transport": (2, 80),
+    "Entertainment": (5, 70),
+    "Shopping": (10, 250),
+    "Health": (10, 150),
+}
+# Relative frequency of everyday spending per category
+SPENDING_WEIGHTS = {"Food": 45, "Transport": 25, "Shopping": 15, "Entertainment": 10, "Health": 5}
+BILLS = [("Electric bill", 60, 140), ("Water bill", 20, 50), ("Internet", 40, 80), ("Phone plan", 30, 70)]
+INSERT_BATCH = 50000
+
+def month_starts(start: datetime, months: int):
+    year, month = start.year, start.month
+    for _ in range(months):
+        yield datetime(year, month, 1)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def generate_rows(rows: int, years: int, seed: int, category_map, end: datetime = None):
+    """Yield (description, signed amount, transaction_type, category or None, timestamp) in time order
+
+    category is None when the row should be auto-categorized.
+    """
+    rng = random.Random(seed)
+    end = end or datetime(2024, 12, 31)
+    months = years * 12
+    start = datetime(end.year - years + 1, 1, 1)
+    merchants = {
+        category: [keyword.title() for keyword in keywords if len(keyword) > 3]
+        for category, keywords in category_map.items() if category in SPENDING
+    }
+    categories = list(SPENDING_WEIGHTS)
+    weights = list(SPENDING_WEIGHTS.values())
+
+    fixed_per_month = 2 + 1 + len(BILLS)  # two paychecks, rent, bills
+    daily_budget = max(rows - fixed_per_month * months, 0)
+    spending_per_month = daily_budget // months
+    remainder = daily_budget % months
+    produced = 0
+
+    for index, month in enumerate(month_starts(start, months)):
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        span = (next_month - month).total_seconds()
+        entries = []
+
+        salary = rng.choice([2800, 3500, 4200, 5100])
+        for day in (1, 15):
+            entries.append(("Paycheck", salary / 2, "income", None, month.replace(day=day, hour=9)))
+        if month.month == 12 and rng.random() < 0.7:
+            entries.append(("Annual bonus", round(salary * rng.uniform(0.5, 1.5), 2), "income", None,
+                            month.replace(day=20, hour=9)))
+        entries.append(("Rent payment", -1450.0, "expense", None, month.replace(day=1, hour=8)))
+        for description, low, high in BILLS:
+            entries.append((description, -round(rng.uniform(low, high), 2), "expense", None,
+                            month.replace(day=rng.randint(3, 25), hour=12)))
+
+        count = spending_per_month + (1 if index < remainder else 0)
+        for _ in range(count):
+            category = rng.choices(categories, weights)[0]
+            low, high = SPENDING[category]
+            merchant = rng.choice(merchants[category])
+            description = f"{merchant} #{rng.randint(1, 400):03d}"
+            # A few rows carry a manual category instead of being auto-tagged
+            manual = category if rng.random() < 0.02 else None
+            entries.append((description, -round(rng.uniform(low, high), 2), "expense", manual,
+                            month + timedelta(seconds=rng.uniform(0, span))))
+
+        entries.sort(key=lambda entry: entry[4])
+        for entry in entries:
+            if produced >= rows:
+                return
+            produced += 1
+            yield entry
+
+def write_rows(main, rows, batch_size: int = INSERT_BATCH) -> int:
+    """Bulk insert generated rows through the app's engine and rebuild the rollups and recurring series"""
+    written = 0
+    batch = []
+
+    def flush():
+        untagged = [i for i, row in enumerate(batch) if row[3] is None]
+        categories = main.auto_categorize_batch([batch[i][0] for i in untagged], [batch[i][2] for i in untagged])
+        filled = {i: category for i, category in zip(untagged, categories)}
+        params = [
+            (description, amount, transaction_type, filled.get(i, category), i in filled,
+             timestamp.isoformat(" ", "microseconds"))
+            for i, (description, amount, transaction_type, category, timestamp) in enumerate(batch)
+        ]
+        with main.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO transactions (description, amount, transaction_type, category, auto_tagged, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                params,
+            )
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+            written += len(batch)
+            batch = []
+    if batch:
+        flush()
+        written += len(batch)
+
+    db = main.SessionLocal()
+    try:
+        main.rebuild_rollups(db)
+        main.rebuild_recurring(db)
+    finally:
+        db.close()
+    return written
+
+def load_app(db_path: str):
+    """Import the backend against db_path, creating the schema if needed"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    main.Base.metadata.create_all(bind=main.engine)
+    return main
+
+def generate(db_path: str, rows: int, years: int = 5, seed: int = 42) -> int:
+    main = load_app(db_path)
+    return write_rows(main, generate_rows(rows, years, seed, main.CATEGORY_MAP))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "finance.db"))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = generate(args.db, args.rows, args.years, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {written} transactions to {args.db} in {elapsed:.1f}s ({written / elapsed:.0f} rows/s)")
@@ -0,0 +1,14 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from main import SessionLocal, create_schema, rebuild_recurring
+
+create_schema()
+
+db = SessionLocal()
+try:
+    series = rebuild_recurring(db)
+finally:
+    db.close()
+print(f"Rebuilt recurring-transaction detection ({series} series)")
@@ -0,0 +1,14 @@
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../backend'))
+
+from main import SessionLocal, create_schema, rebuild_rollups
+
+create_schema()
+
+db = SessionLocal()
+try:
+    rows = rebuild_rollups(db)
+finally:
+    db.close()
+print(f"Rebuilt daily and monthly rollups ({rows} monthly rows) and budget spend")
@@ -0,0 +1,89 @@
+"""
+Run admin tasks across every per-user shard (SHARD_DIR mode).
+Shards are opened through the API's shard router, so each one is brought to
+the latest migration first, and processed a few at a time in parallel.
+
+Usage:
+  python scripts/shard_admin.py --shard-dir ./shards list
+  python scripts/shard_admin.py --shard-dir ./shards migrate
+  python scripts/shard_admin.py --shard-dir ./shards query "SELECT COUNT(*) FROM transactions"
+  python scripts/shard_admin.py --shard-dir ./shards query --write "DELETE FROM retag_jobs WHERE status = 'done'"
+
+Queries are read-only (PRAGMA query_only) unless --write is given. Output is
+one tab-separated line per result row, prefixed with the user id.
+"""
+
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../backend')
+
+def query_task(sql, write):
+    def run(shard):
+        with shard.engine.connect() as conn:
+            conn.exec_driver_sql(f"PRAGMA query_only={0 if write else 1}")
+            try:
+                result = conn.exec_driver_sql(sql)
+                if not result.returns_rows:
+                    conn.commit()
+                    return f"{result.rowcount} rows affected"
+                return [tuple(row) for row in result]
+            finally:
+                conn.exec_driver_sql("PRAGMA query_only=0")
+    return run
+
+def revision_task(shard):
+    with shard.engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT version_num FROM alembic_version").scalar()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--shard-dir", default=os.getenv("SHARD_DIR"), help="defaults to $SHARD_DIR")
+    parser.add_argument("--users", help="comma-separated user ids (default: every shard on disk)")
+    parser.add_argument("--workers", type=int, default=4, help="shards processed in parallel")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list shards and their file sizes")
+    commands.add_parser("migrate", help="open every shard, applying pending migrations")
+    query = commands.add_parser("query", help="run one SQL statement on every shard")
+    query.add_argument("sql")
+    query.add_argument("--write", action="store_true", help="allow statements that modify data")
+    args = parser.parse_args()
+    if not args.shard_dir:
+        parser.error("--shard-dir or SHARD_DIR is required")
+
+    # Import after SHARD_DIR is set so the API module builds its shard router
+    os.environ["SHARD_DIR"] = args.shard_dir
+    sys.path.insert(0, BACKEND_DIR)
+    import main as api
+    from shards import fan_out
+
+    router = api.shard_router
+    keys = args.users.split(",") if args.users else router.keys()
+    missing = [key for key in keys if not os.path.exists(router.path(key))]
+    if missing:
+        parser.error(f"no shard for: {', '.join(missing)}")
+    if args.command == "list":
+        for key in keys:
+            print(f"{key}\t{os.path.getsize(router.path(key))}")
+        return 0
+
+    task = revision_task if args.command == "migrate" else query_task(args.sql, args.write)
+    results = fan_out(router, task, keys, args.workers)
+    router.close()
+
+    failed = 0
+    for key, result in results.items():
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{key}\tERROR\t{result}", file=sys.stderr)
+        elif isinstance(result, list):
+            for row in result:
+                print("\t".join([key, *map(str, row)]))
+        else:
+            print(f"{key}\t{result}")
+    print(f"{len(results) - failed} shards ok, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,21 @@ Personal Finance Tracker Python SDK
 Simple wrapper around the FastAPI backend
 """
 
+import asyncio
+import json
+import random
 import requests
-from typing import List, Optional, Dict, Any
-from dataclasses import dataclass
+from requests.structures import CaseInsensitiveDict
+from typing import List, Optional, Dict, Any, Iterator, AsyncIterator, Iterable
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
 
+try:
+    import httpx
+except ImportError:  # Only AsyncFinanceTrackerSDK needs it
+    httpx = None
+
 @dataclass
 class Transaction:
     id: int
@@ -60,10 +70,71 @@ class MonthlySummary:
             by_category=[CategorySummary.from_dict(cat) for cat in data['by_category']]
         )
 
+@dataclass
+class ImportRowResult:
+    row: int
+    status: str  # 'created', 'duplicate' or 'error'
+    detail: Optional[str] = None
+    transaction: Optional[Transaction] = None  # only when created one request at a time
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    duplicates: int = 0
+    errors: int = 0
+    rows: List[ImportRowResult] = field(default_factory=list)
+
+    def add(self, row: ImportRowResult):
+        self.rows.append(row)
+        if row.status == 'created':
+            self.created += 1
+        elif row.status == 'duplicate':
+            self.duplicates += 1
+        else:
+            self.errors += 1
+
+def bulk_selection(ids: Optional[Iterable[int]], filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Request body selecting transactions by id list or by filter"""
+    if (ids is None) == (filters is None):
+        raise ValueError("Pass either ids or filters")
+    if ids is not None:
+        return {"ids": list(ids)}
+    return {"filter": {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in filters.items()
+    }}
+
 class FinanceTrackerSDK:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", cache_size: int = 128):
         self.base_url = base_url.rstrip('/')
         self.session = requests.Session()
+        # (path, params) -> (etag, json, headers) of the last 200 response
+        self.cache_size = cache_size
+        self._etag_cache = OrderedDict()
+        # Local copy of all transactions kept current by sync()
+        self.mirror: Dict[int, Transaction] = {}
+        self.mirror_cursor: Optional[str] = None
+
+    def _get(self, path: str, params: Optional[Dict[str, Any]] = None):
+        """Conditional GET: revalidate with If-None-Match and reuse the cached result on 304"""
+        key = (path, tuple(sorted((params or {}).items())))
+        cached = self._etag_cache.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+
+        response = self.session.get(f"{self.base_url}{path}", params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            self._etag_cache.move_to_end(key)
+            return cached[1], cached[2]
+        response.raise_for_status()
+
+        data = response.json()
+        etag = response.headers.get('ETag')
+        if etag and self.cache_size > 0:
+            self._etag_cache[key] = (etag, data, CaseInsensitiveDict(response.headers))
+            self._etag_cache.move_to_end(key)
+            while len(self._etag_cache) > self.cache_size:
+                self._etag_cache.popitem(last=False)
+        return data, response.headers
 
     def add_transaction(
         self,
@@ -103,18 +174,91 @@ class FinanceTrackerSDK:
         if category:
             params['category'] = category
 
-        response = self.session.get(
-            f"{self.base_url}/transactions/",
-            params=params
-        )
-        response.raise_for_status()
-        return [Transaction.from_dict(tx) for tx in response.json()]
+        data, _ = self._get("/transactions/", params)
+        return [Transaction.from_dict(tx) for tx in data]
 
-    def get_summary(self) -> List[MonthlySummary]:
-        """Get monthly income/expense summary"""
-        response = self.session.get(f"{self.base_url}/transactions/summary")
+    def iter_transactions(
+        self,
+        month: Optional[str] = None,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None,
+        page_size: int = 500
+    ) -> Iterator[Transaction]:
+        """Lazily iterate transactions, fetching one keyset page at a time"""
+        params = {'limit': page_size}
+        if month:
+            params['month'] = month
+        if transaction_type:
+            params['transaction_type'] = transaction_type
+        if category:
+            params['category'] = category
+
+        while True:
+            data, headers = self._get("/transactions/", dict(params))
+            for tx in data:
+                yield Transaction.from_dict(tx)
+
+            cursor = headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            params['after'] = cursor
+
+    def search_transactions(self, q: str, limit: int = 50, offset: int = 0) -> List[Transaction]:
+        """Full-text search over descriptions, best match first; supports "phrases" and prefix*"""
+        data, _ = self._get("/transactions/search", {'q': q, 'limit': limit, 'offset': offset})
+        return [Transaction.from_dict(tx) for tx in data]
+
+    def get_summary(
+        self,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None
+    ) -> List[MonthlySummary]:
+        """Get monthly income/expense summary, optionally bounded by month ('YYYY-MM')"""
+        params = {}
+        if from_month:
+            params['from_month'] = from_month
+        if to_month:
+            params['to_month'] = to_month
+
+        data, _ = self._get("/transactions/summary", params)
+        return [MonthlySummary.from_dict(m) for m in data]
+
+    def get_changes(self, since: Optional[str] = None, limit: int = 1000) -> Dict[str, Any]:
+        """One page of the change feed; without `since`, just the current cursor"""
+        params = {'limit': limit}
+        if since is not None:
+            params['since'] = since
+        response = self.session.get(f"{self.base_url}/transactions/changes", params=params)
         response.raise_for_status()
-        return [MonthlySummary.from_dict(m) for m in response.json()]
+        return response.json()
+
+    def sync(self) -> int:
+        """Bring the local mirror up to date and return the number of changes applied
+
+        The first call downloads everything; later calls only fetch what changed.
+        """
+        if self.mirror_cursor is None:
+            # Take the cursor first: changes racing the download are replayed below
+            cursor = self.get_changes()['cursor']
+            self.mirror = {tx.id: tx for tx in self.iter_transactions(page_size=1000)}
+            self.mirror_cursor = cursor
+
+        applied = 0
+        while True:
+            page = self.get_changes(self.mirror_cursor)
+            for change in page['changes']:
+                if change['op'] == 'delete':
+                    self.mirror.pop(change['id'], None)
+                else:
+                    self.mirror[change['id']] = Transaction.from_dict(change['transaction'])
+            applied += len(page['changes'])
+            self.mirror_cursor = page['cursor']
+            if not page['has_more']:
+                return applied
+
+    def mirrored_transactions(self) -> List[Transaction]:
+        """The mirror as a list, newest first like get_transactions()"""
+        return sorted(self.mirror.values(), key=lambda tx: (tx.timestamp, tx.id), reverse=True)
 
     def delete_transaction(self, transaction_id: int) -> bool:
         """Delete a transaction"""
@@ -131,6 +275,37 @@ class FinanceTrackerSDK:
         response.raise_for_status()
         return Transaction.from_dict(response.json())
 
+    def reclassify_transactions(
+        self,
+        category: str,
+        ids: Optional[Iterable[int]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Reclassify many transactions in one request; returns how many changed
+
+        filters may hold description (LIKE pattern), category, start, end and auto_tagged.
+        """
+        response = self.session.patch(
+            f"{self.base_url}/transactions/reclassify",
+            json={"category": category, **bulk_selection(ids, filters)}
+        )
+        response.raise_for_status()
+        return response.json()['affected']
+
+    def delete_transactions(
+        self,
+        ids: Optional[Iterable[int]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Delete many transactions in one request; returns how many were deleted"""
+        response = self.session.request(
+            'DELETE',
+            f"{self.base_url}/transactions/",
+            json=bulk_selection(ids, filters)
+        )
+        response.raise_for_status()
+        return response.json()['affected']
+
     def close(self):
         """Close the session"""
         self.session.close()
@@ -140,3 +315,301 @@ class FinanceTrackerSDK:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+
+class AsyncFinanceTrackerSDK:
+    """asyncio client on a pooled httpx.AsyncClient, with retries and batched ingest
+
+    Requires httpx. Requests that fail with a connection error, a timeout or a
+    429/502/503/504 are retried with exponential backoff, capped at max_backoff.
+    POSTs are not idempotent, so they are only retried when the server cannot
+    have applied them: a failed connect, or a 429/503 refusal. A timeout or a
+    gateway error may hide a stored row that a replay would report as a duplicate.
+    """
+
+    RETRY_STATUSES = {429, 502, 503, 504}
+    # Responses to a POST that mean it was not processed
+    POST_RETRY_STATUSES = {429, 503}
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        max_connections: int = 20,
+        timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 10.0,
+        bulk_chunk_size: int = 5000,
+        cache_size: int = 128,
+        transport=None
+    ):
+        if httpx is None:
+            raise ImportError("AsyncFinanceTrackerSDK requires httpx (pip install httpx)")
+        self.base_url = base_url.rstrip('/')
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bulk_chunk_size = bulk_chunk_size
+        # None until the first batch tells us whether POST /transactions/bulk exists
+        self.bulk_supported: Optional[bool] = None
+        self.cache_size = cache_size
+        self._etag_cache = OrderedDict()
+
+    async def _request(self, method: str, path: str, **kwargs):
+        """Send a request, retrying transient failures with jittered exponential backoff"""
+        idempotent = method.upper() != 'POST'
+        retry_statuses = self.RETRY_STATUSES if idempotent else self.POST_RETRY_STATUSES
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except (httpx.TransportError, httpx.TimeoutException) as error:
+                if attempt == self.retries or not (idempotent or isinstance(error, httpx.ConnectError)):
+                    raise
+            else:
+                if response.status_code not in retry_statuses or attempt == self.retries:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    await asyncio.sleep(min(int(retry_after), self.max_backoff))
+                    continue
+            await asyncio.sleep(min(self.backoff * 2 ** attempt, self.max_backoff) * (0.5 + random.random()))
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None):
+        """Conditional GET: revalidate with If-None-Match and reuse the cached result on 304"""
+        key = (path, tuple(sorted((params or {}).items())))
+        cached = self._etag_cache.get(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+
+        response = await self._request('GET', path, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            self._etag_cache.move_to_end(key)
+            return cached[1], cached[2]
+        response.raise_for_status()
+
+        data = response.json()
+        etag = response.headers.get('ETag')
+        if etag and self.cache_size > 0:
+            self._etag_cache[key] = (etag, data, response.headers)
+            self._etag_cache.move_to_end(key)
+            while len(self._etag_cache) > self.cache_size:
+                self._etag_cache.popitem(last=False)
+        return data, response.headers
+
+    async def add_transaction(
+        self,
+        description: str,
+        amount: float,
+        transaction_type: str,
+        category: Optional[str] = None
+    ) -> Transaction:
+        """Add a new transaction"""
+        payload = {
+            "description": description,
+            "amount": amount,
+            "transaction_type": transaction_type
+        }
+        if category:
+            payload["category"] = category
+
+        response = await self._request('POST', "/transactions/", json=payload)
+        response.raise_for_status()
+        return Transaction.from_dict(response.json())
+
+    async def add_transactions_many(
+        self,
+        transactions: Iterable[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> ImportResult:
+        """Add many transactions, with at most `concurrency` requests in flight
+
+        Each item is a dict with description, amount, transaction_type and
+        optionally category. Items go to POST /transactions/bulk in chunks of
+        bulk_chunk_size when the server has it, otherwise one POST each. Row
+        numbers in the result are 1-based positions in `transactions`.
+        """
+        items = list(transactions)
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+        result = ImportResult()
+        if not items:
+            return result
+
+        rows: List[ImportRowResult] = []
+        start = 0
+        if self.bulk_supported is not False:
+            # The first chunk doubles as the probe for the bulk endpoint
+            first = await self._import_chunk(items[:self.bulk_chunk_size], 1)
+            if first is not None:
+                rows.extend(first)
+                start = self.bulk_chunk_size
+                chunks = [
+                    self._limited(semaphore, self._import_chunk(items[i:i + self.bulk_chunk_size], i + 1))
+                    for i in range(start, len(items), self.bulk_chunk_size)
+                ]
+                for chunk_rows in await asyncio.gather(*chunks):
+                    rows.extend(chunk_rows)
+                start = len(items)
+
+        singles = [
+            self._limited(semaphore, self._add_one(item, row))
+            for row, item in enumerate(items[start:], start=start + 1)
+        ]
+        rows.extend(await asyncio.gather(*singles))
+
+        for row in sorted(rows, key=lambda r: r.row):
+            result.add(row)
+        return result
+
+    @staticmethod
+    async def _limited(semaphore: asyncio.Semaphore, coroutine):
+        async with semaphore:
+            return await coroutine
+
+    async def _import_chunk(self, items: List[Dict[str, Any]], first_row: int) -> Optional[List[ImportRowResult]]:
+        """POST one chunk as NDJSON; None if the server has no bulk endpoint"""
+        body = "\n".join(json.dumps(item) for item in items).encode()
+        response = await self._request(
+            'POST', "/transactions/bulk", content=body, headers={'Content-Type': 'application/x-ndjson'}
+        )
+        if response.status_code in (404, 405):
+            self.bulk_supported = False
+            return None
+        response.raise_for_status()
+        self.bulk_supported = True
+        return [
+            ImportRowResult(row=row['row'] + first_row - 1, status=row['status'], detail=row['detail'])
+            for row in response.json()['rows']
+        ]
+
+    async def _add_one(self, item: Dict[str, Any], row: int) -> ImportRowResult:
+        response = await self._request('POST', "/transactions/", json=item)
+        if response.status_code == 200:
+            return ImportRowResult(row=row, status='created', transaction=Transaction.from_dict(response.json()))
+        if response.status_code >= 500:
+            response.raise_for_status()
+        try:
+            detail = response.json().get('detail')
+        except ValueError:
+            detail = response.text
+        status = 'duplicate' if detail == "Duplicate transaction detected" else 'error'
+        return ImportRowResult(row=row, status=status, detail=str(detail))
+
+    async def get_transactions(
+        self,
+        month: Optional[str] = None,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> List[Transaction]:
+        """Get transactions with optional filters"""
+        params = {}
+        if month:
+            params['month'] = month
+        if transaction_type:
+            params['transaction_type'] = transaction_type
+        if category:
+            params['category'] = category
+
+        data, _ = await self._get("/transactions/", params)
+        return [Transaction.from_dict(tx) for tx in data]
+
+    async def iter_transactions(
+        self,
+        month: Optional[str] = None,
+        transaction_type: Optional[str] = None,
+        category: Optional[str] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[Transaction]:
+        """Lazily iterate transactions, fetching one keyset page at a time"""
+        params = {'limit': page_size}
+        if month:
+            params['month'] = month
+        if transaction_type:
+            params['transaction_type'] = transaction_type
+        if category:
+            params['category'] = category
+
+        while True:
+            data, headers = await self._get("/transactions/", dict(params))
+            for tx in data:
+                yield Transaction.from_dict(tx)
+
+            cursor = headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+            params['after'] = cursor
+
+    async def search_transactions(self, q: str, limit: int = 50, offset: int = 0) -> List[Transaction]:
+        """Full-text search over descriptions, best match first; supports "phrases" and prefix*"""
+        data, _ = await self._get("/transactions/search", {'q': q, 'limit': limit, 'offset': offset})
+        return [Transaction.from_dict(tx) for tx in data]
+
+    async def get_summary(
+        self,
+        from_month: Optional[str] = None,
+        to_month: Optional[str] = None
+    ) -> List[MonthlySummary]:
+        """Get monthly income/expense summary, optionally bounded by month ('YYYY-MM')"""
+        params = {}
+        if from_month:
+            params['from_month'] = from_month
+        if to_month:
+            params['to_month'] = to_month
+
+        data, _ = await self._get("/transactions/summary", params)
+        return [MonthlySummary.from_dict(m) for m in data]
+
+    async def delete_transaction(self, transaction_id: int) -> bool:
+        """Delete a transaction"""
+        response = await self._request('DELETE', f"/transactions/{transaction_id}")
+        response.raise_for_status()
+        return True
+
+    async def reclassify_transaction(self, transaction_id: int, category: str) -> Transaction:
+        """Reclassify a transaction"""
+        response = await self._request(
+            'PATCH',
+            f"/transactions/{transaction_id}/reclassify",
+            json={"category": category}
+        )
+        response.raise_for_status()
+        return Transaction.from_dict(response.json())
+
+    async def reclassify_transactions(
+        self,
+        category: str,
+        ids: Optional[Iterable[int]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Reclassify many transactions in one request; returns how many changed"""
+        response = await self._request(
+            'PATCH',
+            "/transactions/reclassify",
+            json={"category": category, **bulk_selection(ids, filters)}
+        )
+        response.raise_for_status()
+        return response.json()['affected']
+
+    async def delete_transactions(
+        self,
+        ids: Optional[Iterable[int]] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Delete many transactions in one request; returns how many were deleted"""
+        response = await self._request('DELETE', "/transactions/", json=bulk_selection(ids, filters))
+        response.raise_for_status()
+        return response.json()['affected']
+
+    async def aclose(self):
+        """Close the connection pool"""
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()